@@ -0,0 +1,74 @@
+# Generated by Django 5.1.4 on 2025-04-12 10:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Django handles cascades in Python, but the bot deletes players with a plain DELETE through
+# Tortoise, so the constraint is created with a cascade in the database
+ADD_CONSTRAINT = """
+ALTER TABLE "playerstats" ADD CONSTRAINT "playerstats_player_id_fk_player_id"
+    FOREIGN KEY ("player_id") REFERENCES "player" ("id") ON DELETE CASCADE;
+"""
+DROP_CONSTRAINT = """
+ALTER TABLE "playerstats" DROP CONSTRAINT "playerstats_player_id_fk_player_id";
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bd_models", "0007_player_trade_cooldown_policy"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PlayerStats",
+            fields=[
+                (
+                    "player",
+                    models.OneToOneField(
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        serialize=False,
+                        to="bd_models.player",
+                    ),
+                ),
+                (
+                    "balls",
+                    models.IntegerField(default=0, help_text="Number of ball instances owned"),
+                ),
+                (
+                    "caught_balls",
+                    models.IntegerField(
+                        default=0,
+                        help_text="Number of ball instances owned that were never traded",
+                    ),
+                ),
+                (
+                    "special_balls",
+                    models.IntegerField(
+                        default=0, help_text="Number of ball instances owned with a special"
+                    ),
+                ),
+                (
+                    "distinct_balls",
+                    models.IntegerField(default=0, help_text="Number of different balls owned"),
+                ),
+                (
+                    "trades",
+                    models.IntegerField(default=0, help_text="Number of trades completed"),
+                ),
+                (
+                    "trade_partners",
+                    models.IntegerField(default=0, help_text="Number of players traded with"),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "player stats",
+                "db_table": "playerstats",
+                "managed": True,
+            },
+        ),
+        migrations.RunSQL(ADD_CONSTRAINT, DROP_CONSTRAINT),
+    ]
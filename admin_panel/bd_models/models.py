@@ -423,3 +423,29 @@ class Block(models.Model):
     class Meta:
         managed = True
         db_table = "block"
+
+
+class PlayerStats(models.Model):
+    # the foreign key is created with ON DELETE CASCADE by the migration
+    player = models.OneToOneField(
+        Player, on_delete=models.CASCADE, primary_key=True, db_constraint=False
+    )
+    player_id: int
+    balls = models.IntegerField(default=0, help_text="Number of ball instances owned")
+    caught_balls = models.IntegerField(
+        default=0, help_text="Number of ball instances owned that were never traded"
+    )
+    special_balls = models.IntegerField(
+        default=0, help_text="Number of ball instances owned with a special"
+    )
+    distinct_balls = models.IntegerField(default=0, help_text="Number of different balls owned")
+    trades = models.IntegerField(default=0, help_text="Number of trades completed")
+    trade_partners = models.IntegerField(default=0, help_text="Number of players traded with")
+
+    def __str__(self) -> str:
+        return f"Stats of {self.player}"
+
+    class Meta:
+        managed = True
+        db_table = "playerstats"
+        verbose_name_plural = "player stats"
@@ -1,15 +1,20 @@
 import asyncio
 import os
 import sys
+from io import BytesIO
 
 from django.core.management.base import BaseCommand, CommandError, CommandParser
+from PIL import Image
 from tortoise.exceptions import DoesNotExist
 
-from ballsdex.core.image_generator.image_gen import draw_card
+from ballsdex.core.image_generator.card_cache import get_card_cache
+from ballsdex.core.image_generator.profiles import get_profile
+from ballsdex.core.image_generator.renderer import CardRenderer
+from ballsdex.core.image_generator.warmup import popular_combinations, warm_up
 from ballsdex.core.models import Ball, BallInstance, Special
 from ballsdex.settings import settings
 
-from ...utils import refresh_cache
+from ...utils import refresh_cache, render_card
 
 
 class Command(BaseCommand):
@@ -28,10 +33,81 @@ class Command(BaseCommand):
             "--special",
             help="The special event's background you want to use, otherwise regime is used",
         )
+        parser.add_argument(
+            "--profile",
+            help='The output profile used to encode the card, "full" by default, or the '
+            "profile of the cards sent in messages when warming up",
+        )
+        parser.add_argument(
+            "--warmup",
+            type=int,
+            metavar="LIMIT",
+            help="Instead of showing a card, render up to LIMIT of the most popular cards into "
+            "the card cache. Use this after a deploy or before launching a special event.",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=0,
+            help="Warm-up only, number of cards rendered at the same time. "
+            "Defaults to the number of renderer processes.",
+        )
+        parser.add_argument(
+            "--time-budget",
+            type=float,
+            default=300,
+            help="Warm-up only, stop rendering new cards after this number of seconds.",
+        )
+
+    async def warm_up(self, limit: int, concurrency: int, time_budget: float, profile_name: str):
+        if not get_card_cache().enabled:
+            raise CommandError("The card cache is disabled, there is nothing to warm up.")
+        if not settings.card_cache_directory and not settings.render_service_url:
+            self.stderr.write(
+                self.style.WARNING(
+                    "No card cache directory or render service is configured, the rendered "
+                    "cards will only be cached in this process and lost when it exits."
+                )
+            )
+        try:
+            profile = get_profile(profile_name)
+        except ValueError as e:
+            raise CommandError(str(e)) from e
+
+        renderer = CardRenderer(
+            settings.render_workers,
+            settings.render_queue_size,
+            "./media/",
+            settings.render_service_url,
+        )
+        if renderer.workers > 0:
+            renderer.start()
+        try:
+            combinations = await popular_combinations(limit)
+            self.stderr.write(f"Rendering {len(combinations)} cards...")
+            result = await warm_up(
+                combinations,
+                profile,
+                lambda spec: renderer.fetch(spec, profile),
+                concurrency=concurrency or max(renderer.workers, 1),
+                time_budget=time_budget or None,
+            )
+        finally:
+            await renderer.shutdown()
+        self.stderr.write(self.style.SUCCESS(f"Warm-up finished: {result}."))
 
     async def generate_preview(self, *args, **options):
         await refresh_cache()
 
+        if options.get("warmup"):
+            await self.warm_up(
+                options["warmup"],
+                options["concurrency"],
+                options["time_budget"],
+                options["profile"] or settings.message_card_profile,
+            )
+            return
+
         if ball_name := options.get("ball"):
             try:
                 ball = await Ball.get(country__iexact=ball_name)
@@ -58,8 +134,13 @@ class Command(BaseCommand):
             )
         )
 
+        try:
+            profile = get_profile(options["profile"] or "full")
+        except ValueError as e:
+            raise CommandError(str(e)) from e
+
         instance = BallInstance(ball=ball, special=special)
-        image, kwargs = draw_card(instance, media_path="./media/")
+        data = await render_card(instance, profile)
 
         if sys.platform not in ("win32", "darwin") and not os.environ.get("DISPLAY"):
             self.stderr.write(
@@ -72,7 +153,8 @@ class Command(BaseCommand):
             )
             raise CommandError("No display detected.")
         if sys.stdout.isatty():
-            if kwargs.get("save_all", False):
+            image = Image.open(BytesIO(data))
+            if getattr(image, "is_animated", False):
                 self.stderr.write(
                     self.style.WARNING(
                         "You are trying to generate an animation, which is not supported in "
@@ -82,7 +164,7 @@ class Command(BaseCommand):
                 )
             image.show(title=ball.country)
         else:
-            image.save(sys.stdout.buffer, **kwargs)
+            sys.stdout.buffer.write(data)
 
     def handle(self, *args, **options):
         loop = asyncio.get_event_loop()
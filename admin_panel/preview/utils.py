@@ -1,10 +1,22 @@
+import asyncio
+import logging
 import os
 
 from tortoise import Tortoise
 
 from ballsdex.__main__ import init_tortoise
+from ballsdex.core.image_generator.client import (
+    RenderServiceClient,
+    RenderServiceRejected,
+    RenderServiceUnavailable,
+)
+from ballsdex.core.image_generator.image_gen import CardSpec
+from ballsdex.core.image_generator.image_gen import clear_cache as clear_card_cache
+from ballsdex.core.image_generator.profiles import CardProfile
+from ballsdex.core.image_generator.renderer import render_to_bytes
 from ballsdex.core.models import (
     Ball,
+    BallInstance,
     Economy,
     Regime,
     Special,
@@ -13,6 +25,12 @@ from ballsdex.core.models import (
     regimes,
     specials,
 )
+from ballsdex.core.utils.names import index_catch_names
+from ballsdex.settings import settings
+
+log = logging.getLogger("preview")
+
+_render_service: RenderServiceClient | None = None
 
 
 async def refresh_cache():
@@ -28,6 +46,7 @@ async def refresh_cache():
     balls.clear()
     for ball in await Ball.all():
         balls[ball.pk] = ball
+    index_catch_names(balls.values())
 
     regimes.clear()
     for regime in await Regime.all():
@@ -40,3 +59,26 @@ async def refresh_cache():
     specials.clear()
     for special in await Special.all():
         specials[special.pk] = special
+
+    clear_card_cache()
+
+
+async def render_card(instance: BallInstance, profile: CardProfile) -> bytes:
+    """
+    Render the card of a ball instance, using the render service if configured, otherwise in
+    this process. The cache must have been refreshed before.
+    """
+    global _render_service
+    spec = CardSpec.from_instance(instance)
+    if settings.render_service_url:
+        # kept for the lifetime of the process, reusing its connections and remembering failures
+        if _render_service is None:
+            _render_service = RenderServiceClient(settings.render_service_url)
+        try:
+            return await _render_service.render(spec, profile)
+        except RenderServiceUnavailable:
+            log.warning("Render service unavailable, rendering locally.", exc_info=True)
+        except RenderServiceRejected as e:
+            log.warning(f"{e}, rendering it locally.")
+    data, _ = await asyncio.to_thread(render_to_bytes, spec, profile, "./media/")
+    return data
@@ -1,10 +1,10 @@
 from django.contrib import messages
 from django.http import HttpRequest, HttpResponse
 
-from ballsdex.core.image_generator.image_gen import draw_card
+from ballsdex.core.image_generator.profiles import get_profile
 from ballsdex.core.models import Ball, BallInstance, Special
 
-from .utils import refresh_cache
+from .utils import refresh_cache, render_card
 
 
 async def render_ballinstance(request: HttpRequest, ball_pk: int) -> HttpResponse:
@@ -12,11 +12,8 @@ async def render_ballinstance(request: HttpRequest, ball_pk: int) -> HttpRespons
 
     ball = await Ball.get(pk=ball_pk)
     instance = BallInstance(ball=ball)
-    image, kwargs = draw_card(instance, media_path="./media/")
-
-    response = HttpResponse(content_type="image/png")
-    image.save(response, **kwargs)  # type: ignore
-    return response
+    profile = get_profile("full")
+    return HttpResponse(await render_card(instance, profile), content_type=profile.content_type)
 
 
 async def render_special(request: HttpRequest, special_pk: int) -> HttpResponse:
@@ -32,8 +29,5 @@ async def render_special(request: HttpRequest, special_pk: int) -> HttpResponse:
 
     special = await Special.get(pk=special_pk)
     instance = BallInstance(ball=ball, special=special)
-    image, kwargs = draw_card(instance, media_path="./media/")
-
-    response = HttpResponse(content_type="image/png")
-    image.save(response, **kwargs)  # type: ignore
-    return response
+    profile = get_profile("full")
+    return HttpResponse(await render_card(instance, profile), content_type=profile.content_type)
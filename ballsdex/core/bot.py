@@ -25,6 +25,12 @@ from rich.table import Table
 
 from ballsdex.core.commands import Core
 from ballsdex.core.dev import Dev
+from ballsdex.core.image_generator.card_cache import get_card_cache
+from ballsdex.core.image_generator.image_gen import clear_cache as clear_card_cache
+from ballsdex.core.image_generator.profiles import get_profile
+from ballsdex.core.image_generator.renderer import CardRenderer
+from ballsdex.core.image_generator.warmup import WarmupResult, popular_combinations, warm_up
+from ballsdex.core.image_generator.wild_cards import get_wild_card_cache
 from ballsdex.core.metrics import PrometheusServer
 from ballsdex.core.models import (
     Ball,
@@ -38,6 +44,8 @@ from ballsdex.core.models import (
     regimes,
     specials,
 )
+from ballsdex.core.utils.names import index_catch_names
+from ballsdex.core.utils.timeline import SpecialTimeline
 from ballsdex.settings import settings
 
 if TYPE_CHECKING:
@@ -175,6 +183,12 @@ class BallsDexBot(commands.AutoShardedBot):
         self.catch_log: set[int] = set()
         self.command_log: set[int] = set()
         self.locked_balls = TTLCache(maxsize=99999, ttl=60 * 30)
+        self.special_timeline = SpecialTimeline(())
+        self.card_renderer = CardRenderer(
+            settings.render_workers,
+            settings.render_queue_size,
+            service_url=settings.render_service_url,
+        )
 
         self.owner_ids: set[int]
 
@@ -224,6 +238,13 @@ class BallsDexBot(commands.AutoShardedBot):
         for ball in await Ball.all():
             balls[ball.pk] = ball
         table.add_row(settings.collectible_name.title() + "s", str(len(balls)))
+        index_catch_names(balls.values())
+        wild_cards = get_wild_card_cache()
+        wild_cards.clear()
+        if wild_cards.enabled:
+            self.loop.create_task(
+                wild_cards.preload(x.wild_card for x in balls.values() if x.enabled)
+            )
 
         regimes.clear()
         for regime in await Regime.all():
@@ -239,6 +260,17 @@ class BallsDexBot(commands.AutoShardedBot):
         for special in await Special.all():
             specials[special.pk] = special
         table.add_row("Special events", str(len(specials)))
+        self.special_timeline.stop()
+        self.special_timeline = SpecialTimeline(specials.values(), balls.values())
+        self.special_timeline.schedule()
+        clear_card_cache()
+        if settings.preload_assets:
+            assets = self.card_renderer.list_assets(
+                balls.values(), regimes.values(), economies.values(), specials.values()
+            )
+            self.loop.create_task(self.card_renderer.preload(assets))
+        if settings.warmup_cards > 0 and get_card_cache().enabled:
+            self.loop.create_task(self.warm_up_cards(settings.warmup_cards))
 
         self.blacklist = set()
         for blacklisted_id in await BlacklistedID.all().only("discord_id"):
@@ -250,10 +282,38 @@ class BallsDexBot(commands.AutoShardedBot):
             self.blacklist_guild.add(blacklisted_id.discord_id)
         table.add_row("Blacklisted guilds", str(len(self.blacklist_guild)))
 
+        self.dispatch("ballsdex_cache_loaded")
+
         log.info("Cache loaded, summary displayed below:")
         console = Console()
         console.print(table)
 
+    async def warm_up_cards(
+        self, limit: int, concurrency: int | None = None, time_budget: float | None = 300
+    ) -> WarmupResult:
+        """
+        Render the most popular cards in advance, so that they are served from the card cache.
+
+        Parameters
+        ----------
+        limit: int
+            Maximum number of cards to render.
+        concurrency: int | None
+            Number of cards rendered at the same time, defaults to the number of renderer
+            processes.
+        time_budget: float | None
+            Stop rendering new cards after this number of seconds.
+        """
+        profile = get_profile(settings.message_card_profile)
+        combinations = await popular_combinations(limit)
+        return await warm_up(
+            combinations,
+            profile,
+            lambda spec: self.card_renderer.fetch(spec, profile),
+            concurrency=concurrency or max(settings.render_workers, 1),
+            time_budget=time_budget,
+        )
+
     async def gateway_healthy(self) -> bool:
         """Check whether or not the gateway proxy is ready and healthy."""
         if settings.gateway_url is None:
@@ -273,6 +333,8 @@ class BallsDexBot(commands.AutoShardedBot):
 
     async def setup_hook(self) -> None:
         await self.tree.set_translator(Translator())
+        if settings.render_workers > 0:
+            self.card_renderer.start()
         log.info("Starting up with %s shards...", self.shard_count)
         if settings.gateway_url is None:
             return
@@ -286,6 +348,11 @@ class BallsDexBot(commands.AutoShardedBot):
             log.warning("Gateway proxy is not ready yet, waiting 30 more seconds...")
             await asyncio.sleep(30)
 
+    async def close(self) -> None:
+        self.special_timeline.stop()
+        await self.card_renderer.shutdown()
+        await super().close()
+
     async def on_ready(self):
         if self.cogs != {}:
             return  # bot is reconnecting, no need to setup again
@@ -1,14 +1,16 @@
 import asyncio
 import logging
 import time
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, cast
 
 import discord
 from discord.ext import commands
 from tortoise import Tortoise
 
 from ballsdex.core.dev import pagify, send_interactive
-from ballsdex.core.models import Ball
+from ballsdex.core.image_generator.card_cache import get_card_cache
+from ballsdex.core.models import Ball, Player
+from ballsdex.core.utils.player_stats import refresh_player_stats
 from ballsdex.settings import settings
 
 log = logging.getLogger("ballsdex.core.commands")
@@ -100,6 +102,24 @@ class Core(commands.Cog):
         await self.bot.load_cache()
         await ctx.message.add_reaction("✅")
 
+    @commands.command()
+    @commands.is_owner()
+    async def warmup(
+        self, ctx: commands.Context, limit: int = 200, concurrency: int = 0, budget: int = 300
+    ):
+        """
+        Render the most popular cards in advance, so that they are served from the cache.
+
+        Parameters are the maximum number of cards, the number of cards rendered at the same
+        time (0 for the number of renderer processes) and the time budget in seconds.
+        """
+        if not get_card_cache().enabled:
+            await ctx.send("The card cache is disabled, there is nothing to warm up.")
+            return
+        async with ctx.typing():
+            result = await self.bot.warm_up_cards(limit, concurrency or None, budget or None)
+        await ctx.send(f"Warm-up finished: {result}.")
+
     @commands.command()
     @commands.is_owner()
     async def analyzedb(self, ctx: commands.Context):
@@ -112,6 +132,38 @@ class Core(commands.Cog):
         t2 = time.time()
         await ctx.send(f"Analyzed database in {round((t2 - t1) * 1000)}ms.")
 
+    @commands.command()
+    @commands.is_owner()
+    async def backfillstats(self, ctx: commands.Context, batch_size: int = 1000):
+        """
+        Recompute the stats of all players displayed by `/player info`.
+
+        Stats are maintained with each catch and trade, this is needed once after the update
+        adding them, or after editing ball instances or trades from the admin panel.
+        """
+        message = await ctx.send("Recomputing player stats...")
+        total = await Player.all().count()
+        done = 0
+        last_id = 0
+        t1 = time.time()
+        while True:
+            player_ids = cast(
+                list[int],
+                await Player.filter(id__gt=last_id)
+                .order_by("id")
+                .limit(batch_size)
+                .values_list("id", flat=True),
+            )
+            if not player_ids:
+                break
+            await refresh_player_stats(*player_ids)
+            done += len(player_ids)
+            last_id = player_ids[-1]
+            if time.time() - t1 > 5:
+                t1 = time.time()
+                await message.edit(content=f"Recomputing player stats... {done}/{total}")
+        await message.edit(content=f"Recomputed the stats of {done} players.")
+
     @commands.command()
     @commands.is_owner()
     async def migrateemotes(self, ctx: commands.Context):
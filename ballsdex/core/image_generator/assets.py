@@ -0,0 +1,124 @@
+import hashlib
+import logging
+import os
+import threading
+from typing import Iterable
+
+from cachetools import LRUCache
+from PIL import Image, ImageOps
+
+from ballsdex.core.image_generator.stages import stage
+from ballsdex.settings import settings
+
+log = logging.getLogger("ballsdex.core.image_generator.assets")
+
+AssetKey = tuple[str, int, tuple[int, int] | None]
+
+# hash of the asset files with the (mtime, size) they were computed for, keyed by path, to
+# avoid reading them on each lookup
+_asset_hashes: dict[str, tuple[int, int, str]] = {}
+
+
+def hash_asset(path: str) -> str:
+    """
+    Return a hash of the content of an asset file, or "missing" if it doesn't exist.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return "missing"
+    cached = _asset_hashes.get(path)
+    if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+    with open(path, "rb") as file:
+        digest = hashlib.file_digest(file, "sha1").hexdigest()
+    _asset_hashes[path] = (stat.st_mtime_ns, stat.st_size, digest)
+    return digest
+
+
+def _image_size(image: Image.Image) -> int:
+    return image.width * image.height * len(image.getbands())
+
+
+class AssetCache:
+    """
+    An LRU cache of decoded RGBA images, optionally fitted to a given size, bounded by the
+    memory used by the pixels.
+
+    Entries are keyed by path and modification time, so replacing a file on disk is picked up
+    on the next access.
+
+    Returned images are shared between callers and threads, they must never be modified or
+    closed. Use `Image.copy` before drawing on them.
+
+    Parameters
+    ----------
+    max_memory: int
+        Maximum number of bytes used by the decoded images. 0 disables the cache.
+    """
+
+    def __init__(self, max_memory: int):
+        self.images: LRUCache[AssetKey, Image.Image] = LRUCache(
+            maxsize=max(max_memory, 1), getsizeof=_image_size
+        )
+        self.enabled = max_memory > 0
+        self.lock = threading.Lock()
+
+    def get(self, path: str, size: tuple[int, int] | None = None) -> Image.Image:
+        """
+        Return the image at the given path, converted to RGBA and fitted to `size` if provided.
+        """
+        key = (path, os.stat(path).st_mtime_ns, size)
+        with self.lock:
+            image = self.images.get(key)
+        if image is not None:
+            return image
+
+        with Image.open(path) as file:
+            with stage("open"):
+                file.load()
+            with stage("convert"):
+                image = file.convert("RGBA")
+        if size:
+            with stage("fit"):
+                fitted = ImageOps.fit(image, size)
+            image.close()
+            image = fitted
+
+        if self.enabled and _image_size(image) <= self.images.maxsize:
+            with self.lock:
+                self.images[key] = image
+        return image
+
+    def preload(self, assets: Iterable[tuple[str, tuple[int, int] | None]]):
+        """
+        Decode the given assets in advance. Stops once the cache is full.
+        """
+        loaded = 0
+        for path, size in assets:
+            try:
+                image = self.get(path, size)
+            except OSError:
+                log.warning(f"Failed to preload asset {path}", exc_info=True)
+                continue
+            loaded += 1
+            if self.images.currsize + _image_size(image) > self.images.maxsize:
+                break
+        log.info(f"Preloaded {loaded} card assets.")
+
+    def clear(self):
+        with self.lock:
+            self.images.clear()
+
+
+_asset_cache: AssetCache | None = None
+
+
+def get_asset_cache() -> AssetCache:
+    """
+    Return the process-wide asset cache, creating it from the settings on first call.
+    """
+    global _asset_cache
+    if _asset_cache is None:
+        _asset_cache = AssetCache(settings.asset_cache_memory * 1024 * 1024)
+    return _asset_cache
@@ -0,0 +1,195 @@
+import hashlib
+import logging
+import os
+import threading
+from dataclasses import astuple
+from pathlib import Path
+
+from cachetools import LRUCache
+
+from ballsdex.core.image_generator.assets import hash_asset
+from ballsdex.core.image_generator.image_gen import RENDERER_VERSION, CardSpec
+from ballsdex.core.image_generator.profiles import CardProfile
+from ballsdex.core.metrics import card_cache_evictions, card_cache_hits, card_cache_misses
+from ballsdex.settings import settings
+
+log = logging.getLogger("ballsdex.core.image_generator.card_cache")
+
+# when the disk tier goes over its budget, the oldest cards are removed until it's back under
+# this fraction of the budget, to avoid scanning the directory on each write
+DISK_PRUNE_TARGET = 0.9
+
+
+def card_cache_key(spec: CardSpec, profile: CardProfile, media_path: str) -> str:
+    """
+    Compute the cache key of a rendered card. Two specs encoded with the same profile and
+    having the same key produce the exact same image.
+
+    Besides the fields of the spec and profile, this includes the content of the asset files and
+    the renderer version, so that editing any of them invalidates the entries, including those
+    stored on disk by a previous process.
+    """
+    assets = (spec.background, spec.artwork, spec.economy_icon)
+    parts = (
+        RENDERER_VERSION,
+        astuple(spec),
+        astuple(profile),
+        *(hash_asset(media_path + x) if x else None for x in assets),
+    )
+    return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+
+class _EvictionCountingCache(LRUCache[str, bytes]):
+    def popitem(self):
+        item = super().popitem()
+        card_cache_evictions.inc()
+        return item
+
+
+class CardCache:
+    """
+    A two-tier cache of rendered cards. The first tier is an LRU in memory, bounded by the total
+    size of the stored images, the second tier is an optional directory on disk.
+
+    Keys are obtained with `card_cache_key`. Since they change with any input of the renderer,
+    entries are never invalidated, they are evicted from memory, and removed from disk oldest
+    first once the disk tier is over its budget.
+
+    Parameters
+    ----------
+    max_memory: int
+        Maximum number of bytes held in memory. 0 disables the memory tier.
+    directory: Path | None
+        Directory where cards are stored on disk. `None` disables the disk tier.
+    max_disk: int
+        Maximum number of bytes stored on disk. 0 doesn't limit the disk tier.
+    """
+
+    def __init__(self, max_memory: int, directory: Path | None = None, max_disk: int = 0):
+        self.memory: LRUCache[str, bytes] | None = (
+            _EvictionCountingCache(maxsize=max_memory, getsizeof=len) if max_memory > 0 else None
+        )
+        self.directory = directory
+        self.max_disk = max_disk
+        # bytes written to disk as known by this process, `None` until the directory is scanned.
+        # Other processes write to the same directory, this is corrected on each prune.
+        self.disk_usage: int | None = None
+        self.lock = threading.Lock()
+        self.prune_lock = threading.Lock()
+        if self.directory:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+        return self.memory is not None or self.directory is not None
+
+    def _get_path(self, key: str) -> Path:
+        assert self.directory
+        return self.directory / key[:2] / f"{key}.card"
+
+    def get(self, key: str) -> bytes | None:
+        if self.memory is not None:
+            with self.lock:
+                data = self.memory.get(key)
+            if data is not None:
+                card_cache_hits.labels(tier="memory").inc()
+                return data
+        if self.directory:
+            try:
+                data = self._get_path(key).read_bytes()
+            except FileNotFoundError:
+                pass
+            else:
+                card_cache_hits.labels(tier="disk").inc()
+                self._set_memory(key, data)
+                return data
+        card_cache_misses.inc()
+        return None
+
+    def _set_memory(self, key: str, data: bytes):
+        if self.memory is None or len(data) > self.memory.maxsize:
+            return
+        with self.lock:
+            self.memory[key] = data
+
+    def set(self, key: str, data: bytes):
+        self._set_memory(key, data)
+        if self.directory:
+            path = self._get_path(key)
+            try:
+                path.parent.mkdir(exist_ok=True)
+                # write then rename to never expose a partial file to other processes
+                tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+                tmp_path.write_bytes(data)
+                tmp_path.replace(path)
+            except OSError:
+                log.warning(f"Failed to write card {key} to disk cache", exc_info=True)
+                return
+            if self.max_disk > 0:
+                with self.lock:
+                    if self.disk_usage is not None:
+                        self.disk_usage += len(data)
+                    over_budget = self.disk_usage is None or self.disk_usage > self.max_disk
+                if over_budget:
+                    self.prune_disk()
+
+    def prune_disk(self):
+        """
+        Remove the oldest cards from disk until the disk tier is back under its budget. This
+        scans the whole directory, and is done by a single thread at a time.
+        """
+        if not self.directory or self.max_disk <= 0:
+            return
+        if not self.prune_lock.acquire(blocking=False):
+            return
+        try:
+            files: list[tuple[int, int, Path]] = []
+            for path in self.directory.glob("*/*.card"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue  # removed by another process
+                files.append((stat.st_mtime_ns, stat.st_size, path))
+            total = sum(x[1] for x in files)
+            removed = 0
+            if total > self.max_disk:
+                files.sort()
+                for _, size, path in files:
+                    if total <= self.max_disk * DISK_PRUNE_TARGET:
+                        break
+                    path.unlink(missing_ok=True)
+                    total -= size
+                    removed += 1
+                log.info(f"Removed {removed} cards from the disk cache to stay under its budget.")
+            with self.lock:
+                self.disk_usage = total
+        except OSError:
+            log.warning("Failed to prune the disk cache", exc_info=True)
+        finally:
+            self.prune_lock.release()
+
+    def clear(self):
+        """
+        Clear the memory tier. The disk tier is left untouched.
+        """
+        if self.memory is not None:
+            with self.lock:
+                # replace rather than clear, clearing would count as evictions
+                self.memory = _EvictionCountingCache(maxsize=self.memory.maxsize, getsizeof=len)
+
+
+_card_cache: CardCache | None = None
+
+
+def get_card_cache() -> CardCache:
+    """
+    Return the process-wide card cache, creating it from the settings on first call.
+    """
+    global _card_cache
+    if _card_cache is None:
+        _card_cache = CardCache(
+            settings.card_cache_memory * 1024 * 1024,
+            Path(settings.card_cache_directory) if settings.card_cache_directory else None,
+            settings.card_cache_disk_size * 1024 * 1024,
+        )
+    return _card_cache
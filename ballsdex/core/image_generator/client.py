@@ -0,0 +1,98 @@
+import asyncio
+import time
+from dataclasses import asdict
+
+import aiohttp
+
+from ballsdex.core.image_generator.image_gen import CardSpec
+from ballsdex.core.image_generator.profiles import CardProfile
+
+
+class RenderServiceError(Exception):
+    pass
+
+
+class RenderServiceUnavailable(RenderServiceError):
+    pass
+
+
+class RenderServiceRejected(RenderServiceError):
+    """
+    The service refused to render a card, because of an invalid spec or a missing asset. This
+    only concerns that card, the service stays available.
+    """
+
+    def __init__(self, status: int, reason: str):
+        super().__init__(f"The render service rejected the card ({status}): {reason}")
+        self.status = status
+        self.reason = reason
+
+
+class RenderServiceClient:
+    """
+    Client of the render service.
+
+    Parameters
+    ----------
+    url: str
+        Either an HTTP URL like "http://localhost:15261", or the path to a unix socket prefixed
+        by "unix:", like "unix:/tmp/ballsdex-render.sock".
+    timeout: float
+        Maximum time in seconds to wait for a card.
+    retry_after: float
+        After a failure, the service is considered unavailable for this number of seconds.
+    """
+
+    def __init__(self, url: str, timeout: float = 10, retry_after: float = 30):
+        self.url = url
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.retry_after = retry_after
+        self.session: aiohttp.ClientSession | None = None
+        self.unavailable_until = 0.0
+
+    def _get_session(self) -> tuple[aiohttp.ClientSession, str]:
+        if self.url.startswith("unix:"):
+            base_url = "http://localhost"
+        else:
+            base_url = self.url.rstrip("/")
+        if self.session is None or self.session.closed:
+            if self.url.startswith("unix:"):
+                connector = aiohttp.UnixConnector(path=self.url.removeprefix("unix:"))
+            else:
+                connector = aiohttp.TCPConnector()
+            self.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self.session, base_url
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self.unavailable_until
+
+    async def render(self, spec: CardSpec, profile: CardProfile) -> bytes:
+        """
+        Render a card using the service, encoded with the given profile.
+
+        Raises
+        ------
+        RenderServiceUnavailable
+            The service could not be reached, timed out or failed with a server error. Further
+            calls will raise immediately until `retry_after` seconds have passed.
+        RenderServiceRejected
+            The service refused this card with a client error.
+        """
+        if not self.available:
+            raise RenderServiceUnavailable("The render service failed recently")
+        session, base_url = self._get_session()
+        try:
+            body = {"spec": asdict(spec), "profile": asdict(profile)}
+            async with session.post(f"{base_url}/render", json=body) as resp:
+                if 400 <= resp.status < 500:
+                    raise RenderServiceRejected(resp.status, await resp.text())
+                resp.raise_for_status()
+                return await resp.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.unavailable_until = time.monotonic() + self.retry_after
+            raise RenderServiceUnavailable("Failed to reach the render service") from e
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
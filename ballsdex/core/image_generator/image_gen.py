@@ -1,14 +1,28 @@
+import json
+import logging
 import os
 import textwrap
+import threading
+from dataclasses import dataclass, fields
 from pathlib import Path
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING, Any, Self
 
-from PIL import Image, ImageDraw, ImageFont, ImageOps
+from cachetools import LRUCache
+from PIL import Image, ImageDraw, ImageFont, ImageStat
+
+from ballsdex.core.image_generator.assets import get_asset_cache, hash_asset
+from ballsdex.core.image_generator.stages import stage
+from ballsdex.settings import settings
 
 if TYPE_CHECKING:
     from ballsdex.core.models import BallInstance
 
+log = logging.getLogger("ballsdex.core.image_generator.image_gen")
+
+# bump this whenever the output of draw_card changes, this invalidates the rendered cards cache
+RENDERER_VERSION = 2
 
+DEFAULT_MEDIA_PATH = "./admin_panel/media/"
 SOURCES_PATH = Path(os.path.dirname(os.path.abspath(__file__)), "./src")
 WIDTH = 1500
 HEIGHT = 2000
@@ -18,6 +32,8 @@ RECTANGLE_HEIGHT = (HEIGHT // 5) * 2
 
 CORNERS = ((34, 261), (1393, 992))
 artwork_size = [b - a for a, b in zip(*CORNERS)]
+ARTWORK_SIZE = (artwork_size[0], artwork_size[1])
+ICON_SIZE = (192, 192)
 
 # ===== TIP =====
 #
@@ -37,109 +53,335 @@ capacity_description_font = ImageFont.truetype(str(SOURCES_PATH / "OpenSans-Semi
 stats_font = ImageFont.truetype(str(SOURCES_PATH / "Bobby Jones Soft.otf"), 130)
 credits_font = ImageFont.truetype(str(SOURCES_PATH / "arial.ttf"), 40)
 
-credits_color_cache = {}
+# credits color of each background, keyed by the hash of the file, saved in the card cache
+# directory if configured to avoid computing them again in other processes
+credits_color_cache: dict[str, tuple[int, int, int, int]] = {}
+credits_color_lock = threading.Lock()
+_credits_color_loaded = False
+
+# pre-rasterized texts of the cards (title, ability name and description) with their position,
+# keyed by the texts and the fonts. They only depend on the ball, so they survive the eviction
+# of base layers, which are keyed by the background too.
+TextSprite = tuple[Image.Image, tuple[int, int]]
+FONTS_KEY = tuple(
+    (font.path, font.size) for font in (title_font, capacity_name_font, capacity_description_font)
+)
+text_sprites_cache: LRUCache[tuple, list[TextSprite]] = LRUCache(
+    maxsize=64 * 1024 * 1024,
+    getsizeof=lambda sprites: sum(x.width * x.height * 4 for x, _ in sprites) or 1,
+)
+text_sprites_lock = threading.Lock()
+
+# static layers of the cards, without the stats, keyed by everything else displayed on the card
+# and the content of the assets. A layer weights around 11MB in memory, the cache is bounded by
+# the base-layer-cache-memory setting, see get_base_layer_cache.
+BaseLayer = tuple[Image.Image, tuple[int, int, int, int]]
+_base_layer_cache: LRUCache[tuple, BaseLayer] | None = None
+base_layer_lock = threading.Lock()
+
+
+@dataclass(frozen=True, slots=True)
+class CardSpec:
+    """
+    Everything displayed on a card. This is detached from the database models, which allows
+    sending it to other processes for rendering.
+
+    Use `CardSpec.from_instance` to build one from a `BallInstance`.
+    """
+
+    title: str
+    capacity_name: str
+    capacity_description: str
+    credits: str
+    special_credits: str | None
+    background: str
+    artwork: str
+    economy_icon: str | None
+    health: int
+    attack: int
+
+    @classmethod
+    def from_instance(cls, ball_instance: "BallInstance") -> Self:
+        ball = ball_instance.countryball
+        special = ball_instance.specialcard
+        special_credits = None
+        if ball_instance.special_card and special and special.credits:
+            special_credits = special.credits
+        economy = ball.cached_economy
+        return cls(
+            title=ball.short_name or ball.country,
+            capacity_name=ball.capacity_name,
+            capacity_description=ball.capacity_description,
+            credits=ball.credits,
+            special_credits=special_credits,
+            background=ball_instance.special_card or ball.cached_regime.background,
+            artwork=ball.collection_card,
+            economy_icon=economy.icon if economy else None,
+            health=ball_instance.health,
+            attack=ball_instance.attack,
+        )
+
+    @property
+    def static_fields(self) -> tuple:
+        """
+        Values of all fields except the stats, which are identical between two instances of
+        the same ball and special.
+        """
+        return tuple(
+            getattr(self, x.name) for x in fields(self) if x.name not in ("health", "attack")
+        )
 
 
-def get_credit_color(image: Image.Image, region: tuple) -> tuple:
-    image = image.crop(region)
-    brightness = sum(image.convert("L").getdata()) / image.width / image.height  # type: ignore
+def get_credit_color(image: Image.Image, region: tuple) -> tuple[int, int, int, int]:
+    brightness = ImageStat.Stat(image.crop(region).convert("L")).mean[0]
     return (0, 0, 0, 255) if brightness > 100 else (255, 255, 255, 255)
 
 
-def draw_card(
-    ball_instance: "BallInstance",
-    media_path: str = "./admin_panel/media/",
+def _get_credits_color_file() -> Path | None:
+    if not settings.card_cache_directory:
+        return None
+    return Path(settings.card_cache_directory, "credits_colors.json")
+
+
+def _load_credits_colors():
+    global _credits_color_loaded
+    _credits_color_loaded = True
+    path = _get_credits_color_file()
+    if path is None:
+        return
+    try:
+        data = json.loads(path.read_text())
+    except FileNotFoundError:
+        return
+    except (OSError, ValueError):
+        log.warning("Failed to read the credits colors file", exc_info=True)
+        return
+    credits_color_cache.update({key: tuple(value) for key, value in data.items()})
+
+
+def _save_credits_colors():
+    path = _get_credits_color_file()
+    if path is None:
+        return
+    # other processes write this file too, keep the colors they saved since it was loaded
+    try:
+        saved = json.loads(path.read_text())
+    except FileNotFoundError:
+        saved = {}
+    except (OSError, ValueError):
+        log.warning("Failed to read the credits colors file", exc_info=True)
+        saved = {}
+    for key, value in saved.items():
+        credits_color_cache.setdefault(key, tuple(value))
+    # write then rename to never expose a partial file to other processes
+    tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path.write_text(json.dumps(credits_color_cache))
+        os.replace(tmp_path, path)
+    except OSError:
+        log.warning("Failed to write the credits colors file", exc_info=True)
+        tmp_path.unlink(missing_ok=True)
+
+
+def get_background_credits_color(path: str, background: Image.Image) -> tuple[int, int, int, int]:
+    """
+    Return the color of the credits for the given background, black or white depending on the
+    brightness of the bottom of the image.
+    """
+    key = hash_asset(path)
+    with credits_color_lock:
+        if not _credits_color_loaded:
+            _load_credits_colors()
+        if key in credits_color_cache:
+            return credits_color_cache[key]
+        credits_color_cache[key] = get_credit_color(
+            background, (0, int(background.height * 0.8), background.width, background.height)
+        )
+        _save_credits_colors()
+        return credits_color_cache[key]
+
+
+def _rasterize_text(
+    xy: tuple[int, int], text: str, font: ImageFont.FreeTypeFont, **kwargs
+) -> TextSprite | None:
+    """
+    Draw a text on a transparent layer cropped to its bounding box, to paste with
+    `Image.alpha_composite` at the returned position.
+
+    This is not pixel-identical to drawing the text directly: the antialiased edges are blended
+    differently and can be off by a few levels per channel, more where the background is
+    translucent. The difference isn't visible on the cards.
+    """
+    left, top, right, bottom = font.getbbox(text, stroke_width=kwargs.get("stroke_width", 0))
+    if right <= left or bottom <= top:
+        return None
+    layer = Image.new("RGBA", (right - left, bottom - top))
+    ImageDraw.Draw(layer).text((-left, -top), text, font=font, **kwargs)
+    return layer, (xy[0] + left, xy[1] + top)
+
+
+def _get_text_sprites(spec: CardSpec) -> list[TextSprite]:
+    """
+    Return the title, ability name and description of a card, wrapped and rasterized.
+    """
+    key = (spec.title, spec.capacity_name, spec.capacity_description, FONTS_KEY)
+    with text_sprites_lock:
+        if key in text_sprites_cache:
+            return text_sprites_cache[key]
+
+    sprites = [
+        _rasterize_text(
+            (50, 20), spec.title, title_font, stroke_width=2, stroke_fill=(0, 0, 0, 255)
+        )
+    ]
+
+    cap_name = textwrap.wrap(f"Ability: {spec.capacity_name}", width=26)
+
+    for i, line in enumerate(cap_name):
+        sprites.append(
+            _rasterize_text(
+                (100, 1050 + 100 * i),
+                line,
+                capacity_name_font,
+                fill=(230, 230, 230, 255),
+                stroke_width=2,
+                stroke_fill=(0, 0, 0, 255),
+            )
+        )
+    for i, line in enumerate(textwrap.wrap(spec.capacity_description, width=32)):
+        sprites.append(
+            _rasterize_text(
+                (60, 1100 + 100 * len(cap_name) + 80 * i),
+                line,
+                capacity_description_font,
+                stroke_width=1,
+                stroke_fill=(0, 0, 0, 255),
+            )
+        )
+
+    result = [x for x in sprites if x is not None]
+    with text_sprites_lock:
+        text_sprites_cache[key] = result
+    return result
+
+
+def get_base_layer_cache() -> LRUCache[tuple, BaseLayer]:
+    """
+    Return the process-wide cache of base layers, creating it from the settings on first call.
+    """
+    global _base_layer_cache
+    if _base_layer_cache is None:
+        _base_layer_cache = LRUCache(
+            maxsize=max(settings.base_layer_cache_memory * 1024 * 1024, 1),
+            getsizeof=lambda layer: layer[0].width * layer[0].height * 4,
+        )
+    return _base_layer_cache
+
+
+def _get_base_layer(spec: CardSpec, media_path: str) -> BaseLayer:
+    """
+    Return the static part of a card (background, texts, artwork, icon and credits) along with
+    the color to use for the credits. Everything here is identical between two instances of the
+    same ball and special, only the stats change, so the result is cached.
+
+    Like the rendered cards cache, the key includes the content of the assets: this cache lives
+    in the renderer processes and the render service too, where `clear_cache` is never called.
+    """
+    cache = get_base_layer_cache()
+    assets = (spec.background, spec.artwork, spec.economy_icon)
+    key = (*spec.static_fields, *(hash_asset(media_path + x) if x else None for x in assets))
+    with base_layer_lock:
+        if key in cache:
+            return cache[key]
+
+    special_credits = ""
+    if spec.special_credits:
+        special_credits += f" • Special Author: {spec.special_credits}"
+    assets = get_asset_cache()
+    background = assets.get(media_path + spec.background)
+    credits_color = get_background_credits_color(media_path + spec.background, background)
+    with stage("text"):
+        sprites = _get_text_sprites(spec)
+
+    with stage("paste"):
+        # assets are shared, copy the background before drawing
+        image = background.copy()
+        for sprite, position in sprites:
+            image.alpha_composite(sprite, position)
+
+    with stage("text"):
+        draw = ImageDraw.Draw(image)
+        draw.text(
+            (30, 1870),
+            # Modifying the line below is breaking the licence as you are removing credits
+            # If you don't want to receive a DMCA, just don't
+            f"Created by El Laggron{special_credits}\n" f"Artwork author: {spec.credits}",
+            font=credits_font,
+            fill=credits_color,
+            stroke_width=0,
+            stroke_fill=(255, 255, 255, 255),
+        )
+
+    artwork = assets.get(media_path + spec.artwork, ARTWORK_SIZE)
+    icon = assets.get(media_path + spec.economy_icon, ICON_SIZE) if spec.economy_icon else None
+    with stage("paste"):
+        image.paste(artwork, CORNERS[0])
+        if icon:
+            image.paste(icon, (1200, 30), mask=icon)
+
+    layer = (image, credits_color)
+    if cache.getsizeof(layer) <= cache.maxsize:
+        with base_layer_lock:
+            cache[key] = layer
+    return layer
+
+
+def clear_cache():
+    """
+    Drop all cached base layers and texts. This must be called whenever balls, regimes,
+    economies or specials are reloaded, otherwise edits will not reflect on the cards.
+    """
+    with base_layer_lock:
+        get_base_layer_cache().clear()
+    with text_sprites_lock:
+        text_sprites_cache.clear()
+
+
+def render_card(
+    spec: CardSpec, media_path: str = DEFAULT_MEDIA_PATH
 ) -> tuple[Image.Image, dict[str, Any]]:
-    ball = ball_instance.countryball
     ball_health = (237, 115, 101, 255)
-    ball_credits = ball.credits
-    special_credits = ""
-    card_name = ball.cached_regime.name
-    if special_image := ball_instance.special_card:
-        card_name = getattr(ball_instance.specialcard, "name", card_name)
-        image = Image.open(media_path + special_image)
-        if ball_instance.specialcard and ball_instance.specialcard.credits:
-            special_credits += f" • Special Author: {ball_instance.specialcard.credits}"
-    else:
-        image = Image.open(media_path + ball.cached_regime.background)
-    image = image.convert("RGBA")
-    icon = (
-        Image.open(media_path + ball.cached_economy.icon).convert("RGBA")
-        if ball.cached_economy
-        else None
-    )
-
-    draw = ImageDraw.Draw(image)
-    draw.text(
-        (50, 20),
-        ball.short_name or ball.country,
-        font=title_font,
-        stroke_width=2,
-        stroke_fill=(0, 0, 0, 255),
-    )
-
-    cap_name = textwrap.wrap(f"Ability: {ball.capacity_name}", width=26)
+    base_layer, _ = _get_base_layer(spec, media_path)
+    with stage("paste"):
+        # the cached layer is shared, never draw on it directly
+        image = base_layer.copy()
 
-    for i, line in enumerate(cap_name):
+    with stage("text"):
+        draw = ImageDraw.Draw(image)
         draw.text(
-            (100, 1050 + 100 * i),
-            line,
-            font=capacity_name_font,
-            fill=(230, 230, 230, 255),
-            stroke_width=2,
+            (320, 1670),
+            str(spec.health),
+            font=stats_font,
+            fill=ball_health,
+            stroke_width=1,
             stroke_fill=(0, 0, 0, 255),
         )
-    for i, line in enumerate(textwrap.wrap(ball.capacity_description, width=32)):
         draw.text(
-            (60, 1100 + 100 * len(cap_name) + 80 * i),
-            line,
-            font=capacity_description_font,
+            (1120, 1670),
+            str(spec.attack),
+            font=stats_font,
+            fill=(252, 194, 76, 255),
             stroke_width=1,
             stroke_fill=(0, 0, 0, 255),
+            anchor="ra",
         )
 
-    draw.text(
-        (320, 1670),
-        str(ball_instance.health),
-        font=stats_font,
-        fill=ball_health,
-        stroke_width=1,
-        stroke_fill=(0, 0, 0, 255),
-    )
-    draw.text(
-        (1120, 1670),
-        str(ball_instance.attack),
-        font=stats_font,
-        fill=(252, 194, 76, 255),
-        stroke_width=1,
-        stroke_fill=(0, 0, 0, 255),
-        anchor="ra",
-    )
-    if card_name in credits_color_cache:
-        credits_color = credits_color_cache[card_name]
-    else:
-        credits_color = get_credit_color(
-            image, (0, int(image.height * 0.8), image.width, image.height)
-        )
-        credits_color_cache[card_name] = credits_color
-    draw.text(
-        (30, 1870),
-        # Modifying the line below is breaking the licence as you are removing credits
-        # If you don't want to receive a DMCA, just don't
-        f"Created by El Laggron{special_credits}\n" f"Artwork author: {ball_credits}",
-        font=credits_font,
-        fill=credits_color,
-        stroke_width=0,
-        stroke_fill=(255, 255, 255, 255),
-    )
-
-    artwork = Image.open(media_path + ball.collection_card).convert("RGBA")
-    image.paste(ImageOps.fit(artwork, artwork_size), CORNERS[0])  # type: ignore
-
-    if icon:
-        icon = ImageOps.fit(icon, (192, 192))
-        image.paste(icon, (1200, 30), mask=icon)
-        icon.close()
-    artwork.close()
-
     return image, {"format": "WEBP"}
+
+
+def draw_card(
+    ball_instance: "BallInstance",
+    media_path: str = DEFAULT_MEDIA_PATH,
+) -> tuple[Image.Image, dict[str, Any]]:
+    return render_card(CardSpec.from_instance(ball_instance), media_path)
@@ -0,0 +1,101 @@
+from dataclasses import dataclass, fields
+from typing import Any
+
+from PIL import Image
+
+from ballsdex.settings import settings
+
+
+@dataclass(frozen=True, slots=True)
+class CardProfile:
+    """
+    Defines how a rendered card is encoded.
+
+    Attributes
+    ----------
+    name: str
+        Name of the profile, used in config.yml and in metrics.
+    format: str
+        Image format understood by Pillow, "WEBP", "PNG" or "JPEG".
+    quality: int
+        Quality of the lossy formats, from 0 to 100.
+    method: int
+        WEBP only, compression effort from 0 (fast) to 6 (smallest).
+    lossless: bool
+        WEBP only, use lossless compression.
+    scale: float
+        Factor applied to the dimensions of the card before encoding.
+    """
+
+    name: str
+    format: str = "WEBP"
+    quality: int = 80
+    method: int = 4
+    lossless: bool = False
+    scale: float = 1.0
+
+    @property
+    def extension(self) -> str:
+        return "jpg" if self.format == "JPEG" else self.format.lower()
+
+    @property
+    def content_type(self) -> str:
+        return f"image/{self.format.lower()}"
+
+    def save_kwargs(self) -> dict[str, Any]:
+        if self.format == "WEBP":
+            return {
+                "format": "WEBP",
+                "quality": self.quality,
+                "method": self.method,
+                "lossless": self.lossless,
+            }
+        if self.format == "JPEG":
+            return {"format": "JPEG", "quality": self.quality}
+        return {"format": self.format}
+
+    def apply(self, image: Image.Image) -> Image.Image:
+        """
+        Return the image resized and converted as needed by this profile.
+        """
+        if self.scale != 1:
+            image = image.resize(
+                (round(image.width * self.scale), round(image.height * self.scale)),
+                Image.Resampling.LANCZOS,
+            )
+        if self.format == "JPEG" and image.mode != "RGB":
+            image = image.convert("RGB")
+        return image
+
+
+# the full profile matches Pillow's default WEBP settings
+DEFAULT_PROFILES = {
+    "full": CardProfile("full"),
+    "compact": CardProfile("compact", quality=75, method=6, scale=0.5),
+    "archival": CardProfile("archival", lossless=True, method=6),
+}
+
+
+def get_profile(name: str) -> CardProfile:
+    """
+    Return the profile with the given name, as configured in config.yml or from the defaults.
+
+    Raises
+    ------
+    ValueError
+        No profile exists with this name.
+    """
+    if options := settings.card_profiles.get(name):
+        allowed = {x.name for x in fields(CardProfile)} - {"name"}
+        values = {
+            key.replace("-", "_"): value
+            for key, value in options.items()
+            if key.replace("-", "_") in allowed
+        }
+        if "format" in values:
+            values["format"] = values["format"].upper()
+        return CardProfile(name, **values)
+    try:
+        return DEFAULT_PROFILES[name]
+    except KeyError:
+        raise ValueError(f'Unknown card profile "{name}"') from None
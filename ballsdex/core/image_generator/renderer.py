@@ -0,0 +1,312 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from typing import TYPE_CHECKING, Any, Iterable
+
+from PIL import Image
+
+from ballsdex.core.image_generator.assets import get_asset_cache
+from ballsdex.core.image_generator.card_cache import card_cache_key, get_card_cache
+from ballsdex.core.image_generator.client import (
+    RenderServiceClient,
+    RenderServiceRejected,
+    RenderServiceUnavailable,
+)
+from ballsdex.core.image_generator.image_gen import (
+    ARTWORK_SIZE,
+    DEFAULT_MEDIA_PATH,
+    ICON_SIZE,
+    CardSpec,
+    render_card,
+)
+from ballsdex.core.image_generator.profiles import CardProfile
+from ballsdex.core.image_generator.stages import stage
+from ballsdex.core.metrics import (
+    card_encode_time,
+    card_encoded_size,
+    card_render_queue_wait,
+    card_render_time,
+)
+from ballsdex.settings import settings
+
+if TYPE_CHECKING:
+    from ballsdex.core.models import Ball, Economy, Regime, Special
+
+log = logging.getLogger("ballsdex.core.image_generator.renderer")
+
+_worker_media_path = DEFAULT_MEDIA_PATH
+
+
+def encode_card(
+    image: Image.Image, kwargs: dict[str, Any], profile: CardProfile
+) -> tuple[bytes, float]:
+    """
+    Encode a rendered card with the given profile.
+
+    Returns
+    -------
+    tuple[bytes, float]
+        The encoded image and the time spent encoding it.
+    """
+    start = time.perf_counter()
+    with stage("encode"):
+        image = profile.apply(image)
+        buffer = BytesIO()
+        image.save(buffer, **(kwargs | profile.save_kwargs()))
+    return buffer.getvalue(), time.perf_counter() - start
+
+
+def observe_encoding(profile: CardProfile, data: bytes, duration: float):
+    card_encoded_size.labels(profile=profile.name).observe(len(data))
+    card_encode_time.labels(profile=profile.name).observe(duration)
+
+
+def render_to_bytes(
+    spec: CardSpec, profile: CardProfile, media_path: str = DEFAULT_MEDIA_PATH
+) -> tuple[bytes, float]:
+    """
+    Render a card and encode it, without going through the cache.
+
+    Returns
+    -------
+    tuple[bytes, float]
+        The encoded image and the time spent encoding it.
+    """
+    image, kwargs = render_card(spec, media_path)
+    result = encode_card(image, kwargs, profile)
+    image.close()
+    return result
+
+
+def render_cached(
+    spec: CardSpec, profile: CardProfile, media_path: str = DEFAULT_MEDIA_PATH
+) -> bytes:
+    """
+    Render a card in the current thread, using the rendered cards cache.
+    """
+    cache = get_card_cache()
+    key = card_cache_key(spec, profile, media_path) if cache.enabled else None
+    if key and (data := cache.get(key)) is not None:
+        return data
+    data, duration = render_to_bytes(spec, profile, media_path)
+    observe_encoding(profile, data, duration)
+    if key:
+        cache.set(key, data)
+    return data
+
+
+def _lookup_cached(
+    spec: CardSpec, profile: CardProfile, media_path: str
+) -> tuple[str | None, bytes | None]:
+    cache = get_card_cache()
+    key = card_cache_key(spec, profile, media_path) if cache.enabled else None
+    return key, cache.get(key) if key else None
+
+
+def _init_worker(
+    media_path: str,
+    asset_cache_memory: int,
+    base_layer_cache_memory: int,
+    card_cache_directory: str | None,
+):
+    global _worker_media_path
+    _worker_media_path = media_path
+    # config.yml isn't read in this process, forward the values we need
+    settings.asset_cache_memory = asset_cache_memory
+    settings.base_layer_cache_memory = base_layer_cache_memory
+    settings.card_cache_directory = card_cache_directory
+    # fonts are loaded once when importing image_gen, which is already done at this point
+    log.debug("Card renderer process started")
+
+
+def _render_in_worker(spec: CardSpec, profile: CardProfile) -> tuple[bytes, float, float, float]:
+    # time.monotonic is system-wide on Linux, the parent process can compare it with its own
+    start = time.monotonic()
+    data, encode_time = render_to_bytes(spec, profile, _worker_media_path)
+    return data, start, time.monotonic() - start, encode_time
+
+
+def _preload_in_worker(assets: list[tuple[str, tuple[int, int] | None]]):
+    get_asset_cache().preload(assets)
+
+
+class CardRenderer:
+    """
+    A long-lived pool of processes rendering cards, keeping the CPU-heavy PIL work out of the
+    bot's process and away from the event loop.
+
+    The rendered cards cache is checked in the bot's process before submitting anything. If a
+    render service is configured, cards are requested from it first, and the local processes
+    are only used as a fallback when the service is unavailable.
+
+    Parameters
+    ----------
+    workers: int
+        Number of renderer processes.
+    queue_size: int
+        Number of cards that can be waiting for a free process. Once full, `render` calls wait
+        for a slot before submitting their card.
+    media_path: str
+        Path to the directory containing the uploaded assets.
+    service_url: str | None
+        URL of the render service, see `RenderServiceClient`.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        queue_size: int,
+        media_path: str = DEFAULT_MEDIA_PATH,
+        service_url: str | None = None,
+    ):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.media_path = media_path
+        self.pool: ProcessPoolExecutor | None = None
+        self.service = RenderServiceClient(service_url) if service_url else None
+        self.slots = asyncio.Semaphore(workers + queue_size)
+
+    def start(self):
+        # spawn fresh interpreters, forking the bot's process with its threads is unsafe
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(
+                self.media_path,
+                settings.asset_cache_memory,
+                settings.base_layer_cache_memory,
+                settings.card_cache_directory,
+            ),
+        )
+        log.info(f"Card renderer started with {self.workers} processes.")
+
+    def list_assets(
+        self,
+        balls: Iterable["Ball"],
+        regimes: Iterable["Regime"],
+        economies: Iterable["Economy"],
+        specials: Iterable["Special"],
+    ) -> list[tuple[str, tuple[int, int] | None]]:
+        """
+        List the assets used by the cards and the size they are fitted to, most used first.
+        """
+        assets: list[tuple[str, tuple[int, int] | None]] = []
+        assets.extend((self.media_path + x.background, None) for x in regimes)
+        assets.extend((self.media_path + x.icon, ICON_SIZE) for x in economies)
+        assets.extend((self.media_path + x.background, None) for x in specials if x.background)
+        assets.extend((self.media_path + x.collection_card, ARTWORK_SIZE) for x in balls)
+        return assets
+
+    async def preload(self, assets: list[tuple[str, tuple[int, int] | None]]):
+        """
+        Decode the given assets in advance, in the processes rendering the cards: the renderer
+        processes if they are started, this process otherwise.
+
+        Each renderer process is sent a preload task, but there is no guarantee that the tasks
+        are evenly distributed. Assets that weren't preloaded will be loaded on first use.
+        """
+        loop = asyncio.get_running_loop()
+        if self.pool is None:
+            await loop.run_in_executor(None, get_asset_cache().preload, assets)
+            return
+        await asyncio.gather(
+            *(
+                loop.run_in_executor(self.pool, _preload_in_worker, assets)
+                for _ in range(self.workers)
+            )
+        )
+
+    async def shutdown(self):
+        if self.service:
+            await self.service.close()
+        if self.pool is None:
+            return
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        self.pool = None
+        log.info("Card renderer stopped.")
+
+    def _restart_pool(self, broken: ProcessPoolExecutor):
+        # concurrent renders all see the same broken pool, only replace it once
+        if self.pool is not broken:
+            return
+        log.error("A card renderer process died, restarting the pool.")
+        broken.shutdown(wait=False, cancel_futures=True)
+        self.start()
+
+    async def _render_in_pool(
+        self, pool: ProcessPoolExecutor, spec: CardSpec, profile: CardProfile
+    ) -> tuple[bytes, float]:
+        loop = asyncio.get_running_loop()
+        submitted = time.monotonic()
+        try:
+            async with self.slots:
+                data, start, duration, encode_time = await loop.run_in_executor(
+                    pool, _render_in_worker, spec, profile
+                )
+        except BrokenProcessPool:
+            self._restart_pool(pool)
+            # this card may be the one killing the processes, don't send it to the new pool
+            return await loop.run_in_executor(
+                None, render_to_bytes, spec, profile, self.media_path
+            )
+        card_render_queue_wait.observe(start - submitted)
+        card_render_time.observe(duration)
+        return data, encode_time
+
+    async def render(self, spec: CardSpec, profile: CardProfile) -> bytes:
+        """
+        Render a card and return the image encoded with the given profile.
+
+        If the render service is unavailable, the local pool is used instead, and if the pool
+        isn't running, this falls back to rendering in a thread.
+        """
+        data, _ = await self.fetch(spec, profile)
+        return data
+
+    async def fetch(self, spec: CardSpec, profile: CardProfile) -> tuple[bytes, bool]:
+        """
+        Same as `render`, also returning whether the card was found in the cache.
+        """
+        loop = asyncio.get_running_loop()
+        cache = get_card_cache()
+        key = None
+        if cache.enabled:
+            # hashing the assets and reading the disk tier block, keep them off the event loop
+            key, data = await loop.run_in_executor(
+                None, _lookup_cached, spec, profile, self.media_path
+            )
+            if data is not None:
+                return data, True
+
+        if self.service and self.service.available:
+            try:
+                data = await self.service.render(spec, profile)
+            except RenderServiceUnavailable:
+                log.warning(
+                    "Render service unavailable, rendering locally for the next "
+                    f"{self.service.retry_after} seconds.",
+                    exc_info=True,
+                )
+            except RenderServiceRejected as e:
+                log.warning(f"{e}, rendering it locally.")
+            else:
+                if key:
+                    await loop.run_in_executor(None, cache.set, key, data)
+                return data, False
+
+        if self.pool is None:
+            data, encode_time = await loop.run_in_executor(
+                None, render_to_bytes, spec, profile, self.media_path
+            )
+        else:
+            data, encode_time = await self._render_in_pool(self.pool, spec, profile)
+        observe_encoding(profile, data, encode_time)
+
+        if key:
+            await loop.run_in_executor(None, cache.set, key, data)
+        return data, False
@@ -0,0 +1,121 @@
+"""
+A standalone HTTP service rendering cards, allowing multiple bot processes and the admin panel
+to share the same renderer processes and rendered cards cache.
+
+Start it with "python3 -m ballsdex.core.image_generator.service", then set the
+"rendering.service-url" option of config.yml. Use "--help" to view all options.
+"""
+
+import argparse
+import logging
+import os
+from pathlib import Path
+
+from aiohttp import web
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from ballsdex.core.image_generator.image_gen import DEFAULT_MEDIA_PATH, CardSpec
+from ballsdex.core.image_generator.profiles import CardProfile
+from ballsdex.core.image_generator.renderer import CardRenderer
+from ballsdex.settings import read_settings, settings
+
+log = logging.getLogger("ballsdex.core.image_generator.service")
+
+
+class RenderService:
+    """
+    The aiohttp application of the render service. Cards are rendered by a `CardRenderer`, which
+    also stores them in the cache configured in config.yml.
+    """
+
+    def __init__(self, renderer: CardRenderer):
+        self.renderer = renderer
+        self.media_root = os.path.realpath(renderer.media_path)
+        self.app = web.Application(logger=log)
+        self.app.add_routes(
+            (
+                web.post("/render", self.render),
+                web.get("/health", self.health),
+                web.get("/metrics", self.metrics),
+            )
+        )
+        self.app.on_startup.append(self.on_startup)
+        self.app.on_cleanup.append(self.on_cleanup)
+
+    async def on_startup(self, app: web.Application):
+        if self.renderer.workers > 0:
+            self.renderer.start()
+
+    async def on_cleanup(self, app: web.Application):
+        await self.renderer.shutdown()
+
+    async def health(self, request: web.Request) -> web.Response:
+        return web.Response(text="OK")
+
+    async def metrics(self, request: web.Request) -> web.Response:
+        response = web.Response(body=generate_latest())
+        response.content_type = CONTENT_TYPE_LATEST
+        return response
+
+    def is_media_file(self, path: str) -> bool:
+        """
+        Whether the asset path of a spec resolves to a file inside the media directory.
+        """
+        resolved = os.path.realpath(self.renderer.media_path + path)
+        return os.path.commonpath((resolved, self.media_root)) == self.media_root
+
+    async def render(self, request: web.Request) -> web.Response:
+        try:
+            body = await request.json()
+            spec = CardSpec(**body["spec"])
+            profile = CardProfile(**body["profile"])
+        except (ValueError, TypeError, KeyError):
+            raise web.HTTPBadRequest(text="Invalid card specification")
+        assets = (spec.background, spec.artwork, spec.economy_icon)
+        if not all(self.is_media_file(x) for x in assets if x):
+            raise web.HTTPBadRequest(text="Asset outside of the media directory")
+        try:
+            data = await self.renderer.render(spec, profile)
+        except FileNotFoundError as e:
+            raise web.HTTPUnprocessableEntity(text=f"Missing asset: {e.filename}")
+        return web.Response(body=data, content_type=profile.content_type)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="BallsDex render service", description="Render cards for the bot and admin panel"
+    )
+    parser.add_argument(
+        "--config-file", type=Path, help="Set the path to config.yml", default=Path("./config.yml")
+    )
+    parser.add_argument(
+        "--host",
+        default="localhost",
+        help="Host to bind to. The service has no authentication, only expose it to the bot "
+        "and admin panel",
+    )
+    parser.add_argument("--port", type=int, default=15261, help="Port to bind to")
+    parser.add_argument("--socket", help="Path to a unix socket to bind to instead of a port")
+    parser.add_argument(
+        "--media-path", default=DEFAULT_MEDIA_PATH, help="Path to the uploaded assets"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        format="[{asctime}] {levelname} {name}: {message}",
+        datefmt="%Y-%m-%d %H:%M:%S",
+        style="{",
+        level=logging.INFO,
+    )
+    read_settings(args.config_file)
+
+    renderer = CardRenderer(settings.render_workers, settings.render_queue_size, args.media_path)
+    service = RenderService(renderer)
+    if args.socket:
+        web.run_app(service.app, path=args.socket)
+    else:
+        web.run_app(service.app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
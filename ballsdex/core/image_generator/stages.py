@@ -0,0 +1,44 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+# stages of the rendering pipeline, used by the benchmarks
+STAGES = ("open", "convert", "text", "fit", "paste", "encode")
+
+_timings: ContextVar[dict[str, float] | None] = ContextVar("render_stage_timings", default=None)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """
+    Attribute the time spent in this block to a stage of the rendering. This does nothing
+    unless called within `record_stages`.
+    """
+    timings = _timings.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0) + time.perf_counter() - start
+
+
+@contextmanager
+def record_stages() -> Iterator[dict[str, float]]:
+    """
+    Record the time spent in each stage of the renders done within this block.
+
+    Yields
+    ------
+    dict[str, float]
+        Seconds spent per stage, filled as the rendering progresses.
+    """
+    timings: dict[str, float] = {}
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Iterable
+
+from tortoise.functions import Count
+from tortoise.timezone import now as tortoise_now
+
+from ballsdex.core.image_generator.image_gen import CardSpec
+from ballsdex.core.image_generator.profiles import CardProfile
+from ballsdex.core.models import BallInstance, balls, specials
+
+log = logging.getLogger("ballsdex.core.image_generator.warmup")
+
+# (ball_id, special_id, health_bonus, attack_bonus)
+Combination = tuple[int, int | None, int, int]
+
+
+@dataclass(slots=True)
+class WarmupResult:
+    """
+    Outcome of a warm-up.
+
+    Attributes
+    ----------
+    total: int
+        Number of cards that were requested.
+    rendered: int
+        Number of cards rendered and stored in the cache.
+    cached: int
+        Number of cards that were already in the cache.
+    failed: int
+        Number of cards that could not be rendered.
+    elapsed: float
+        Duration of the warm-up, in seconds.
+    """
+
+    total: int
+    rendered: int = 0
+    cached: int = 0
+    failed: int = 0
+    elapsed: float = 0
+
+    @property
+    def completed(self) -> bool:
+        """
+        `False` if the time budget ran out before all cards were processed.
+        """
+        return self.rendered + self.cached + self.failed == self.total
+
+    @property
+    def throughput(self) -> float:
+        """
+        Number of cards rendered per second.
+        """
+        return self.rendered / self.elapsed if self.elapsed else 0
+
+    def __str__(self) -> str:
+        text = (
+            f"{self.rendered} cards rendered in {self.elapsed:.1f}s "
+            f"({self.throughput:.1f} cards/s), {self.cached} already cached, "
+            f"{self.failed} failed"
+        )
+        if not self.completed:
+            remaining = self.total - self.rendered - self.cached - self.failed
+            text += f", {remaining} skipped (time budget exceeded)"
+        return text
+
+
+async def popular_combinations(limit: int) -> list[Combination]:
+    """
+    Return the most owned combinations of ball, special and bonuses, most popular first.
+
+    The cards of the ongoing special events are included too, since nobody owns them when the
+    event starts: each popular ball is followed by its cards for the ongoing events, so that
+    they fit within the limit with the most popular combinations.
+    """
+    rows = (
+        await BallInstance.annotate(count=Count("id"))
+        .group_by("ball_id", "special_id", "health_bonus", "attack_bonus")
+        .order_by("-count")
+        .limit(limit)
+        .values_list("ball_id", "special_id", "health_bonus", "attack_bonus")
+    )
+    popular: list[Combination] = list(dict.fromkeys(rows))
+
+    current_time = tortoise_now()
+    ongoing = [
+        x
+        for x in specials.values()
+        if x.background
+        and (x.start_date is None or x.start_date <= current_time)
+        and (x.end_date is None or current_time <= x.end_date)
+    ]
+    combinations: dict[Combination, None] = {}
+    seen_balls: set[int] = set()
+    for combination in popular:
+        ball_id = combination[0]
+        combinations[combination] = None
+        if ball_id not in seen_balls:
+            seen_balls.add(ball_id)
+            for special in ongoing:
+                combinations.setdefault((ball_id, special.pk, 0, 0), None)
+    return list(combinations)[:limit]
+
+
+def build_spec(combination: Combination) -> CardSpec | None:
+    """
+    Build the card of a combination from the loaded cache, or `None` if it references a ball
+    or special that doesn't exist anymore.
+    """
+    ball_id, special_id, health_bonus, attack_bonus = combination
+    ball = balls.get(ball_id)
+    special = specials.get(special_id) if special_id is not None else None
+    if ball is None or (special_id is not None and special is None):
+        return None
+    instance = BallInstance(
+        ball=ball, special=special, health_bonus=health_bonus, attack_bonus=attack_bonus
+    )
+    return CardSpec.from_instance(instance)
+
+
+async def warm_up(
+    combinations: Iterable[Combination],
+    profile: CardProfile,
+    render: Callable[[CardSpec], Awaitable[tuple[bytes, bool]]],
+    *,
+    concurrency: int = 4,
+    time_budget: float | None = None,
+) -> WarmupResult:
+    """
+    Render the cards of the given combinations so that they are found in the card cache.
+
+    Parameters
+    ----------
+    combinations: Iterable[Combination]
+        The cards to render, usually obtained with `popular_combinations`.
+    profile: CardProfile
+        The profile the cards are encoded with.
+    render: Callable[[CardSpec], Awaitable[tuple[bytes, bool]]]
+        Function returning a card from the cache, or rendering it and storing it in the cache,
+        along with whether it was cached, like `CardRenderer.fetch`.
+    concurrency: int
+        Maximum number of cards rendered at the same time.
+    time_budget: float | None
+        Stop starting new renders after this number of seconds. Renders in progress are
+        awaited.
+
+    Returns
+    -------
+    WarmupResult
+        Counts and throughput of the warm-up.
+    """
+    queue = [spec for x in combinations if (spec := build_spec(x)) is not None]
+    result = WarmupResult(total=len(queue))
+    start = time.monotonic()
+    deadline = start + time_budget if time_budget else None
+    iterator = iter(queue)
+
+    async def worker():
+        for spec in iterator:
+            if deadline and time.monotonic() > deadline:
+                return
+            try:
+                _, cached = await render(spec)
+            except Exception:
+                log.warning(f"Failed to pre-render the card of {spec.title}", exc_info=True)
+                result.failed += 1
+            else:
+                if cached:
+                    result.cached += 1
+                else:
+                    result.rendered += 1
+
+    await asyncio.gather(*(worker() for _ in range(max(concurrency, 1))))
+    result.elapsed = time.monotonic() - start
+    log.info(f"Card warm-up finished: {result}")
+    return result
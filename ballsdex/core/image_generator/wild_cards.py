@@ -0,0 +1,168 @@
+import asyncio
+import io
+import logging
+import threading
+from typing import Iterable, NamedTuple
+
+from cachetools import LRUCache
+from PIL import Image
+
+from ballsdex.core.image_generator.image_gen import DEFAULT_MEDIA_PATH
+from ballsdex.settings import settings
+
+log = logging.getLogger("ballsdex.core.image_generator.wild_cards")
+
+# encoding options for each output format, favoring size since these are sent on every spawn
+ENCODE_OPTIONS: dict[str, dict] = {
+    "PNG": {"optimize": True},
+    "WEBP": {"quality": 90, "method": 4},
+    "JPEG": {"quality": 90, "optimize": True, "progressive": True},
+}
+EXTENSIONS = {"PNG": "png", "WEBP": "webp", "JPEG": "jpg"}
+
+
+class WildCard(NamedTuple):
+    data: bytes
+    extension: str
+
+
+def optimize_wild_card(path: str, max_size: int = 0, format: str | None = None) -> WildCard:
+    """
+    Read a wild card, downscaling it to fit in `max_size` pixels and re-encoding it. The
+    original file is kept if it's smaller, or if it's animated.
+
+    Parameters
+    ----------
+    path: str
+        Path to the image.
+    max_size: int
+        Maximum width and height of the image, 0 to keep its size.
+    format: str | None
+        Format of the output ("PNG", "WEBP" or "JPEG", case-insensitive), defaults to the
+        format of the file.
+    """
+    with open(path, "rb") as file:
+        original = file.read()
+    extension = path.rsplit(".", 1)[-1]
+
+    with Image.open(io.BytesIO(original)) as image:
+        # PIL only knows the format names in upper case
+        output_format = (format or image.format or "").upper()
+        if getattr(image, "is_animated", False) or output_format not in ENCODE_OPTIONS:
+            return WildCard(original, extension)
+        if max_size and max(image.size) > max_size:
+            image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+        if output_format == "JPEG" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        buffer = io.BytesIO()
+        image.save(buffer, output_format, **ENCODE_OPTIONS[output_format])
+
+    if buffer.tell() >= len(original):
+        return WildCard(original, extension)
+    return WildCard(buffer.getvalue(), EXTENSIONS[output_format])
+
+
+class WildCardCache:
+    """
+    An LRU cache of the optimized wild cards, ready to be uploaded with the spawn messages,
+    bounded by the size of the encoded images.
+
+    Entries are never checked against the files, the cache must be cleared when the balls are
+    reloaded.
+
+    Parameters
+    ----------
+    max_memory: int
+        Maximum number of bytes used by the wild cards. 0 disables the cache, wild cards are
+        then optimized on each spawn.
+    max_size: int
+        Maximum width and height of the wild cards, 0 to keep their size.
+    format: str | None
+        Format the wild cards are re-encoded to, defaults to the format of each file.
+    media_path: str
+        Path to the directory containing the uploaded assets.
+    """
+
+    def __init__(
+        self,
+        max_memory: int,
+        max_size: int = 0,
+        format: str | None = None,
+        media_path: str = DEFAULT_MEDIA_PATH,
+    ):
+        self.wild_cards: LRUCache[str, WildCard] = LRUCache(
+            maxsize=max(max_memory, 1), getsizeof=lambda x: len(x.data)
+        )
+        self.enabled = max_memory > 0
+        self.max_size = max_size
+        self.format = format
+        self.media_path = media_path
+        self.lock = threading.Lock()
+
+    def get_sync(self, wild_card: str) -> WildCard:
+        """
+        Return the optimized wild card with the given file name, relative to the media path.
+        """
+        with self.lock:
+            result = self.wild_cards.get(wild_card)
+        if result is not None:
+            return result
+
+        result = optimize_wild_card(self.media_path + wild_card, self.max_size, self.format)
+        if self.enabled and len(result.data) <= self.wild_cards.maxsize:
+            with self.lock:
+                self.wild_cards[wild_card] = result
+        return result
+
+    async def get(self, wild_card: str) -> WildCard:
+        """
+        Return the optimized wild card with the given file name. On a cache miss, the file is
+        read and optimized in a thread.
+        """
+        with self.lock:
+            result = self.wild_cards.get(wild_card)
+        if result is not None:
+            return result
+        return await asyncio.to_thread(self.get_sync, wild_card)
+
+    def preload_sync(self, wild_cards: Iterable[str]):
+        loaded = 0
+        total = 0
+        for wild_card in wild_cards:
+            try:
+                result = self.get_sync(wild_card)
+            except OSError:
+                log.warning(f"Failed to preload wild card {wild_card}", exc_info=True)
+                continue
+            loaded += 1
+            total += len(result.data)
+            if self.wild_cards.currsize + len(result.data) > self.wild_cards.maxsize:
+                break
+        log.info(f"Preloaded {loaded} wild cards ({total / 1024 / 1024:.1f}MB).")
+
+    async def preload(self, wild_cards: Iterable[str]):
+        """
+        Optimize the given wild cards in advance, in a thread. Stops once the cache is full.
+        """
+        await asyncio.to_thread(self.preload_sync, list(wild_cards))
+
+    def clear(self):
+        with self.lock:
+            self.wild_cards.clear()
+
+
+_wild_card_cache: WildCardCache | None = None
+
+
+def get_wild_card_cache() -> WildCardCache:
+    """
+    Return the process-wide wild card cache, creating it from the settings on first call.
+    """
+    global _wild_card_cache
+    if _wild_card_cache is None:
+        _wild_card_cache = WildCardCache(
+            settings.wild_card_cache_memory * 1024 * 1024,
+            settings.wild_card_max_size,
+            settings.wild_card_format,
+        )
+    return _wild_card_cache
@@ -16,6 +16,57 @@ log = logging.getLogger("ballsdex.core.metrics")
 caught_balls = Counter(
     "caught_cb", "Caught countryballs", ["country", "special", "guild_size", "spawn_algo"]
 )
+card_cache_hits = Counter("card_cache_hits", "Rendered cards served from cache", ["tier"])
+card_cache_misses = Counter("card_cache_misses", "Rendered cards that had to be generated")
+card_cache_evictions = Counter(
+    "card_cache_evictions", "Rendered cards evicted from the memory cache"
+)
+card_render_queue_wait = Histogram(
+    "card_render_queue_wait",
+    "Time spent by a card waiting for a free renderer process",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, float("inf")),
+)
+card_encoded_size = Histogram(
+    "card_encoded_size",
+    "Size in bytes of the encoded cards",
+    ["profile"],
+    buckets=(25_000, 50_000, 100_000, 250_000, 500_000, 1_000_000, 2_500_000, float("inf")),
+)
+card_encode_time = Histogram(
+    "card_encode_time",
+    "Time spent encoding a card",
+    ["profile"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, float("inf")),
+)
+card_render_time = Histogram(
+    "card_render_time",
+    "Time spent rendering a card in a renderer process",
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, float("inf")),
+)
+spawn_cooldowns = Gauge("spawn_cooldowns", "Number of guild spawn cooldowns held in memory")
+spawn_cooldown_evictions = Counter(
+    "spawn_cooldown_evictions", "Guild spawn cooldowns evicted from memory", ["reason"]
+)
+catch_latency = Histogram(
+    "catch_latency",
+    "Time spent in each stage of a catch",
+    ["stage"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, float("inf")),
+)
+owned_cache_hits = Counter("owned_cache_hits", "Owned balls of a player served from cache")
+owned_cache_misses = Counter("owned_cache_misses", "Owned balls of a player that were queried")
+spawn_queue_depth = Gauge("spawn_queue_depth", "Number of spawns waiting to be sent")
+spawn_queue_dropped = Counter("spawn_queue_dropped", "Spawns dropped because the queue was full")
+spawn_queue_lag = Histogram(
+    "spawn_queue_lag",
+    "Time spent by a spawn waiting in the queue, including the channel pacing",
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, float("inf")),
+)
+spawn_send_latency = Histogram(
+    "spawn_send_latency",
+    "Time spent sending a spawn message to Discord",
+    buckets=(0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0, float("inf")),
+)
 
 
 class PrometheusServer:
@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from enum import IntEnum
 from io import BytesIO
@@ -12,7 +11,9 @@ from tortoise import exceptions, fields, models, signals, timezone, validators
 from tortoise.contrib.postgres.indexes import PostgreSQLIndex
 from tortoise.expressions import Q
 
-from ballsdex.core.image_generator.image_gen import draw_card
+from ballsdex.core.image_generator.image_gen import CardSpec
+from ballsdex.core.image_generator.profiles import get_profile
+from ballsdex.core.image_generator.renderer import render_cached
 from ballsdex.settings import settings
 
 if TYPE_CHECKING:
@@ -329,16 +330,11 @@ class BallInstance(models.Model):
                     text = f"{emoji} {text}"
         return text
 
-    def draw_card(self) -> BytesIO:
-        image, kwargs = draw_card(self)
-        buffer = BytesIO()
-        image.save(buffer, **kwargs)
-        buffer.seek(0)
-        image.close()
-        return buffer
+    def draw_card(self, profile: str = "full") -> BytesIO:
+        return BytesIO(render_cached(CardSpec.from_instance(self), get_profile(profile)))
 
     async def prepare_for_message(
-        self, interaction: discord.Interaction["BallsDexBot"]
+        self, interaction: discord.Interaction["BallsDexBot"], profile: str | None = None
     ) -> Tuple[str, discord.File, discord.ui.View]:
         # message content
         trade_content = ""
@@ -376,11 +372,15 @@ class BallInstance(models.Model):
         )
 
         # draw image
-        with ThreadPoolExecutor() as pool:
-            buffer = await interaction.client.loop.run_in_executor(pool, self.draw_card)
+        card_profile = get_profile(profile or settings.message_card_profile)
+        buffer = BytesIO(
+            await interaction.client.card_renderer.render(
+                CardSpec.from_instance(self), card_profile
+            )
+        )
 
         view = discord.ui.View()
-        return content, discord.File(buffer, "card.webp"), view
+        return content, discord.File(buffer, f"card.{card_profile.extension}"), view
 
     async def lock_for_trade(self):
         self.locked = timezone.now()
@@ -456,6 +456,7 @@ class Player(models.Model):
     )
     extra_data = fields.JSONField(default=dict)
     balls: fields.BackwardFKRelation[BallInstance]
+    stats: fields.BackwardOneToOneRelation[PlayerStats]
 
     def __str__(self) -> str:
         return str(self.discord_id)
@@ -587,3 +588,28 @@ class Block(models.Model):
 
     def __str__(self) -> str:
         return str(self.pk)
+
+
+class PlayerStats(models.Model):
+    """
+    Summary of a player's collection and trades, maintained with each catch and trade.
+    Rebuilt by the `backfillstats` command.
+    """
+
+    player_id: int
+    player: fields.OneToOneRelation[Player] = fields.OneToOneField(
+        "models.Player", related_name="stats", pk=True
+    )
+    balls = fields.IntField(default=0, description="Number of ball instances owned")
+    caught_balls = fields.IntField(
+        default=0, description="Number of ball instances owned that were never traded"
+    )
+    special_balls = fields.IntField(
+        default=0, description="Number of ball instances owned with a special"
+    )
+    distinct_balls = fields.IntField(default=0, description="Number of different balls owned")
+    trades = fields.IntField(default=0, description="Number of trades completed")
+    trade_partners = fields.IntField(default=0, description="Number of players traded with")
+
+    def __str__(self) -> str:
+        return str(self.pk)
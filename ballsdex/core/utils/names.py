@@ -0,0 +1,80 @@
+import re
+import unicodedata
+from typing import Iterable
+
+from ballsdex.core.models import Ball
+
+# typographic variants that NFKC keeps, mapped to their ASCII form
+_PUNCTUATION = str.maketrans(
+    {
+        # quotes
+        "\u2018": "'",
+        "\u2019": "'",
+        "\u201a": "'",
+        "\u201b": "'",
+        "\u2032": "'",
+        "\u201c": '"',
+        "\u201d": '"',
+        "\u201e": '"',
+        "\u2033": '"',
+        # hyphens and dashes
+        "\u2010": "-",
+        "\u2011": "-",
+        "\u2012": "-",
+        "\u2013": "-",
+        "\u2014": "-",
+        "\u2212": "-",
+        # zero width characters
+        "\u200b": None,
+        "\u200c": None,
+        "\u200d": None,
+        "\u2060": None,
+        "\ufeff": None,
+    }
+)
+_WHITESPACE = re.compile(r"\s+")
+
+# normalized catch names of each ball, keyed by ball ID
+catch_name_index: dict[int, frozenset[str]] = {}
+
+
+def normalize_name(text: str) -> str:
+    """
+    Normalize a name for comparisons: NFKC and case folded, with typographic quotes and dashes
+    replaced by their ASCII form, and blank characters collapsed to single spaces.
+    """
+    text = unicodedata.normalize("NFKC", text).casefold().translate(_PUNCTUATION)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def build_catch_names(ball: Ball) -> frozenset[str]:
+    """
+    Return the normalized names accepted when catching the given ball: its name, its catch
+    names and its translations.
+    """
+    names = [ball.country]
+    if ball.catch_names:
+        names.extend(ball.catch_names.split(";"))
+    if ball.translations:
+        names.extend(ball.translations.split(";"))
+    return frozenset(x for x in map(normalize_name, names) if x)
+
+
+def index_catch_names(balls: Iterable[Ball]):
+    """
+    Rebuild the index of the catch names. This must be called whenever balls are reloaded.
+    """
+    catch_name_index.clear()
+    for ball in balls:
+        catch_name_index[ball.pk] = build_catch_names(ball)
+
+
+def get_catch_names(ball: Ball) -> frozenset[str]:
+    """
+    Return the normalized catch names of a ball from the index, or build them if the ball
+    isn't indexed.
+    """
+    names = catch_name_index.get(ball.pk)
+    if names is None:
+        names = build_catch_names(ball)
+    return names
@@ -0,0 +1,160 @@
+from collections import Counter
+from typing import Iterable, Iterator
+
+from cachetools import LRUCache, TTLCache
+
+from ballsdex.core.metrics import owned_cache_hits, owned_cache_misses
+from ballsdex.core.models import BallInstance
+from ballsdex.settings import settings
+
+
+def _iter_bits(bitmap: int) -> Iterator[int]:
+    while bitmap:
+        lowest = bitmap & -bitmap
+        yield lowest.bit_length() - 1
+        bitmap ^= lowest
+
+
+class OwnedBalls:
+    """
+    The balls owned by a player, as bitmaps where bit N is set if they own the ball of ID N.
+
+    Attributes
+    ----------
+    balls: int
+        Bitmap of the balls owned, whatever their special.
+    specials: dict[int, int]
+        Bitmap of the balls owned with each special, keyed by special ID.
+    """
+
+    __slots__ = ("balls", "specials")
+
+    def __init__(self):
+        self.balls = 0
+        self.specials: dict[int, int] = {}
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[tuple[int, int | None]]) -> "OwnedBalls":
+        owned = cls()
+        for ball_id, special_id in rows:
+            owned.add(ball_id, special_id)
+        return owned
+
+    def add(self, ball_id: int, special_id: int | None = None):
+        self.balls |= 1 << ball_id
+        if special_id is not None:
+            self.specials[special_id] = self.specials.get(special_id, 0) | 1 << ball_id
+
+    def owns(self, ball_id: int, special_id: int | None = None) -> bool:
+        bitmap = self.balls if special_id is None else self.specials.get(special_id, 0)
+        return bool(bitmap >> ball_id & 1)
+
+    def ids(self, special_id: int | None = None) -> set[int]:
+        """
+        Return the IDs of the balls owned, only those with the given special if specified.
+        """
+        bitmap = self.balls if special_id is None else self.specials.get(special_id, 0)
+        return set(_iter_bits(bitmap))
+
+
+class OwnedBallsCache:
+    """
+    An LRU cache of the balls owned by each player, keyed by Discord ID.
+
+    The cache is written through: new balls must be reported with `add` once saved, and players
+    losing balls (trades, donations, deletions) must be invalidated, since a bitmap can't tell
+    if another instance of the ball is still owned.
+
+    Changes made by other processes (clusters, admin panel) are not seen, entries expire after
+    `ttl` seconds to bound the staleness.
+
+    Parameters
+    ----------
+    max_players: int
+        Maximum number of players cached. 0 disables the cache, balls are then queried on each
+        call.
+    ttl: float
+        Number of seconds after which an entry is reloaded, 0 to never expire entries.
+    """
+
+    def __init__(self, max_players: int, ttl: float = 0):
+        self.players: LRUCache[int, OwnedBalls]
+        if ttl > 0:
+            self.players = TTLCache(maxsize=max(max_players, 1), ttl=ttl)
+        else:
+            self.players = LRUCache(maxsize=max(max_players, 1))
+        self.enabled = max_players > 0
+        # number of loads in progress for each player, and of writes received meanwhile
+        # a load that saw writes may be outdated and is not cached
+        self._loading: Counter[int] = Counter()
+        self._writes: Counter[int] = Counter()
+
+    def _touch(self, discord_id: int):
+        if discord_id in self._loading:
+            self._writes[discord_id] += 1
+
+    async def get(self, discord_id: int) -> OwnedBalls:
+        """
+        Return the balls owned by the player with the given Discord ID, querying them on a
+        cache miss. Disabled balls are included.
+        """
+        owned = self.players.get(discord_id)
+        if owned is not None:
+            owned_cache_hits.inc()
+            return owned
+        owned_cache_misses.inc()
+
+        self._loading[discord_id] += 1
+        writes = self._writes[discord_id]
+        try:
+            rows = await (
+                BallInstance.filter(player__discord_id=discord_id)
+                .distinct()
+                .values_list("ball_id", "special_id")
+            )
+        finally:
+            outdated = self._writes[discord_id] != writes
+            self._loading[discord_id] -= 1
+            if not self._loading[discord_id]:
+                del self._loading[discord_id]
+                del self._writes[discord_id]
+
+        owned = OwnedBalls.from_rows(rows)  # type: ignore
+        if self.enabled and not outdated:
+            self.players[discord_id] = owned
+        return owned
+
+    def add(self, discord_id: int, ball_id: int, special_id: int | None = None):
+        """
+        Report a ball instance newly saved for the player. Must be called after the transaction
+        is committed.
+        """
+        self._touch(discord_id)
+        if owned := self.players.get(discord_id):
+            owned.add(ball_id, special_id)
+
+    def invalidate(self, *discord_ids: int):
+        """
+        Forget the balls of the given players, to call when they lose a ball instance.
+        """
+        for discord_id in discord_ids:
+            self._touch(discord_id)
+            self.players.pop(discord_id, None)
+
+    def clear(self):
+        self.players.clear()
+
+
+_owned_balls_cache: OwnedBallsCache | None = None
+
+
+def get_owned_balls_cache() -> OwnedBallsCache:
+    """
+    Return the process-wide owned balls cache, creating it from the settings on first call.
+    """
+    global _owned_balls_cache
+    if _owned_balls_cache is None:
+        _owned_balls_cache = OwnedBallsCache(
+            settings.owned_balls_cache_size, settings.owned_balls_cache_ttl
+        )
+    return _owned_balls_cache
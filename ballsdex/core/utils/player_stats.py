@@ -0,0 +1,145 @@
+from collections import Counter, defaultdict
+
+from tortoise import Tortoise
+from tortoise.expressions import F, Q
+
+from ballsdex.core.models import BallInstance, Player, PlayerStats, Trade
+
+STAT_FIELDS = (
+    "balls",
+    "caught_balls",
+    "special_balls",
+    "distinct_balls",
+    "trades",
+    "trade_partners",
+)
+
+
+def _refresh_query() -> str:
+    stats_table = PlayerStats._meta.db_table
+    player_table = Player._meta.db_table
+    instance_table = BallInstance._meta.db_table
+    trade_table = Trade._meta.db_table
+    columns = ", ".join(f'"{x}"' for x in STAT_FIELDS)
+    updates = ", ".join(f'"{x}" = EXCLUDED."{x}"' for x in STAT_FIELDS)
+    return f"""
+        INSERT INTO "{stats_table}" ("player_id", {columns})
+        SELECT
+            p."id",
+            b."balls",
+            b."caught_balls",
+            b."special_balls",
+            b."distinct_balls",
+            t."trades",
+            t."trade_partners"
+        FROM "{player_table}" p
+        CROSS JOIN LATERAL (
+            SELECT
+                COUNT(*) AS "balls",
+                COUNT(*) FILTER (WHERE "trade_player_id" IS NULL) AS "caught_balls",
+                COUNT(*) FILTER (WHERE "special_id" IS NOT NULL) AS "special_balls",
+                COUNT(DISTINCT "ball_id") AS "distinct_balls"
+            FROM "{instance_table}" WHERE "player_id" = p."id"
+        ) b
+        CROSS JOIN LATERAL (
+            SELECT
+                COUNT(*) AS "trades",
+                COUNT(DISTINCT CASE WHEN "player1_id" = p."id" THEN "player2_id"
+                    ELSE "player1_id" END) AS "trade_partners"
+            FROM "{trade_table}" WHERE "player1_id" = p."id" OR "player2_id" = p."id"
+        ) t
+        WHERE p."id" = ANY($1)
+        ON CONFLICT ("player_id") DO UPDATE SET {updates}
+    """
+
+
+async def refresh_player_stats(*player_ids: int):
+    """
+    Recompute the stats of the given players (by primary key) from their ball instances and
+    trades, creating the rows if needed.
+    """
+    if not player_ids:
+        return
+    connection = Tortoise.get_connection("default")
+    await connection.execute_query(_refresh_query(), [list(player_ids)])
+
+
+async def get_player_stats(player: Player) -> PlayerStats:
+    """
+    Return the stats of a player, computing them if they were never stored.
+    """
+    stats = await PlayerStats.get_or_none(player_id=player.pk)
+    if stats is None:
+        await refresh_player_stats(player.pk)
+        stats = await PlayerStats.get(player_id=player.pk)
+    return stats
+
+
+async def _update_stats(player_id: int, deltas: Counter[str]):
+    # players without stats are left out, their stats are computed on first read
+    updates = {x: F(x) + y for x, y in deltas.items() if y}
+    if updates:
+        await PlayerStats.filter(player_id=player_id).update(**updates)
+
+
+class TradeStats:
+    """
+    Update the stats of two players for a trade, from the ball instances it moved.
+
+    `add` must be called for each instance before it's modified, then `save` once the
+    instances and the trade are saved, inside the same transaction.
+    """
+
+    def __init__(self, player1: Player, player2: Player):
+        self.player_ids = (player1.pk, player2.pk)
+        # instance, with its owner and whether it was never traded before the trade
+        self.moves: list[tuple[BallInstance, int, bool]] = []
+
+    def add(self, instance: BallInstance):
+        self.moves.append((instance, instance.player_id, instance.trade_player_id is None))
+
+    async def save(self, trade: Trade):
+        deltas: dict[int, Counter[str]] = {x: Counter() for x in self.player_ids}
+        given: dict[int, set[int]] = defaultdict(set)
+        received: dict[int, set[int]] = defaultdict(set)
+        for instance, previous_owner, was_caught in self.moves:
+            special = instance.special_id is not None
+            loss = deltas[previous_owner]
+            loss["balls"] -= 1
+            loss["caught_balls"] -= was_caught
+            loss["special_balls"] -= special
+            gain = deltas[instance.player_id]
+            gain["balls"] += 1
+            gain["caught_balls"] += instance.trade_player_id is None
+            gain["special_balls"] += special
+            given[previous_owner].add(instance.ball_id)
+            received[instance.player_id].add(instance.pk)
+
+        for player_id, player_deltas in deltas.items():
+            if not given[player_id] and not received[player_id]:
+                continue
+            received_balls = {x.ball_id for x, _, _ in self.moves if x.player_id == player_id}
+            rows = await BallInstance.filter(
+                player_id=player_id, ball_id__in=given[player_id] | received_balls
+            ).values_list("id", "ball_id")
+            owned_after = {ball_id for _, ball_id in rows}
+            # what was owned before: the instances that didn't come from this trade, and the
+            # ones given away
+            owned_before = {
+                ball_id for pk, ball_id in rows if pk not in received[player_id]
+            } | given[player_id]
+            player_deltas["distinct_balls"] += len(owned_after) - len(owned_before)
+
+        player1_id, player2_id = self.player_ids
+        traded_before = (
+            await Trade.filter(
+                Q(player1_id=player1_id, player2_id=player2_id)
+                | Q(player1_id=player2_id, player2_id=player1_id)
+            )
+            .exclude(id=trade.pk)
+            .exists()
+        )
+        for player_id, player_deltas in deltas.items():
+            player_deltas["trades"] += 1
+            player_deltas["trade_partners"] += not traded_before
+            await _update_stats(player_id, player_deltas)
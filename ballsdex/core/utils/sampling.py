@@ -0,0 +1,67 @@
+import random
+from typing import Generic, Sequence, TypeVar
+
+T = TypeVar("T")
+
+
+class AliasTable(Generic[T]):
+    """
+    Weighted random sampling in constant time, using Vose's alias method. Building the table is
+    linear, so build it once and sample from it as long as the weights don't change.
+
+    Parameters
+    ----------
+    items: Sequence[T]
+        The items to sample from.
+    weights: Sequence[float]
+        The relative weight of each item, like for `random.choices`.
+
+    Raises
+    ------
+    ValueError
+        There are no items, or the total of the weights isn't greater than zero.
+    """
+
+    __slots__ = ("items", "probabilities", "aliases")
+
+    def __init__(self, items: Sequence[T], weights: Sequence[float]):
+        if len(items) != len(weights):
+            raise ValueError("The number of weights does not match the population")
+        total = sum(weights)
+        if not items or total <= 0:
+            raise ValueError("Total of weights must be greater than zero")
+
+        count = len(items)
+        scaled = [weight * count / total for weight in weights]
+        self.items = list(items)
+        self.probabilities = [1.0] * count
+        self.aliases = list(range(count))
+
+        small = [i for i, x in enumerate(scaled) if x < 1]
+        large = [i for i, x in enumerate(scaled) if x >= 1]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.probabilities[less] = scaled[less]
+            self.aliases[less] = more
+            scaled[more] += scaled[less] - 1
+            (small if scaled[more] < 1 else large).append(more)
+        # leftovers are only due to rounding errors, their probability is 1
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def sample(self, rng: random.Random | None = None) -> T:
+        """
+        Pick a random item, taking the weights into account.
+
+        Parameters
+        ----------
+        rng: random.Random | None
+            The random generator to use, defaults to the global one.
+        """
+        # the integer part picks a column, the fractional part decides between it and its alias
+        value = (rng or random).random() * len(self.items)
+        index = int(value)
+        if value - index < self.probabilities[index]:
+            return self.items[index]
+        return self.items[self.aliases[index]]
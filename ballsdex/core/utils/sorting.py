@@ -1,7 +1,8 @@
 import enum
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
-from tortoise.expressions import F, RawSQL
+from tortoise.expressions import F, Q, RawSQL
+from tortoise.functions import Coalesce
 
 if TYPE_CHECKING:
     from tortoise.queryset import QuerySet
@@ -79,6 +80,82 @@ def sort_balls(
         return queryset.order_by(sort.value)
 
 
+def _sort_keys(sort: SortingChoices | None) -> list[tuple[str, Any, bool]]:
+    # name, expression to annotate (None for a field) and whether the key is descending
+    # same orderings as `sort_balls`, no sort being the default order of /balls list
+    if sort is None:
+        return [("favorite", None, True)]
+    elif sort == SortingChoices.alphabetic:
+        return [("country_key", F("ball__country"), False)]
+    elif sort == SortingChoices.rarity:
+        return [
+            ("rarity_key", F("ball__rarity"), False),
+            ("country_key", F("ball__country"), False),
+        ]
+    elif sort == SortingChoices.special:
+        # instances without special last, like NULL values in ascending order
+        return [("special_key", Coalesce("special_id", 2**31 - 1), False)]
+    elif sort == SortingChoices.health or sort == SortingChoices.attack:
+        return [(f"{sort.value}_key", F(f"{sort.value}_bonus") + F(f"ball__{sort.value}"), True)]
+    elif sort == SortingChoices.stats_bonus:
+        return [("stats_bonus_key", F("health_bonus") + F("attack_bonus"), True)]
+    elif sort == SortingChoices.total_stats:
+        return [("total_stats_key", F("ball__health") + F("ball__attack"), True)]
+    elif sort == SortingChoices.duplicates:
+        return [("duplicates_key", RawSQL("COUNT(*) OVER (PARTITION BY ball_id)"), True)]
+    else:
+        # catch_date, health_bonus and attack_bonus
+        return [(sort.value.lstrip("-"), None, sort.value.startswith("-"))]
+
+
+def keyset_sort(
+    sort: SortingChoices | None, queryset: "QuerySet[BallInstance]", reverse: bool = False
+) -> "tuple[QuerySet[BallInstance], list[tuple[str, bool]] | None]":
+    """
+    Apply the selected sorting option like `sort_balls`, with the instance ID as the last key
+    to get a total order, allowing keyset pagination with `keyset_filter`.
+
+    Parameters
+    ----------
+    sort: SortingChoices | None
+        One of the supported sorting methods, or `None` for favorites first.
+    queryset: QuerySet[BallInstance]
+        An existing queryset of ball instances, **without awaiting the result!**
+    reverse: bool
+        Reverse the ordering.
+
+    Returns
+    -------
+    tuple[QuerySet[BallInstance], list[tuple[str, bool]] | None]
+        The queryset with the ordering applied, and the keys of the ordering (attribute of the
+        instances and whether it's descending). Keys are `None` if they can't be filtered on
+        (duplicates are counted with a window function), pages must then use offsets.
+    """
+    keys = _sort_keys(sort) + [("id", None, False)]
+    if reverse:
+        keys = [(name, expression, not descending) for name, expression, descending in keys]
+    annotations = {name: expression for name, expression, _ in keys if expression is not None}
+    if annotations:
+        queryset = queryset.annotate(**annotations)
+    queryset = queryset.order_by(*(f"-{x}" if descending else x for x, _, descending in keys))
+    if sort == SortingChoices.duplicates:
+        return queryset, None
+    return queryset, [(name, descending) for name, _, descending in keys]
+
+
+def keyset_filter(keys: list[tuple[str, bool]], values: tuple[Any, ...]) -> Q:
+    """
+    Build the condition selecting the instances after the one with the given key values, in
+    the ordering of `keyset_sort`.
+    """
+    conditions = []
+    for i, (name, descending) in enumerate(keys):
+        filters = {x: value for (x, _), value in zip(keys[:i], values)}
+        filters[f"{name}__lt" if descending else f"{name}__gt"] = values[i]
+        conditions.append(Q(**filters))
+    return Q(*conditions, join_type="OR")
+
+
 def filter_balls(
     filter: FilteringChoices, queryset: "QuerySet[BallInstance]", guild_id: int | None = None
 ) -> "QuerySet[BallInstance]":
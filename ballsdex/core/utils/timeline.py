@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import asyncio
+import bisect
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterable
+
+from tortoise.timezone import now as tortoise_now
+
+from ballsdex.core.models import Ball, Special
+
+log = logging.getLogger("ballsdex.core.utils.timeline")
+
+# the timer is re-armed at least this often (in seconds), so that a long wait doesn't drift
+# away from the wall clock (suspended host, clock adjustments...)
+MAX_TIMER_DELAY = 3600
+
+# creation date given to balls without one, they are obtainable with all the special events
+BEGINNING_OF_TIME = datetime.min.replace(tzinfo=timezone.utc)
+
+
+class SpecialTimeline:
+    """
+    Index of the special events over time, tracking the set of events currently ongoing.
+
+    The start and end dates of the events are sorted once, then the timeline advances from one
+    boundary to the next, either manually with `advance` or with a timer armed by `schedule`.
+    Reading the ongoing events is free, no date is compared on each spawn.
+
+    Parameters
+    ----------
+    specials: Iterable[Special]
+        All the special events.
+    balls: Iterable[Ball]
+        All the balls, used to know which ones could be obtained during an event.
+    clock: Callable[[], datetime]
+        Returns the current time, aware of the timezone.
+    """
+
+    def __init__(
+        self,
+        specials: Iterable[Special],
+        balls: Iterable[Ball] = (),
+        *,
+        clock: Callable[[], datetime] = tortoise_now,
+    ):
+        self.clock = clock
+        # events are (time, special, started), applied in order of time
+        self._events: list[tuple[datetime, Special, bool]] = []
+        self._position = 0
+        self._ongoing: dict[int, Special] = {}
+        self._handle: asyncio.TimerHandle | None = None
+
+        for special in specials:
+            if special.start_date and special.end_date and special.end_date < special.start_date:
+                continue  # never ongoing
+            if special.start_date:
+                self._events.append((special.start_date, special, True))
+            else:
+                self._ongoing[special.pk] = special
+            if special.end_date:
+                # still ongoing at end_date itself
+                self._events.append((special.end_date + timedelta(microseconds=1), special, False))
+        self._events.sort(key=lambda x: x[0])
+        self.advance()
+        self.active: tuple[Special, ...] = tuple(self._ongoing.values())
+
+        self._balls = sorted(
+            (x for x in balls if x.enabled), key=lambda x: x.created_at or BEGINNING_OF_TIME
+        )
+        self._ball_dates = [x.created_at or BEGINNING_OF_TIME for x in self._balls]
+
+    @property
+    def next_boundary(self) -> datetime | None:
+        """
+        The time at which the next event starts or ends, if any.
+        """
+        if self._position < len(self._events):
+            return self._events[self._position][0]
+        return None
+
+    def is_active(self, special: Special) -> bool:
+        """
+        Whether the special event is ongoing.
+        """
+        return special.pk in self._ongoing
+
+    def advance(self, now: datetime | None = None) -> bool:
+        """
+        Apply the events that started or ended until the given time.
+
+        Parameters
+        ----------
+        now: datetime | None
+            The time to advance to, defaults to the clock. Going back in time does nothing.
+
+        Returns
+        -------
+        bool
+            `True` if the set of ongoing events changed. `active` is then a new tuple.
+        """
+        now = now or self.clock()
+        changed = False
+        while self._position < len(self._events) and self._events[self._position][0] <= now:
+            _, special, started = self._events[self._position]
+            if started:
+                self._ongoing[special.pk] = special
+            else:
+                self._ongoing.pop(special.pk, None)
+            self._position += 1
+            changed = True
+        if changed:
+            self.active = tuple(self._ongoing.values())
+        return changed
+
+    def schedule(self, loop: asyncio.AbstractEventLoop | None = None):
+        """
+        Advance the timeline automatically at each boundary, until `stop` is called.
+        """
+        self.stop()
+        boundary = self.next_boundary
+        if boundary is None:
+            return
+        delay = (boundary - self.clock()).total_seconds()
+        loop = loop or asyncio.get_running_loop()
+        self._handle = loop.call_later(min(max(delay, 0), MAX_TIMER_DELAY), self._on_timer, loop)
+
+    def stop(self):
+        """
+        Cancel the timer armed by `schedule`.
+        """
+        if self._handle:
+            self._handle.cancel()
+            self._handle = None
+
+    def _on_timer(self, loop: asyncio.AbstractEventLoop):
+        self._handle = None
+        if self.advance():
+            log.debug(f"Ongoing special events: {', '.join(x.name for x in self.active)}")
+        self.schedule(loop)
+
+    def obtainable_balls(self, special: Special) -> list[Ball]:
+        """
+        List the enabled balls that existed before the special event ended, which are the ones
+        that could have been caught with it. Balls without a creation date are always included.
+        """
+        if special.end_date is None:
+            return self._balls
+        return self._balls[: bisect.bisect_left(self._ball_dates, special.end_date)]
@@ -9,11 +9,14 @@ import discord
 from discord import app_commands
 from discord.utils import format_dt
 from tortoise.exceptions import BaseORMException, DoesNotExist
+from tortoise.transactions import in_transaction
 
 from ballsdex.core.bot import BallsDexBot
 from ballsdex.core.models import Ball, BallInstance, Player, Special, Trade, TradeObject
 from ballsdex.core.utils.buttons import ConfirmChoiceView
 from ballsdex.core.utils.logging import log_action
+from ballsdex.core.utils.owned import get_owned_balls_cache
+from ballsdex.core.utils.player_stats import TradeStats, refresh_player_stats
 from ballsdex.core.utils.transformers import (
     BallTransform,
     EconomyTransform,
@@ -25,6 +28,7 @@ from ballsdex.settings import settings
 if TYPE_CHECKING:
     from ballsdex.packages.countryballs.cog import CountryBallsSpawner
     from ballsdex.packages.countryballs.countryball import BallSpawnView
+    from ballsdex.packages.countryballs.queue import SpawnQueue
 
 log = logging.getLogger("ballsdex.packages.admin.balls")
 FILENAME_RE = re.compile(r"^(.+)(\.\S+)$")
@@ -52,6 +56,7 @@ class Balls(app_commands.Group):
         self,
         interaction: discord.Interaction[BallsDexBot],
         countryball_cls: type["BallSpawnView"],
+        spawn_queue: "SpawnQueue",
         countryball: Ball | None,
         channel: discord.TextChannel,
         n: int,
@@ -60,6 +65,17 @@ class Balls(app_commands.Group):
         hp_bonus: int | None = None,
     ):
         spawned = 0
+        failed = False
+        futures: list[asyncio.Future[bool]] = []
+
+        def on_spawned(future: asyncio.Future[bool]):
+            nonlocal spawned, failed
+            if future.cancelled():
+                return
+            if future.result():
+                spawned += 1
+            else:
+                failed = True
 
         async def update_message_loop():
             for i in range(5 * 12 * 10):  # timeout progress after 10 minutes
@@ -80,6 +96,8 @@ class Balls(app_commands.Group):
         task = interaction.client.loop.create_task(update_message_loop())
         try:
             for i in range(n):
+                if failed:
+                    break
                 if not countryball:
                     ball = await countryball_cls.get_random(interaction.client)
                 else:
@@ -87,17 +105,25 @@ class Balls(app_commands.Group):
                 ball.special = special
                 ball.atk_bonus = atk_bonus
                 ball.hp_bonus = hp_bonus
-                result = await ball.spawn(channel)
-                if not result:
-                    task.cancel()
-                    await interaction.followup.edit_message(
-                        "@original",  # type: ignore
-                        content=f"A {settings.collectible_name} failed to spawn, probably "
-                        "indicating a lack of permissions to send messages "
-                        f"or upload files in {channel.mention}.",
-                    )
-                    return
-                spawned += 1
+                # paced by the queue, waits for room if it is full
+                future = await spawn_queue.put(ball, channel)
+                future.add_done_callback(on_spawned)
+                futures.append(future)
+            # spawns of a channel are sent in order, stop at the first failure
+            for future in futures:
+                if failed:
+                    future.cancel()
+                else:
+                    await asyncio.wait((future,))
+            if failed:
+                task.cancel()
+                await interaction.followup.edit_message(
+                    "@original",  # type: ignore
+                    content=f"A {settings.collectible_name} failed to spawn, probably "
+                    "indicating a lack of permissions to send messages "
+                    f"or upload files in {channel.mention}.",
+                )
+                return
             task.cancel()
             await interaction.followup.edit_message(
                 "@original",  # type: ignore
@@ -106,6 +132,8 @@ class Balls(app_commands.Group):
             )
         finally:
             task.cancel()
+            for future in futures:
+                future.cancel()
 
     @app_commands.command()
     @app_commands.checks.has_any_role(*settings.root_role_ids)
@@ -161,6 +189,7 @@ class Balls(app_commands.Group):
             await self._spawn_bomb(
                 interaction,
                 cog.countryball_cls,
+                cog.spawn_queue,
                 countryball,
                 channel or interaction.channel,  # type: ignore
                 n,
@@ -184,7 +213,9 @@ class Balls(app_commands.Group):
         ball.special = special
         ball.atk_bonus = atk_bonus
         ball.hp_bonus = hp_bonus
-        result = await ball.spawn(channel or interaction.channel)  # type: ignore
+        result = await (
+            await cog.spawn_queue.put(ball, channel or interaction.channel)  # type: ignore
+        )
 
         if result:
             await interaction.followup.send(
@@ -234,21 +265,24 @@ class Balls(app_commands.Group):
         await interaction.response.defer(ephemeral=True, thinking=True)
 
         player, created = await Player.get_or_create(discord_id=user.id)
-        instance = await BallInstance.create(
-            ball=countryball,
-            player=player,
-            attack_bonus=(
-                attack_bonus
-                if attack_bonus is not None
-                else random.randint(-settings.max_attack_bonus, settings.max_attack_bonus)
-            ),
-            health_bonus=(
-                health_bonus
-                if health_bonus is not None
-                else random.randint(-settings.max_health_bonus, settings.max_health_bonus)
-            ),
-            special=special,
-        )
+        async with in_transaction():
+            instance = await BallInstance.create(
+                ball=countryball,
+                player=player,
+                attack_bonus=(
+                    attack_bonus
+                    if attack_bonus is not None
+                    else random.randint(-settings.max_attack_bonus, settings.max_attack_bonus)
+                ),
+                health_bonus=(
+                    health_bonus
+                    if health_bonus is not None
+                    else random.randint(-settings.max_health_bonus, settings.max_health_bonus)
+                ),
+                special=special,
+            )
+            await refresh_player_stats(player.pk)
+        get_owned_balls_cache().add(user.id, countryball.pk, special.pk if special else None)
         await interaction.followup.send(
             f"`{countryball.country}` {settings.collectible_name} was successfully given to "
             f"`{user}`.\nSpecial: `{special.name if special else None}` • ATK: "
@@ -338,13 +372,16 @@ class Balls(app_commands.Group):
             )
             return
         try:
-            ball = await BallInstance.get(id=ballIdConverted)
+            ball = await BallInstance.get(id=ballIdConverted).prefetch_related("player")
         except DoesNotExist:
             await interaction.response.send_message(
                 f"The {settings.collectible_name} ID you gave does not exist.", ephemeral=True
             )
             return
-        await ball.delete()
+        async with in_transaction():
+            await ball.delete()
+            await refresh_player_stats(ball.player.pk)
+        get_owned_balls_cache().invalidate(ball.player.discord_id)
         await interaction.response.send_message(
             f"{settings.collectible_name.title()} {countryball_id} deleted.", ephemeral=True
         )
@@ -384,11 +421,17 @@ class Balls(app_commands.Group):
             )
             return
         player, _ = await Player.get_or_create(discord_id=user.id)
+        stats = TradeStats(original_player, player)
+        stats.add(ball)
         ball.player = player
-        await ball.save()
-
-        trade = await Trade.create(player1=original_player, player2=player)
-        await TradeObject.create(trade=trade, ballinstance=ball, player=original_player)
+        async with in_transaction():
+            await ball.save()
+            trade = await Trade.create(player1=original_player, player2=player)
+            await TradeObject.create(trade=trade, ballinstance=ball, player=original_player)
+            await stats.save(trade)
+        owned_balls = get_owned_balls_cache()
+        owned_balls.invalidate(original_player.discord_id)
+        owned_balls.add(player.discord_id, ball.ball_id, ball.special_id)
         await interaction.response.send_message(
             f"Transfered {ball}({ball.pk}) from {original_player} to {user}.",
             ephemeral=True,
@@ -449,14 +492,17 @@ class Balls(app_commands.Group):
         await view.wait()
         if not view.value:
             return
-        if percentage:
-            balls = await BallInstance.filter(player=player)
-            to_delete = random.sample(balls, int(len(balls) * (percentage / 100)))
-            for ball in to_delete:
-                await ball.delete()
-            count = len(to_delete)
-        else:
-            count = await BallInstance.filter(player=player).delete()
+        async with in_transaction():
+            if percentage:
+                balls = await BallInstance.filter(player=player)
+                to_delete = random.sample(balls, int(len(balls) * (percentage / 100)))
+                for ball in to_delete:
+                    await ball.delete()
+                count = len(to_delete)
+            else:
+                count = await BallInstance.filter(player=player).delete()
+            await refresh_player_stats(player.pk)
+        get_owned_balls_cache().invalidate(player.discord_id)
         await interaction.followup.send(
             f"{count} {settings.plural_collectible_name} from {user} have been deleted.",
             ephemeral=True,
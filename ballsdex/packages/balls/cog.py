@@ -1,7 +1,7 @@
 import enum
 import logging
 from collections import defaultdict
-from typing import TYPE_CHECKING, cast
+from typing import TYPE_CHECKING
 
 import discord
 from discord import app_commands
@@ -9,6 +9,7 @@ from discord.ext import commands
 from discord.ui import Button, View, button
 from tortoise.exceptions import DoesNotExist
 from tortoise.functions import Count
+from tortoise.transactions import in_transaction
 
 from ballsdex.core.models import (
     BallInstance,
@@ -20,8 +21,10 @@ from ballsdex.core.models import (
     balls,
 )
 from ballsdex.core.utils.buttons import ConfirmChoiceView
+from ballsdex.core.utils.owned import get_owned_balls_cache
 from ballsdex.core.utils.paginator import FieldPageSource, Pages
-from ballsdex.core.utils.sorting import FilteringChoices, SortingChoices, filter_balls, sort_balls
+from ballsdex.core.utils.player_stats import TradeStats
+from ballsdex.core.utils.sorting import FilteringChoices, SortingChoices, filter_balls
 from ballsdex.core.utils.transformers import (
     BallEnabledTransform,
     BallInstanceTransform,
@@ -29,7 +32,11 @@ from ballsdex.core.utils.transformers import (
     TradeCommandType,
 )
 from ballsdex.core.utils.utils import inventory_privacy, is_staff
-from ballsdex.packages.balls.countryballs_paginator import CountryballsViewer, DuplicateViewMenu
+from ballsdex.packages.balls.countryballs_paginator import (
+    CountryballsQuerySource,
+    CountryballsViewer,
+    DuplicateViewMenu,
+)
 from ballsdex.settings import settings
 
 if TYPE_CHECKING:
@@ -78,13 +85,24 @@ class DonationRequest(View):
         self.stop()
         for item in self.children:
             item.disabled = True  # type: ignore
+        stats = TradeStats(self.countryball.player, self.new_player)
+        stats.add(self.countryball)
         self.countryball.favorite = False
         self.countryball.trade_player = self.countryball.player
         self.countryball.player = self.new_player
-        await self.countryball.save()
-        trade = await Trade.create(player1=self.countryball.trade_player, player2=self.new_player)
-        await TradeObject.create(
-            trade=trade, ballinstance=self.countryball, player=self.countryball.trade_player
+        async with in_transaction():
+            await self.countryball.save()
+            trade = await Trade.create(
+                player1=self.countryball.trade_player, player2=self.new_player
+            )
+            await TradeObject.create(
+                trade=trade, ballinstance=self.countryball, player=self.countryball.trade_player
+            )
+            await stats.save(trade)
+        owned_balls = get_owned_balls_cache()
+        owned_balls.invalidate(self.countryball.trade_player.discord_id)
+        owned_balls.add(
+            self.new_player.discord_id, self.countryball.ball_id, self.countryball.special_id
         )
         await interaction.response.edit_message(
             content=interaction.message.content  # type: ignore
@@ -180,20 +198,16 @@ class Balls(commands.GroupCog, group_name=settings.players_group_cog_name):
             )
             return
 
-        await player.fetch_related("balls")
-        query = player.balls.all()
+        query = BallInstance.filter(player=player)
         if filter:
             query = filter_balls(filter, query, interaction.guild_id)
         if countryball:
             query = query.filter(ball__id=countryball.pk)
         if special:
             query = query.filter(special=special)
-        if sort:
-            countryballs = await sort_balls(sort, query)
-        else:
-            countryballs = await query.order_by("-favorite")
+        count = await query.count()
 
-        if len(countryballs) < 1:
+        if count < 1:
             ball_txt = countryball.country if countryball else ""
             special_txt = special if special else ""
 
@@ -216,10 +230,10 @@ class Balls(commands.GroupCog, group_name=settings.players_group_cog_name):
                     f"{settings.plural_collectible_name} yet."
                 )
             return
-        if reverse:
-            countryballs.reverse()
 
-        paginator = CountryballsViewer(interaction, countryballs)
+        # pages are fetched when displayed
+        source = CountryballsQuerySource(query, count, sort, reverse)
+        paginator = CountryballsViewer(interaction, source)
         if user_obj == interaction.user:
             await paginator.start()
         else:
@@ -277,19 +291,11 @@ class Balls(commands.GroupCog, group_name=settings.players_group_cog_name):
         # Only ID and emoji is interesting for us
         bot_countryballs = {x: y.emoji_id for x, y in balls.items() if y.enabled}
 
-        # Set of ball IDs owned by the player
-        filters = {"player__discord_id": user_obj.id, "ball__enabled": True}
         if special:
-            filters["special"] = special
             bot_countryballs = {
-                x: y.emoji_id
-                for x, y in balls.items()
-                if y.enabled and (special.end_date is None or y.created_at < special.end_date)
+                x.pk: x.emoji_id for x in self.bot.special_timeline.obtainable_balls(special)
             }
 
-        if self_caught is not None:
-            filters["trade_player_id__isnull"] = self_caught
-
         if not bot_countryballs:
             await interaction.followup.send(
                 f"There are no {extra_text}{settings.plural_collectible_name}"
@@ -298,12 +304,26 @@ class Balls(commands.GroupCog, group_name=settings.players_group_cog_name):
             )
             return
 
-        owned_countryballs = set(
-            x[0]
-            for x in await BallInstance.filter(**filters)
-            .distinct()  # Do not query everything
-            .values_list("ball_id")
-        )
+        # Set of ball IDs owned by the player
+        if self_caught is None:
+            owned = await get_owned_balls_cache().get(user_obj.id)
+            owned_countryballs = owned.ids(special.pk if special else None)
+            owned_countryballs.intersection_update(bot_countryballs)
+        else:
+            # not cached, this depends on the trade history
+            filters = {
+                "player__discord_id": user_obj.id,
+                "ball__enabled": True,
+                "trade_player_id__isnull": self_caught,
+            }
+            if special:
+                filters["special"] = special
+            owned_countryballs = set(
+                x[0]
+                for x in await BallInstance.filter(**filters)
+                .distinct()  # Do not query everything
+                .values_list("ball_id")
+            )
 
         entries: list[tuple[str, str]] = []
 
@@ -626,13 +646,19 @@ class Balls(commands.GroupCog, group_name=settings.players_group_cog_name):
             )
             return
 
+        stats = TradeStats(old_player, new_player)
+        stats.add(countryball)
         countryball.player = new_player
         countryball.trade_player = old_player
         countryball.favorite = False
-        await countryball.save()
-
-        trade = await Trade.create(player1=old_player, player2=new_player)
-        await TradeObject.create(trade=trade, ballinstance=countryball, player=old_player)
+        async with in_transaction():
+            await countryball.save()
+            trade = await Trade.create(player1=old_player, player2=new_player)
+            await TradeObject.create(trade=trade, ballinstance=countryball, player=old_player)
+            await stats.save(trade)
+        owned_balls = get_owned_balls_cache()
+        owned_balls.invalidate(old_player.discord_id)
+        owned_balls.add(new_player.discord_id, countryball.ball_id, countryball.special_id)
 
         cb_txt = (
             countryball.description(short=True, include_emoji=True, bot=self.bot, is_trade=True)
@@ -798,9 +824,7 @@ class Balls(commands.GroupCog, group_name=settings.players_group_cog_name):
         bot_countryballs = {x: y.emoji_id for x, y in balls.items() if y.enabled}
         if special:
             bot_countryballs = {
-                x: y.emoji_id
-                for x, y in balls.items()
-                if y.enabled and (special.end_date is None or y.created_at < special.end_date)
+                x.pk: x.emoji_id for x in self.bot.special_timeline.obtainable_balls(special)
             }
 
         player1, _ = await Player.get_or_create(discord_id=interaction.user.id)
@@ -819,17 +843,12 @@ class Balls(commands.GroupCog, group_name=settings.players_group_cog_name):
                 "You cannot compare with a user that has you blocked.", ephemeral=True
             )
             return
-        queryset = BallInstance.filter(ball__enabled=True).distinct()
-        if special:
-            queryset = queryset.filter(special=special)
-        user1_balls = cast(
-            list[int],
-            await queryset.filter(player=player1).values_list("ball_id", flat=True),
-        )
-        user2_balls = cast(
-            list[int],
-            await queryset.filter(player=player2).values_list("ball_id", flat=True),
-        )
+        owned_balls = get_owned_balls_cache()
+        special_id = special.pk if special else None
+        user1_balls = (await owned_balls.get(player1.discord_id)).ids(special_id)
+        user2_balls = (await owned_balls.get(player2.discord_id)).ids(special_id)
+        user1_balls.intersection_update(bot_countryballs)
+        user2_balls.intersection_update(bot_countryballs)
         both = set(user1_balls) & set(user2_balls)
         user1_only = set(user1_balls) - set(user2_balls)
         user2_only = set(user2_balls) - set(user1_balls)
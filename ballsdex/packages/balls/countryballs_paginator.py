@@ -1,15 +1,20 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, List
+import asyncio
+import math
+from typing import TYPE_CHECKING, Any, List
 
 import discord
 
 from ballsdex.core.models import BallInstance
 from ballsdex.core.utils import menus
 from ballsdex.core.utils.paginator import Pages
+from ballsdex.core.utils.sorting import SortingChoices, keyset_filter, keyset_sort
 from ballsdex.settings import settings
 
 if TYPE_CHECKING:
+    from tortoise.queryset import QuerySet
+
     from ballsdex.core.bot import BallsDexBot
 
 
@@ -22,10 +27,98 @@ class CountryballsSource(menus.ListPageSource):
         return True  # signal to edit the page
 
 
+class CountryballsQuerySource(menus.PageSource):
+    """
+    A source of ball instances fetched one page at a time, instead of loading the whole
+    inventory.
+
+    Pages are fetched with keyset pagination, starting after the last instance of the previous
+    page, and the next page is prefetched while the current one is displayed. Pages reached
+    without going through the previous one (last page, page number) use an offset instead.
+
+    Parameters
+    ----------
+    queryset: QuerySet[BallInstance]
+        The filtered ball instances, without ordering.
+    count: int
+        The number of instances in the queryset.
+    sort: SortingChoices | None
+        The ordering of the instances, `None` for favorites first.
+    reverse: bool
+        Reverse the ordering.
+    """
+
+    def __init__(
+        self,
+        queryset: "QuerySet[BallInstance]",
+        count: int,
+        sort: SortingChoices | None = None,
+        reverse: bool = False,
+        *,
+        per_page: int = 25,
+    ):
+        self.queryset, self.keys = keyset_sort(sort, queryset, reverse)
+        self.count = count
+        self.per_page = per_page
+        # key values of the last instance of the previous page, for each page
+        self._cursors: dict[int, tuple[Any, ...]] = {}
+        # the pages around the current one, including the prefetched one
+        self._pages: dict[int, asyncio.Task[List[BallInstance]]] = {}
+
+    def is_paginating(self) -> bool:
+        return self.count > self.per_page
+
+    def get_max_pages(self) -> int:
+        return max(math.ceil(self.count / self.per_page), 1)
+
+    async def _fetch(self, page_number: int) -> List[BallInstance]:
+        queryset = self.queryset
+        if page_number > 0:
+            cursor = self._cursors.get(page_number)
+            if self.keys is not None and cursor is not None:
+                queryset = queryset.filter(keyset_filter(self.keys, cursor))
+            else:
+                queryset = queryset.offset(page_number * self.per_page)
+        balls = await queryset.limit(self.per_page)
+        if self.keys is not None and balls:
+            self._cursors[page_number + 1] = tuple(getattr(balls[-1], x) for x, _ in self.keys)
+        return balls
+
+    def _load(self, page_number: int) -> asyncio.Task[List[BallInstance]]:
+        task = self._pages.get(page_number)
+        if task is None or (task.done() and (task.cancelled() or task.exception())):
+            task = asyncio.create_task(self._fetch(page_number))
+            self._pages[page_number] = task
+        return task
+
+    async def get_page(self, page_number: int) -> List[BallInstance]:
+        balls = await self._load(page_number)
+        for number in [x for x in self._pages if abs(x - page_number) > 1]:
+            task = self._pages.pop(number)
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                task.exception()  # a failed prefetch must be retrieved to not be logged
+        if page_number + 1 < self.get_max_pages():
+            self._load(page_number + 1)
+        return balls
+
+    async def format_page(self, menu: CountryballsSelector, balls: List[BallInstance]):
+        menu.set_options(balls)
+        return True  # signal to edit the page
+
+
 class CountryballsSelector(Pages):
-    def __init__(self, interaction: discord.Interaction["BallsDexBot"], balls: List[BallInstance]):
+    def __init__(
+        self,
+        interaction: discord.Interaction["BallsDexBot"],
+        balls: List[BallInstance] | CountryballsQuerySource,
+    ):
         self.bot = interaction.client
-        source = CountryballsSource(balls)
+        if isinstance(balls, CountryballsQuerySource):
+            source = balls
+        else:
+            source = CountryballsSource(balls)
         super().__init__(source, interaction=interaction)
         self.add_item(self.select_ball_menu)
 
@@ -69,7 +162,9 @@ class CountryballsViewer(CountryballsSelector):
     async def ball_selected(
         self, interaction: discord.Interaction["BallsDexBot"], ball_instance: BallInstance
     ):
-        content, file, view = await ball_instance.prepare_for_message(interaction)
+        content, file, view = await ball_instance.prepare_for_message(
+            interaction, settings.browse_card_profile
+        )
         await interaction.followup.send(content=content, file=file, view=view)
         file.close()
 
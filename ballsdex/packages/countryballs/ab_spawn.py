@@ -1,3 +1,5 @@
+import logging
+import struct
 from typing import TYPE_CHECKING, Literal
 
 from ballsdex.packages.countryballs.spawn import BaseSpawnManager
@@ -7,6 +9,12 @@ if TYPE_CHECKING:
 
     from ballsdex.core.bot import BallsDexBot
 
+log = logging.getLogger("ballsdex.packages.countryballs")
+
+# magic, then the length of the states of managers A and B, which follow
+AB_STATE_HEADER = struct.Struct("<7sII")
+AB_STATE_MAGIC = b"BDABSPN"
+
 # It is a good idea to call importlib.reload on your custom module to make "b.reload countryballs"
 # also reload the spawn manager. Otherwise, you'll be forced to fully restart to apply changes
 #
@@ -86,3 +94,30 @@ class ABSpawner(BaseSpawnManager):
             f"{a_or_b} (`{manager.__class__.__name__}`) ({percentage}% chance)",
             ephemeral=True,
         )
+
+    async def dump_state(self) -> bytes | None:
+        state_a = await self.manager_a.dump_state() or b""
+        state_b = await self.manager_b.dump_state() or b""
+        if not state_a and not state_b:
+            return None
+        header = AB_STATE_HEADER.pack(AB_STATE_MAGIC, len(state_a), len(state_b))
+        return header + state_a + state_b
+
+    def load_state(self, data: bytes):
+        try:
+            magic, length_a, length_b = AB_STATE_HEADER.unpack_from(data)
+        except struct.error:
+            log.warning("A/B spawn state is truncated, ignoring it.")
+            return
+        if magic != AB_STATE_MAGIC:
+            log.warning("Spawn state was not saved by the A/B spawner, ignoring it.")
+            return
+        if len(data) != AB_STATE_HEADER.size + length_a + length_b:
+            log.warning("A/B spawn state is truncated, ignoring it.")
+            return
+        state_a = data[AB_STATE_HEADER.size : AB_STATE_HEADER.size + length_a]
+        state_b = data[AB_STATE_HEADER.size + length_a :]
+        if state_a:
+            self.manager_a.load_state(state_a)
+        if state_b:
+            self.manager_b.load_state(state_b)
@@ -0,0 +1,151 @@
+from typing import Any
+
+from tortoise import Tortoise
+from tortoise.exceptions import IntegrityError
+from tortoise.models import Model
+from tortoise.transactions import in_transaction
+
+from ballsdex.core.models import BallInstance, Player, PlayerStats, Trade, TradeObject
+from ballsdex.core.utils.owned import get_owned_balls_cache
+from ballsdex.core.utils.player_stats import TradeStats
+
+
+def _db_values(instance: Model, exclude: tuple[str, ...] = ()) -> dict[str, Any]:
+    """
+    Return the values of an unsaved instance as they would be inserted, keyed by column.
+    Defaults and `auto_now_add` dates are applied like in `Model.save`.
+    """
+    meta = instance._meta
+    values = {}
+    for name, column in meta.fields_db_projection.items():
+        field = meta.fields_map[name]
+        if field.generated or name in exclude:
+            continue
+        values[column] = field.to_db_value(getattr(instance, name), instance)
+    return values
+
+
+def _catch_query(player: dict[str, Any], instance: dict[str, Any]) -> tuple[str, list[Any]]:
+    """
+    Build the statement of a catch. In a single round-trip, it creates the player if needed,
+    checks if they owned this ball before, inserts the new instance and updates the player's
+    stats.
+
+    All parts of the statement see the database as it was before, so the check for a previous
+    catch doesn't see the new instance.
+    """
+    player_table = Player._meta.db_table
+    instance_table = BallInstance._meta.db_table
+    stats_table = PlayerStats._meta.db_table
+    values = [*player.values(), *instance.values()]
+
+    player_columns = ", ".join(f'"{x}"' for x in player)
+    player_params = ", ".join(f"${i}" for i in range(1, len(player) + 1))
+    instance_columns = ", ".join(f'"{x}"' for x in instance)
+    instance_params = ", ".join(f"${i}" for i in range(len(player) + 1, len(values) + 1))
+    discord_id_param = f"${1 + list(player).index('discord_id')}"
+    ball_param = f"${len(player) + 1 + list(instance).index('ball_id')}"
+    special_param = f"${len(player) + 1 + list(instance).index('special_id')}"
+
+    query = f"""
+        WITH inserted_player AS (
+            INSERT INTO "{player_table}" ({player_columns}) VALUES ({player_params})
+            ON CONFLICT ("discord_id") DO NOTHING
+            RETURNING *
+        ), upserted_player AS (
+            -- at most one of these returns a row: the existing player isn't locked or rewritten
+            SELECT * FROM inserted_player
+            UNION ALL
+            SELECT * FROM "{player_table}" WHERE "discord_id" = {discord_id_param}
+        ), previous AS (
+            SELECT EXISTS (
+                SELECT 1 FROM "{instance_table}"
+                WHERE "player_id" = (SELECT "id" FROM upserted_player) AND "ball_id" = {ball_param}
+            ) AS caught_before
+        ), inserted AS (
+            INSERT INTO "{instance_table}" ({instance_columns}, "player_id")
+            VALUES ({instance_params}, (SELECT "id" FROM upserted_player))
+            RETURNING "id"
+        ), stats AS (
+            -- players without stats are left out, their stats are computed on first read
+            UPDATE "{stats_table}" SET
+                "balls" = "balls" + 1,
+                "caught_balls" = "caught_balls" + 1,
+                "special_balls" = "special_balls" + ({special_param}::int IS NOT NULL)::int,
+                "distinct_balls" = "distinct_balls" + (NOT previous.caught_before)::int
+            FROM previous
+            WHERE "player_id" = (SELECT "id" FROM upserted_player)
+        )
+        SELECT upserted_player.*, previous.caught_before, inserted.id AS instance_id
+        FROM upserted_player, previous, inserted
+    """
+    return query, values
+
+
+async def insert_caught_ball(discord_id: int, instance: BallInstance) -> tuple[Player, bool]:
+    """
+    Save a newly caught ball instance, creating its player if needed, in a single statement.
+
+    Parameters
+    ----------
+    discord_id: int
+        Discord ID of the player catching the ball.
+    instance: BallInstance
+        The unsaved instance, without player. Its primary key and player are set once saved.
+
+    Returns
+    -------
+    tuple[Player, bool]
+        The player, and whether this is the first time they catch this ball.
+    """
+    player_values = _db_values(Player(discord_id=discord_id), exclude=("id",))
+    instance_values = _db_values(instance, exclude=("id", "player_id"))
+    query, values = _catch_query(player_values, instance_values)
+
+    connection = Tortoise.get_connection("default")
+    try:
+        _, rows = await connection.execute_query(query, values)
+    except IntegrityError:
+        # the player was created by a concurrent catch that this statement couldn't see,
+        # leaving the instance without player. They are visible to a new statement.
+        _, rows = await connection.execute_query(query, values)
+    row = dict(rows[0])
+    caught_before = row.pop("caught_before")
+    instance.pk = row.pop("instance_id")
+    instance._saved_in_db = True
+
+    player = Player._init_from_db(**row)
+    instance.player = player
+    get_owned_balls_cache().add(discord_id, instance.ball_id, instance.special_id)
+    return player, not caught_before
+
+
+async def transfer_caught_ball(
+    discord_id: int, instance: BallInstance, player: Player | None = None
+) -> tuple[Player, bool]:
+    """
+    Give an existing ball instance to the player catching it, registering the transfer as a
+    trade to avoid bypasses. This is done in a single transaction.
+
+    Returns
+    -------
+    tuple[Player, bool]
+        The player, and whether this is the first time they catch this ball.
+    """
+    owned_balls = get_owned_balls_cache()
+    async with in_transaction():
+        player = player or (await Player.get_or_create(discord_id=discord_id))[0]
+        stats = TradeStats(instance.player, player)
+        stats.add(instance)
+        # queried rather than read from the owned balls cache, which may be outdated
+        is_new = not await BallInstance.filter(player=player, ball_id=instance.ball_id).exists()
+        trade = await Trade.create(player1=instance.player, player2=player)
+        await TradeObject.create(trade=trade, player=instance.player, ballinstance=instance)
+        instance.trade_player = instance.player
+        instance.player = player
+        instance.locked = None  # type: ignore
+        await instance.save(update_fields=("player_id", "trade_player_id", "locked"))
+        await stats.save(trade)
+    owned_balls.invalidate(instance.trade_player.discord_id)
+    owned_balls.add(discord_id, instance.ball_id, instance.special_id)
+    return player, is_new
@@ -1,13 +1,16 @@
+import asyncio
 import importlib
 import logging
+from pathlib import Path
 from typing import TYPE_CHECKING, cast
 
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from tortoise.exceptions import DoesNotExist
 
 from ballsdex.core.models import GuildConfig
-from ballsdex.packages.countryballs.countryball import BallSpawnView
+from ballsdex.packages.countryballs.countryball import BallSpawnView, clear_spawn_tables
+from ballsdex.packages.countryballs.queue import SpawnQueue
 from ballsdex.packages.countryballs.spawn import BaseSpawnManager
 from ballsdex.settings import settings
 
@@ -16,6 +19,16 @@ if TYPE_CHECKING:
 
 log = logging.getLogger("ballsdex.packages.countryballs")
 
+# number of seconds between two saves of the spawn state
+SPAWN_STATE_INTERVAL = 300
+
+
+def _write_state(path: Path, data: bytes):
+    # write then rename to never leave a partial file if the process is killed
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    tmp_path.write_bytes(data)
+    tmp_path.replace(path)
+
 
 class CountryBallsSpawner(commands.Cog):
     spawn_manager: BaseSpawnManager
@@ -24,6 +37,9 @@ class CountryBallsSpawner(commands.Cog):
         self.bot = bot
         self.cache: dict[int, int] = {}
         self.countryball_cls = BallSpawnView
+        self.spawn_queue = SpawnQueue(
+            settings.spawn_workers, settings.spawn_queue_size, settings.spawn_channel_interval
+        )
 
         module_path, class_name = settings.spawn_manager.rsplit(".", 1)
         module = importlib.import_module(module_path)
@@ -42,6 +58,41 @@ class CountryBallsSpawner(commands.Cog):
         grammar = "" if i == 1 else "s"
         log.info(f"Loaded {i} guild{grammar} in cache.")
 
+        if settings.spawn_state_file:
+            await self.restore_spawn_state(Path(settings.spawn_state_file))
+            self.save_spawn_state.start()
+
+    async def restore_spawn_state(self, path: Path):
+        try:
+            data = await asyncio.to_thread(path.read_bytes)
+        except FileNotFoundError:
+            return
+        except OSError:
+            log.warning(f"Failed to read the spawn state from {path}", exc_info=True)
+            return
+        self.spawn_manager.load_state(data)
+
+    @tasks.loop(seconds=SPAWN_STATE_INTERVAL)
+    async def save_spawn_state(self):
+        assert settings.spawn_state_file
+        data = await self.spawn_manager.dump_state()
+        if data is None:
+            return
+        try:
+            await asyncio.to_thread(_write_state, Path(settings.spawn_state_file), data)
+        except OSError:
+            log.warning("Failed to save the spawn state", exc_info=True)
+
+    async def cog_load(self):
+        self.spawn_queue.start()
+
+    async def cog_unload(self):
+        await self.spawn_queue.stop()
+        if self.save_spawn_state.is_running():
+            self.save_spawn_state.cancel()
+            # save one last time to keep the latest progress across restarts
+            await self.save_spawn_state()
+
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message):
         if message.author.bot or message.webhook_id is not None:
@@ -70,7 +121,12 @@ class CountryBallsSpawner(commands.Cog):
             return
         ball = await BallSpawnView.get_random(self.bot)
         ball.algo = algo
-        await ball.spawn(cast(discord.TextChannel, channel))
+        # sent by the queue workers, don't hold the processing of the next events
+        self.spawn_queue.put_nowait(ball, cast(discord.TextChannel, channel))
+
+    @commands.Cog.listener()
+    async def on_ballsdex_cache_loaded(self):
+        clear_spawn_tables()
 
     @commands.Cog.listener()
     async def on_ballsdex_settings_change(
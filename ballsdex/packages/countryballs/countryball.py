@@ -1,28 +1,21 @@
 from __future__ import annotations
 
+import io
 import logging
 import math
 import random
 import string
-from datetime import datetime
 from typing import TYPE_CHECKING
 
 import discord
 from discord.ui import Button, Modal, TextInput, View, button
-from tortoise.timezone import get_default_timezone
-from tortoise.timezone import now as tortoise_now
-
-from ballsdex.core.metrics import caught_balls
-from ballsdex.core.models import (
-    Ball,
-    BallInstance,
-    Player,
-    Special,
-    Trade,
-    TradeObject,
-    balls,
-    specials,
-)
+
+from ballsdex.core.image_generator.wild_cards import get_wild_card_cache
+from ballsdex.core.metrics import catch_latency, caught_balls
+from ballsdex.core.models import Ball, BallInstance, Player, Special, balls
+from ballsdex.core.utils.names import get_catch_names, normalize_name
+from ballsdex.core.utils.sampling import AliasTable
+from ballsdex.packages.countryballs.catch import insert_caught_ball, transfer_caught_ball
 from ballsdex.settings import settings
 
 if TYPE_CHECKING:
@@ -30,6 +23,36 @@ if TYPE_CHECKING:
 
 log = logging.getLogger("ballsdex.packages.countryballs")
 
+# sampling tables of the spawns, built on first use from the loaded cache
+_ball_table: AliasTable[Ball] | None = None
+_special_table: AliasTable[Special | None] | None = None
+# the ongoing specials the table was built from, a new tuple is made by the timeline on change
+_special_table_source: tuple[Special, ...] | None = None
+
+
+def clear_spawn_tables():
+    """
+    Drop the sampling tables of the spawns. This must be called whenever balls or specials are
+    reloaded.
+    """
+    global _ball_table, _special_table, _special_table_source
+    _ball_table = None
+    _special_table = None
+    _special_table_source = None
+
+
+def _build_special_table(population: tuple[Special, ...]) -> AliasTable[Special | None]:
+    """
+    Build the sampling table of the given ongoing specials.
+    """
+    common_weight: float = 1 - sum(x.rarity for x in population)
+    if common_weight < 0:
+        common_weight = 0
+
+    weights = [x.rarity for x in population] + [common_weight]
+    # None is added representing the common countryball
+    return AliasTable([*population, None], weights)
+
 
 class CountryballNamePrompt(Modal, title=f"Catch this {settings.collectible_name}!"):
     name = TextInput(
@@ -55,11 +78,18 @@ class CountryballNamePrompt(Modal, title=f"Catch this {settings.collectible_name
                 f"An error occured with this {settings.collectible_name}.",
             )
 
+    async def get_player(self, user: discord.abc.User) -> Player:
+        # only used for the mention policy, don't create the player for a failed attempt
+        with catch_latency.labels(stage="player").time():
+            player = await Player.get_or_none(discord_id=user.id)
+        return player or Player(discord_id=user.id)
+
     async def on_submit(self, interaction: discord.Interaction["BallsDexBot"]):
-        await interaction.response.defer(thinking=True)
+        with catch_latency.labels(stage="defer").time():
+            await interaction.response.defer(thinking=True)
 
-        player, _ = await Player.get_or_create(discord_id=interaction.user.id)
         if self.view.caught:
+            player = await self.get_player(interaction.user)
             slow_message = random.choice(settings.slow_messages).format(
                 user=interaction.user.mention,
                 collectible=settings.collectible_name,
@@ -75,6 +105,7 @@ class CountryballNamePrompt(Modal, title=f"Catch this {settings.collectible_name
             return
 
         if not self.view.is_name_valid(self.name.value):
+            player = await self.get_player(interaction.user)
             if len(self.name.value) > 500:
                 wrong_name = self.name.value[:500] + "..."
             else:
@@ -98,14 +129,16 @@ class CountryballNamePrompt(Modal, title=f"Catch this {settings.collectible_name
             return
 
         ball, has_caught_before = await self.view.catch_ball(
-            interaction.user, player=player, guild=interaction.guild
+            interaction.user, player=None, guild=interaction.guild
         )
 
-        await interaction.followup.send(
-            self.view.get_catch_message(ball, has_caught_before, interaction.user.mention),
-            allowed_mentions=discord.AllowedMentions(users=player.can_be_mentioned),
-        )
-        await interaction.followup.edit_message(self.view.message.id, view=self.view)
+        with catch_latency.labels(stage="reply").time():
+            await interaction.followup.send(
+                self.view.get_catch_message(ball, has_caught_before, interaction.user.mention),
+                allowed_mentions=discord.AllowedMentions(users=ball.player.can_be_mentioned),
+            )
+        with catch_latency.labels(stage="edit").time():
+            await interaction.followup.edit_message(self.view.message.id, view=self.view)
 
 
 class BallSpawnView(View):
@@ -196,42 +229,25 @@ class BallSpawnView(View):
         """
         Get a new instance with a random countryball. Rarity values are taken into account.
         """
-        countryballs = list(filter(lambda m: m.enabled, balls.values()))
-        if not countryballs:
-            raise RuntimeError("No ball to spawn")
-        rarities = [x.rarity for x in countryballs]
-        cb = random.choices(population=countryballs, weights=rarities, k=1)[0]
-        return cls(bot, cb)
+        global _ball_table
+        if _ball_table is None:
+            countryballs = list(filter(lambda m: m.enabled, balls.values()))
+            if not countryballs:
+                raise RuntimeError("No ball to spawn")
+            _ball_table = AliasTable(countryballs, [x.rarity for x in countryballs])
+        return cls(bot, _ball_table.sample())
 
     @property
     def name(self):
         return self.model.country
 
     def get_random_special(self) -> Special | None:
-        population = [
-            x
-            for x in specials.values()
-            # handle null start/end dates with infinity times
-            if (x.start_date or datetime.min.replace(tzinfo=get_default_timezone()))
-            <= tortoise_now()
-            <= (x.end_date or datetime.max.replace(tzinfo=get_default_timezone()))
-        ]
-
-        if not population:
-            return None
-
-        common_weight: float = 1 - sum(x.rarity for x in population)
-
-        if common_weight < 0:
-            common_weight = 0
-
-        weights = [x.rarity for x in population] + [common_weight]
-        # None is added representing the common countryball
-        special: Special | None = random.choices(
-            population=population + [None], weights=weights, k=1
-        )[0]
-
-        return special
+        global _special_table, _special_table_source
+        population = self.bot.special_timeline.active
+        if _special_table is None or population is not _special_table_source:
+            _special_table = _build_special_table(population)
+            _special_table_source = population
+        return _special_table.sample()
 
     async def spawn(self, channel: discord.TextChannel) -> bool:
         """
@@ -254,12 +270,12 @@ class BallSpawnView(View):
             source = string.ascii_uppercase + string.ascii_lowercase + string.ascii_letters
             return "".join(random.choices(source, k=15))
 
-        extension = self.model.wild_card.split(".")[-1]
-        file_location = "./admin_panel/media/" + self.model.wild_card
-        file_name = f"nt_{generate_random_name()}.{extension}"
         try:
             permissions = channel.permissions_for(channel.guild.me)
             if permissions.attach_files and permissions.send_messages:
+                # optimized and kept in memory, no disk access for most spawns
+                wild_card = await get_wild_card_cache().get(self.model.wild_card)
+                file_name = f"nt_{generate_random_name()}.{wild_card.extension}"
                 spawn_message = random.choice(settings.spawn_messages).format(
                     collectible=settings.collectible_name,
                     ball=self.name,
@@ -269,7 +285,7 @@ class BallSpawnView(View):
                 self.message = await channel.send(
                     spawn_message,
                     view=self,
-                    file=discord.File(file_location, filename=file_name),
+                    file=discord.File(io.BytesIO(wild_card.data), filename=file_name),
                 )
                 return True
             else:
@@ -278,6 +294,8 @@ class BallSpawnView(View):
             log.error(f"Missing permission to spawn ball in channel {channel}.")
         except discord.HTTPException:
             log.error("Failed to spawn ball", exc_info=True)
+        except OSError:
+            log.error(f"Failed to read the wild card of {self.model}", exc_info=True)
         return False
 
     def is_name_valid(self, text: str) -> bool:
@@ -287,27 +305,15 @@ class BallSpawnView(View):
         Parameters
         ----------
         text: str
-            The text entered by the user. It will be lowered and stripped of enclosing blank
-            characters.
+            The text entered by the user. It is normalized like the catch names, see
+            `normalize_name`.
 
         Returns
         -------
         bool
             Whether the name matches or not.
         """
-        if self.model.catch_names:
-            possible_names = (self.name.lower(), *self.model.catch_names.split(";"))
-        else:
-            possible_names = (self.name.lower(),)
-        if self.model.translations:
-            possible_names += tuple(x.lower() for x in self.model.translations.split(";"))
-        cname = text.lower().strip()
-        # Remove fancy unicode characters like ’ to replace to '
-        cname = cname.replace("\u2019", "'")
-        cname = cname.replace("\u2018", "'")
-        cname = cname.replace("\u201c", '"')
-        cname = cname.replace("\u201d", '"')
-        return cname in possible_names
+        return normalize_name(text) in get_catch_names(self.model)
 
     async def catch_ball(
         self,
@@ -324,8 +330,9 @@ class BallSpawnView(View):
         ----------
         user: discord.User | discord.Member
             The user that will obtain the new countryball.
-        player: Player
-            If already fetched, add the player model here to avoid an additional query.
+        player: Player | None
+            If already fetched, add the player model here. This is only used when transferring
+            an existing instance, new instances create or fetch the player in the same query.
         guild: discord.Guild | None
             If caught in a guild, specify here for additional logs. Will be extracted from `user`
             if it's a member object.
@@ -348,20 +355,12 @@ class BallSpawnView(View):
             raise RuntimeError("This ball was already caught!")
         self.caught = True
         self.catch_button.disabled = True
-        player = player or (await Player.get_or_create(discord_id=user.id))[0]
-        is_new = not await BallInstance.filter(player=player, ball=self.model).exists()
 
         if self.ballinstance:
             # if specified, do not create a countryball but switch owner
             # it's important to register this as a trade to avoid bypass
-            trade = await Trade.create(player1=self.ballinstance.player, player2=player)
-            await TradeObject.create(
-                trade=trade, player=self.ballinstance.player, ballinstance=self.ballinstance
-            )
-            self.ballinstance.trade_player = self.ballinstance.player
-            self.ballinstance.player = player
-            self.ballinstance.locked = None  # type: ignore
-            await self.ballinstance.save(update_fields=("player_id", "trade_player_id", "locked"))
+            with catch_latency.labels(stage="transfer").time():
+                _, is_new = await transfer_caught_ball(user.id, self.ballinstance, player)
             return self.ballinstance, is_new
 
         # stat may vary by +/- 20% of base stat
@@ -382,15 +381,17 @@ class BallSpawnView(View):
         if not special:
             special = self.get_random_special()
 
-        ball = await BallInstance.create(
+        ball = BallInstance(
             ball=self.model,
-            player=player,
             special=special,
             attack_bonus=bonus_attack,
             health_bonus=bonus_health,
             server_id=guild.id if guild else None,
             spawned_time=self.message.created_at,
         )
+        # player upsert, first catch check and insert in a single round-trip
+        with catch_latency.labels(stage="insert").time():
+            _, is_new = await insert_caught_ball(user.id, ball)
 
         # logging and stats
         log.log(
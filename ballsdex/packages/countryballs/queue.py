@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+import discord
+
+from ballsdex.core.metrics import (
+    spawn_queue_depth,
+    spawn_queue_dropped,
+    spawn_queue_lag,
+    spawn_send_latency,
+)
+
+if TYPE_CHECKING:
+    from ballsdex.packages.countryballs.countryball import BallSpawnView
+
+log = logging.getLogger("ballsdex.packages.countryballs.queue")
+
+
+@dataclass(slots=True)
+class SpawnJob:
+    view: "BallSpawnView"
+    channel: discord.TextChannel
+    future: asyncio.Future[bool]
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class SpawnQueue:
+    """
+    Send spawn messages from a pool of workers, so that the processing of gateway events never
+    waits on Discord.
+
+    Spawns of the same channel are sent in order, at most one every `channel_interval` seconds,
+    while different channels are served concurrently.
+
+    Parameters
+    ----------
+    workers: int
+        Number of spawns sent at the same time.
+    max_size: int
+        Number of spawns that can wait to be sent. Above this, `put_nowait` drops new spawns and
+        `put` waits for room.
+    channel_interval: float
+        Minimum number of seconds between two spawns in the same channel.
+    max_per_channel: int
+        Number of spawns of the same channel that `put` lets wait, it waits for them to be sent
+        above this. Spawn bombs use `put`, this keeps them from filling the queue and causing
+        the natural spawns of other channels to be dropped.
+    """
+
+    def __init__(
+        self, workers: int, max_size: int, channel_interval: float, max_per_channel: int = 5
+    ):
+        self.workers = max(workers, 1)
+        self.max_size = max(max_size, 1)
+        self.channel_interval = channel_interval
+        self.max_per_channel = max(max_per_channel, 1)
+        self._size = 0
+        self._not_full = asyncio.Event()
+        # pending spawns of each channel, a channel stays in there (maybe with no spawn) until
+        # the interval after its last spawn passed, which keeps the next ones paced
+        self._pending: dict[int, deque[SpawnJob]] = {}
+        # channels with a spawn that can be sent right now
+        self._ready: asyncio.Queue[int] = asyncio.Queue()
+        self._tasks: list[asyncio.Task] = []
+
+    def __len__(self) -> int:
+        return self._size
+
+    def start(self):
+        for i in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker(), name=f"spawn-worker-{i}"))
+
+    async def stop(self):
+        """
+        Stop the workers and cancel the spawns that were not sent yet.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        for jobs in self._pending.values():
+            for job in jobs:
+                job.future.cancel()
+        self._pending.clear()
+        self._size = 0
+        spawn_queue_depth.set(0)
+
+    def put_nowait(
+        self, view: "BallSpawnView", channel: discord.TextChannel
+    ) -> asyncio.Future[bool] | None:
+        """
+        Queue a spawn, or drop it if the queue is full.
+
+        Returns
+        -------
+        asyncio.Future[bool] | None
+            Resolves to the result of `BallSpawnView.spawn` once sent, or `None` if the spawn was
+            dropped. Cancelling the future before the spawn is sent skips it.
+        """
+        if self._size >= self.max_size:
+            spawn_queue_dropped.inc()
+            log.warning(f"Spawn queue is full, dropped a spawn in channel {channel.id}")
+            return None
+        job = SpawnJob(view, channel, asyncio.get_running_loop().create_future())
+        self._size += 1
+        spawn_queue_depth.set(self._size)
+        jobs = self._pending.get(channel.id)
+        if jobs is None:
+            self._pending[channel.id] = deque((job,))
+            self._ready.put_nowait(channel.id)
+        else:
+            # the channel is busy or paced, it will be ready again once the interval passes
+            jobs.append(job)
+        return job.future
+
+    async def put(
+        self, view: "BallSpawnView", channel: discord.TextChannel
+    ) -> asyncio.Future[bool]:
+        """
+        Queue a spawn, waiting for room if the queue is full or if `max_per_channel` spawns of
+        this channel are already waiting.
+
+        Returns
+        -------
+        asyncio.Future[bool]
+            Resolves to the result of `BallSpawnView.spawn` once sent. Cancelling the future
+            before the spawn is sent skips it.
+        """
+        while (
+            self._size >= self.max_size
+            or len(self._pending.get(channel.id, ())) >= self.max_per_channel
+        ):
+            self._not_full.clear()
+            await self._not_full.wait()
+        future = self.put_nowait(view, channel)
+        assert future is not None
+        return future
+
+    def _release(self, channel_id: int):
+        jobs = self._pending.get(channel_id)
+        if jobs is None:
+            return  # stopped
+        if jobs:
+            self._ready.put_nowait(channel_id)
+        else:
+            del self._pending[channel_id]
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            channel_id = await self._ready.get()
+            if not (jobs := self._pending.get(channel_id)):
+                self._release(channel_id)
+                continue
+            job = jobs.popleft()
+            self._size -= 1
+            self._not_full.set()
+            spawn_queue_depth.set(self._size)
+            if job.future.done():
+                # cancelled while waiting
+                self._release(channel_id)
+                continue
+
+            start = time.monotonic()
+            spawn_queue_lag.observe(start - job.enqueued_at)
+            try:
+                result = await job.view.spawn(job.channel)
+            except asyncio.CancelledError:
+                job.future.cancel()
+                raise
+            except Exception:
+                log.exception(f"Failed to spawn in channel {job.channel}")
+                result = False
+            finally:
+                spawn_send_latency.observe(time.monotonic() - start)
+                if self.channel_interval > 0:
+                    loop.call_later(self.channel_interval, self._release, channel_id)
+                else:
+                    self._release(channel_id)
+            if not job.future.done():
+                job.future.set_result(result)
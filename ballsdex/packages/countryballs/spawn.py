@@ -1,15 +1,23 @@
 import asyncio
+import heapq
+import itertools
 import logging
 import random
+import struct
+import sys
+import time
 from abc import abstractmethod
-from collections import deque, namedtuple
+from array import array
+from collections import OrderedDict
 from dataclasses import dataclass, field
-from datetime import datetime
-from typing import TYPE_CHECKING, Literal
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Literal, Self
 
 import discord
+from cachetools import LRUCache
 from discord.utils import format_dt
 
+from ballsdex.core.metrics import spawn_cooldown_evictions, spawn_cooldowns
 from ballsdex.settings import settings
 
 if TYPE_CHECKING:
@@ -18,8 +26,141 @@ if TYPE_CHECKING:
 log = logging.getLogger("ballsdex.packages.countryballs")
 
 SPAWN_CHANCE_RANGE = (40, 55)
+# minimum number of seconds between two messages increasing the count of a guild
+INCREASE_COOLDOWN = 10
+# cooldowns of guilds without messages for this number of seconds are evicted from memory
+COOLDOWN_IDLE_TTL = 3600
+# maximum number of cooldowns held in memory, the least recently active ones are evicted first
+MAX_COOLDOWNS = 50_000
+# maximum number of evicted cooldowns whose progress is kept in compact form
+MAX_EVICTED_COOLDOWNS = 500_000
+
+# (time, scaled_message_count, threshold)
+CompactCooldown = tuple[datetime, float, int]
+
+# snapshots of the spawn state, see SpawnManager.dump_state
+SNAPSHOT_MAGIC = b"BDSPAWN"
+SNAPSHOT_VERSION = 1
+# number of authors kept per guild, enough to tell if there are less than 4 chatters
+SNAPSHOT_AUTHORS = 4
+# author of the restored messages whose author was not kept, see MessageCache.from_summary
+PLACEHOLDER_AUTHOR = 0
+# maximum number of guilds saved, the most recently active ones first
+SNAPSHOT_MAX_ENTRIES = 100_000
+# magic, version, save time
+SNAPSHOT_HEADER = struct.Struct("<7sBd")
+# guild ID, time, scaled message count, threshold, cached messages, short messages, then
+# (author ID, message count) pairs
+SNAPSHOT_RECORD = struct.Struct("<QddHBB" + "QB" * SNAPSHOT_AUTHORS)
+
+
+class MessageCache:
+    """
+    A ring buffer of the authors of the most recent messages in a guild, which only keeps what
+    the spawn penalties need: the author IDs in a fixed-size array, whether each message was
+    short, and counters updated as messages enter and leave the buffer.
+
+    Parameters
+    ----------
+    maxlen: int
+        Number of messages kept, the oldest one is dropped when a new one is added.
+
+    Attributes
+    ----------
+    author_counts: dict[int, int]
+        Number of cached messages of each author. The number of keys is the number of distinct
+        chatters.
+    short_messages: int
+        Number of cached messages shorter than 5 characters.
+    """
+
+    __slots__ = (
+        "maxlen",
+        "authors",
+        "short",
+        "position",
+        "length",
+        "author_counts",
+        "short_messages",
+    )
+
+    def __init__(self, maxlen: int = 100):
+        self.maxlen = maxlen
+        self.authors = array("Q", bytes(8 * maxlen))
+        self.short = bytearray(maxlen)
+        self.position = 0
+        self.length = 0
+        self.author_counts: dict[int, int] = {}
+        self.short_messages = 0
+
+    def __len__(self) -> int:
+        return self.length
+
+    def append(self, author_id: int, short: bool):
+        position = self.position
+        if self.length == self.maxlen:
+            oldest = self.authors[position]
+            if self.author_counts[oldest] == 1:
+                del self.author_counts[oldest]
+            else:
+                self.author_counts[oldest] -= 1
+            self.short_messages -= self.short[position]
+        else:
+            self.length += 1
+        self.authors[position] = author_id
+        self.short[position] = short
+        self.short_messages += short
+        self.author_counts[author_id] = self.author_counts.get(author_id, 0) + 1
+        self.position = (position + 1) % self.maxlen
+
+    @property
+    def chatters(self) -> int:
+        """
+        Number of distinct authors in the cache, not counting the placeholder author.
+        """
+        return len(self.author_counts) - (PLACEHOLDER_AUTHOR in self.author_counts)
 
-CachedMessage = namedtuple("CachedMessage", ["content", "author_id"])
+    def author_share(self, author_id: int) -> float:
+        """
+        Share of the cache capacity taken by the messages of this author.
+        """
+        return self.author_counts.get(author_id, 0) / self.maxlen
+
+    def summary(self) -> tuple[int, int, list[tuple[int, int]]]:
+        """
+        Return the number of cached messages, the number of short ones, and the authors with the
+        most messages along with their count, limited to `SNAPSHOT_AUTHORS`.
+        """
+        authors = heapq.nlargest(SNAPSHOT_AUTHORS, self.author_counts.items(), key=lambda x: x[1])
+        return self.length, self.short_messages, authors
+
+    @classmethod
+    def from_summary(
+        cls, length: int, short_messages: int, authors: list[tuple[int, int]], maxlen: int = 100
+    ) -> Self:
+        """
+        Rebuild a cache from `summary`. The order of the messages is lost, and messages of the
+        authors that were not kept are attributed to `PLACEHOLDER_AUTHOR`, which isn't counted as
+        a chatter. This gives the same penalties, since there were more than `SNAPSHOT_AUTHORS`
+        chatters in that case.
+        """
+        cache = cls(maxlen)
+        sequence = [author for author, count in authors for _ in range(count)]
+        sequence.extend([PLACEHOLDER_AUTHOR] * (length - len(sequence)))
+        for i, author in enumerate(sequence[:maxlen]):
+            cache.append(author, i < short_messages)
+        return cache
+
+    def memory_usage(self) -> int:
+        """
+        Approximate number of bytes used by this cache.
+        """
+        return (
+            sys.getsizeof(self)
+            + sys.getsizeof(self.authors)
+            + sys.getsizeof(self.short)
+            + sys.getsizeof(self.author_counts)
+        )
 
 
 class BaseSpawnManager:
@@ -75,8 +216,29 @@ class BaseSpawnManager:
         """
         raise NotImplementedError
 
+    async def dump_state(self) -> bytes | None:
+        """
+        Serialize the state of the spawn manager, which is periodically saved and given to
+        `load_state` after a restart. Return `None` if there is nothing to save.
+
+        This runs on the event loop, avoid blocking it for too long.
+        """
+        return None
+
+    def load_state(self, data: bytes):
+        """
+        Restore a state previously returned by `dump_state`. Invalid or outdated states
+        should be ignored.
+
+        Parameters
+        ----------
+        data: bytes
+            The data returned by `dump_state`
+        """
+        pass
 
-@dataclass
+
+@dataclass(slots=True)
 class SpawnCooldown:
     """
     Represents the default spawn internal system per guild. Contains the counters that will
@@ -92,71 +254,203 @@ class SpawnCooldown:
     threshold: int
         The number `scaled_message_count` has to reach for spawn.
         Determined randomly with `SPAWN_CHANCE_RANGE`
-    lock: asyncio.Lock
-        Used to ratelimit messages and ignore fast spam
-    message_cache: ~collections.deque[CachedMessage]
-        A list of recent messages used to reduce the spawn chance when too few different chatters
-        are present. Limited to the 100 most recent messages in the guild.
+    next_increase: float
+        Monotonic time before which messages don't increase the count, used to ratelimit
+        messages and ignore fast spam
+    message_cache: MessageCache
+        The authors of recent messages used to reduce the spawn chance when too few different
+        chatters are present. Limited to the 100 most recent messages in the guild.
+    last_seen: float
+        Monotonic time of the last message in the guild, used to evict idle cooldowns
     """
 
     time: datetime
     # initialize partially started, to reduce the dead time after starting the bot
     scaled_message_count: float = field(default=SPAWN_CHANCE_RANGE[0] // 2)
     threshold: int = field(default_factory=lambda: random.randint(*SPAWN_CHANCE_RANGE))
-    lock: asyncio.Lock = field(default_factory=asyncio.Lock, init=False)
-    message_cache: deque[CachedMessage] = field(default_factory=lambda: deque(maxlen=100))
+    next_increase: float = field(default=0, init=False)
+    message_cache: MessageCache = field(default_factory=MessageCache)
+    last_seen: float = field(default=0, init=False)
+
+    @classmethod
+    def from_compact(cls, compact: CompactCooldown) -> Self:
+        time, scaled_message_count, threshold = compact
+        return cls(time, scaled_message_count=scaled_message_count, threshold=threshold)
+
+    def compact(self) -> CompactCooldown:
+        """
+        Return the progress of this cooldown in a compact form, without the message cache.
+        """
+        return (self.time, self.scaled_message_count, self.threshold)
 
     def reset(self, time: datetime):
         self.scaled_message_count = 1.0
         self.threshold = random.randint(*SPAWN_CHANCE_RANGE)
-        try:
-            self.lock.release()
-        except RuntimeError:  # lock is not acquired
-            pass
+        self.next_increase = 0
         self.time = time
 
-    async def increase(self, message: discord.Message) -> bool:
-        # this is a deque, not a list
-        # its property is that, once the max length is reached (100 for us),
-        # the oldest element is removed, thus we only have the last 100 messages in memory
-        self.message_cache.append(
-            CachedMessage(content=message.content, author_id=message.author.id)
-        )
+    def memory_usage(self) -> int:
+        """
+        Approximate number of bytes used by this cooldown, including its message cache.
+        """
+        return sys.getsizeof(self) + sys.getsizeof(self.time) + self.message_cache.memory_usage()
 
-        if self.lock.locked():
-            return False
+    @property
+    def on_cooldown(self) -> bool:
+        return time.monotonic() < self.next_increase
+
+    def increase(self, message: discord.Message) -> bool:
+        self.message_cache.append(message.author.id, len(message.content) < 5)
 
-        async with self.lock:
-            message_multiplier = 1
-            if message.guild.member_count < 5 or message.guild.member_count > 1000:  # type: ignore
-                message_multiplier /= 2
-            if message._state.intents.message_content and len(message.content) < 5:
-                message_multiplier /= 2
-            if len(set(x.author_id for x in self.message_cache)) < 4 or (
-                len(list(filter(lambda x: x.author_id == message.author.id, self.message_cache)))
-                / self.message_cache.maxlen  # type: ignore
-                > 0.4
-            ):
-                message_multiplier /= 2
-            self.scaled_message_count += message_multiplier
-            await asyncio.sleep(10)
+        now = time.monotonic()
+        if now < self.next_increase:
+            return False
+        self.next_increase = now + INCREASE_COOLDOWN
+
+        message_multiplier = 1
+        if message.guild.member_count < 5 or message.guild.member_count > 1000:  # type: ignore
+            message_multiplier /= 2
+        if message._state.intents.message_content and len(message.content) < 5:
+            message_multiplier /= 2
+        if (
+            self.message_cache.chatters < 4
+            or self.message_cache.author_share(message.author.id) > 0.4
+        ):
+            message_multiplier /= 2
+        self.scaled_message_count += message_multiplier
         return True
 
 
+class CooldownCache:
+    """
+    Holds the cooldowns of the guilds in memory, evicting those of guilds that became idle or
+    the least recently active ones when there are too many. The progress of evicted cooldowns
+    is kept in compact form and restored when the guild becomes active again.
+
+    Parameters
+    ----------
+    max_entries: int
+        Maximum number of cooldowns held in memory.
+    idle_ttl: float
+        Cooldowns of guilds without messages for this number of seconds are evicted.
+    max_evicted: int
+        Maximum number of evicted cooldowns whose progress is kept.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = MAX_COOLDOWNS,
+        idle_ttl: float = COOLDOWN_IDLE_TTL,
+        max_evicted: int = MAX_EVICTED_COOLDOWNS,
+    ):
+        self.max_entries = max_entries
+        self.idle_ttl = idle_ttl
+        # ordered from the least to the most recently active guild
+        self.cooldowns: OrderedDict[int, SpawnCooldown] = OrderedDict()
+        self.evicted: LRUCache[int, CompactCooldown] = LRUCache(maxsize=max_evicted)
+
+    def __len__(self) -> int:
+        return len(self.cooldowns)
+
+    def get(self, guild_id: int) -> SpawnCooldown | None:
+        """
+        Return the cooldown of a guild if it is in memory, without marking it as active.
+        """
+        return self.cooldowns.get(guild_id)
+
+    def values(self):
+        return self.cooldowns.values()
+
+    def memory_usage(self) -> int:
+        """
+        Approximate number of bytes used by the cooldowns in memory and the evicted ones.
+        """
+        # evicted entries all have the same shape, measure one of them: its key, the tuple and
+        # its values. The mappings of the cache are measured separately.
+        compact_size = 0
+        if self.evicted:
+            guild_id, compact = next(iter(self.evicted.items()))
+            compact_size = (
+                sys.getsizeof(guild_id)
+                + sys.getsizeof(compact)
+                + sum(sys.getsizeof(x) for x in compact)
+            )
+        evicted_mappings = sum(
+            sys.getsizeof(x) for x in vars(self.evicted).values() if isinstance(x, dict)
+        )
+        return (
+            sys.getsizeof(self.cooldowns)
+            + sum(sys.getsizeof(x) + y.memory_usage() for x, y in self.cooldowns.items())
+            + evicted_mappings
+            + len(self.evicted) * compact_size
+        )
+
+    def restore(self, guild_id: int) -> SpawnCooldown | None:
+        """
+        Return the cooldown of a guild, restoring it from its compact form if it was evicted,
+        or `None` if the guild has no cooldown.
+        """
+        cooldown = self.cooldowns.get(guild_id)
+        if cooldown is None and (compact := self.evicted.pop(guild_id, None)):
+            cooldown = SpawnCooldown.from_compact(compact)
+            cooldown.last_seen = time.monotonic()
+            self.cooldowns[guild_id] = cooldown
+            spawn_cooldowns.set(len(self.cooldowns))
+        return cooldown
+
+    def get_or_create(self, guild_id: int, created_at: datetime) -> SpawnCooldown:
+        """
+        Return the cooldown of a guild and mark it as active. It is restored from its compact
+        form if it was evicted, or created otherwise.
+        """
+        now = time.monotonic()
+        cooldown = self.cooldowns.get(guild_id)
+        if cooldown is None:
+            if compact := self.evicted.pop(guild_id, None):
+                cooldown = SpawnCooldown.from_compact(compact)
+            else:
+                cooldown = SpawnCooldown(created_at)
+            self.cooldowns[guild_id] = cooldown
+            spawn_cooldowns.set(len(self.cooldowns))
+        else:
+            self.cooldowns.move_to_end(guild_id)
+        cooldown.last_seen = now
+        self.evict(now)
+        return cooldown
+
+    def evict(self, now: float):
+        """
+        Evict the cooldowns that are idle or above the maximum number of entries. Since they
+        are ordered by activity, this stops at the first one that should be kept.
+        """
+        evicted = False
+        while self.cooldowns:
+            guild_id, oldest = next(iter(self.cooldowns.items()))
+            if len(self.cooldowns) > self.max_entries:
+                reason = "size"
+            elif now - oldest.last_seen > self.idle_ttl:
+                reason = "idle"
+            else:
+                break
+            del self.cooldowns[guild_id]
+            self.evicted[guild_id] = oldest.compact()
+            spawn_cooldown_evictions.labels(reason=reason).inc()
+            evicted = True
+        if evicted:
+            spawn_cooldowns.set(len(self.cooldowns))
+
+
 class SpawnManager(BaseSpawnManager):
     def __init__(self, bot: "BallsDexBot"):
         super().__init__(bot)
-        self.cooldowns: dict[int, SpawnCooldown] = {}
+        self.cooldowns = CooldownCache()
 
     async def handle_message(self, message: discord.Message) -> bool:
         guild = message.guild
         if not guild:
             return False
 
-        cooldown = self.cooldowns.get(guild.id, None)
-        if not cooldown:
-            cooldown = SpawnCooldown(message.created_at)
-            self.cooldowns[guild.id] = cooldown
+        cooldown = self.cooldowns.get_or_create(guild.id, message.created_at)
 
         delta_t = (message.created_at - cooldown.time).total_seconds()
         # change how the threshold varies according to the member count, while nuking farm servers
@@ -172,7 +466,7 @@ class SpawnManager(BaseSpawnManager):
             time_multiplier = 0.2
 
         # manager cannot be increased more than once per 10 seconds
-        if not await cooldown.increase(message):
+        if not cooldown.increase(message):
             return False
 
         # normal increase, need to reach goal
@@ -188,10 +482,107 @@ class SpawnManager(BaseSpawnManager):
         cooldown.reset(message.created_at)
         return True
 
+    def memory_usage(self) -> int:
+        """
+        Approximate number of bytes used by the cooldowns of all guilds.
+        """
+        return self.cooldowns.memory_usage()
+
+    async def dump_state(self) -> bytes:
+        """
+        Serialize the cooldowns, including the evicted ones, into fixed-size records. At most
+        `SNAPSHOT_MAX_ENTRIES` guilds are saved, the most recently active ones first, and
+        control is given back to the event loop regularly.
+        """
+        buffer = bytearray(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, time.time()))
+        padding = [(0, 0)] * SNAPSHOT_AUTHORS
+        active = list(self.cooldowns.cooldowns.items())
+        evicted = list(self.cooldowns.evicted.items())
+        entries = 0
+        for guild_id, cooldown in reversed(active):
+            length, short_messages, authors = cooldown.message_cache.summary()
+            buffer += SNAPSHOT_RECORD.pack(
+                guild_id,
+                cooldown.time.timestamp(),
+                cooldown.scaled_message_count,
+                cooldown.threshold,
+                length,
+                short_messages,
+                *itertools.chain.from_iterable((authors + padding)[:SNAPSHOT_AUTHORS]),
+            )
+            entries += 1
+            if entries >= SNAPSHOT_MAX_ENTRIES:
+                break
+            if entries % 5000 == 0:
+                await asyncio.sleep(0)
+        for guild_id, (cooldown_time, scaled_message_count, threshold) in reversed(evicted):
+            if entries >= SNAPSHOT_MAX_ENTRIES:
+                break
+            buffer += SNAPSHOT_RECORD.pack(
+                guild_id,
+                cooldown_time.timestamp(),
+                scaled_message_count,
+                threshold,
+                0,
+                0,
+                *itertools.chain.from_iterable(padding),
+            )
+            entries += 1
+            if entries % 5000 == 0:
+                await asyncio.sleep(0)
+        return bytes(buffer)
+
+    def load_state(self, data: bytes):
+        try:
+            magic, version, saved_at = SNAPSHOT_HEADER.unpack_from(data)
+        except struct.error:
+            log.warning("Spawn state is truncated, ignoring it.")
+            return
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            log.warning(f"Unsupported spawn state version {version}, ignoring it.")
+            return
+        if (len(data) - SNAPSHOT_HEADER.size) % SNAPSHOT_RECORD.size:
+            log.warning("Spawn state is truncated, ignoring it.")
+            return
+
+        now = time.monotonic()
+        active: list[tuple[int, SpawnCooldown]] = []
+        evicted: list[tuple[int, CompactCooldown]] = []
+        for record in SNAPSHOT_RECORD.iter_unpack(data[SNAPSHOT_HEADER.size :]):
+            guild_id, timestamp, scaled_message_count, threshold, length, short_messages = record[
+                :6
+            ]
+            cooldown_time = datetime.fromtimestamp(timestamp, tz=timezone.utc)
+            if not length:
+                evicted.append((guild_id, (cooldown_time, scaled_message_count, threshold)))
+                continue
+            authors = [(x, y) for x, y in zip(record[6::2], record[7::2]) if y]
+            cooldown = SpawnCooldown(
+                cooldown_time,
+                scaled_message_count=scaled_message_count,
+                threshold=threshold,
+                message_cache=MessageCache.from_summary(length, short_messages, authors),
+            )
+            cooldown.last_seen = now
+            active.append((guild_id, cooldown))
+
+        # records are saved from the most to the least recently active
+        for guild_id, compact in reversed(evicted):
+            self.cooldowns.evicted[guild_id] = compact
+        for guild_id, cooldown in reversed(active):
+            self.cooldowns.cooldowns[guild_id] = cooldown
+        self.cooldowns.evict(now)
+        spawn_cooldowns.set(len(self.cooldowns))
+        age = datetime.now(timezone.utc) - datetime.fromtimestamp(saved_at, tz=timezone.utc)
+        log.info(
+            f"Restored the spawn state of {len(active) + len(evicted)} guilds, "
+            f"saved {age.total_seconds():.0f} seconds ago."
+        )
+
     async def admin_explain(
         self, interaction: discord.Interaction["BallsDexBot"], guild: discord.Guild
     ):
-        cooldown = self.cooldowns.get(guild.id)
+        cooldown = self.cooldowns.restore(guild.id)
         if not cooldown:
             await interaction.response.send_message(
                 "No spawn manager could be found for that guild. Spawn may have been disabled.",
@@ -227,19 +618,16 @@ class SpawnManager(BaseSpawnManager):
         penalities: list[str] = []
         if guild.member_count < 5 or guild.member_count > 1000:
             penalities.append("Server has less than 5 or more than 1000 members")
-        if any(len(x.content) < 5 for x in cooldown.message_cache):
+        if cooldown.message_cache.short_messages:
             penalities.append("Some cached messages are less than 5 characters long")
 
-        authors_set = set(x.author_id for x in cooldown.message_cache)
-        low_chatters = len(authors_set) < 4
+        message_cache = cooldown.message_cache
+        low_chatters = message_cache.chatters < 4
         # check if one author has more than 40% of messages in cache
         major_chatter = any(
-            (
-                len(list(filter(lambda x: x.author_id == author, cooldown.message_cache)))
-                / cooldown.message_cache.maxlen  # type: ignore
-                > 0.4
-            )
-            for author in authors_set
+            message_cache.author_share(x) > 0.4
+            for x in message_cache.author_counts
+            if x != PLACEHOLDER_AUTHOR
         )
         # this mess is needed since either conditions make up to a single penality
         if low_chatters:
@@ -266,7 +654,9 @@ class SpawnManager(BaseSpawnManager):
         embed.description = (
             f"Manager initiated **{format_dt(cooldown.time, style='R')}**\n"
             f"Initial number of points to reach: **{cooldown.threshold}**\n"
-            f"Message cache length: **{len(cooldown.message_cache)}**\n\n"
+            f"Message cache length: **{len(cooldown.message_cache)}**\n"
+            f"Memory usage: **{cooldown.memory_usage()}** bytes "
+            f"*({len(self.cooldowns)} guilds, {self.memory_usage() // 1024} KiB in total)*\n\n"
             f"Time-based multiplier: **x{multiplier}** *({range} members)*\n"
             "*This affects how much the number of points to reach reduces over time*\n"
             f"Penality multiplier: **x{penality_multiplier}**\n"
@@ -275,7 +665,7 @@ class SpawnManager(BaseSpawnManager):
         )
 
         informations: list[str] = []
-        if cooldown.lock.locked():
+        if cooldown.on_cooldown:
             informations.append("The manager is currently on cooldown.")
         if delta < 600:
             informations.append(
@@ -27,7 +27,9 @@ from ballsdex.core.utils.enums import (
     PRIVATE_POLICY_MAP,
 )
 from ballsdex.core.utils.enums import TRADE_COOLDOWN_POLICY_MAP as TRADE_POLICY_MAP
+from ballsdex.core.utils.owned import get_owned_balls_cache
 from ballsdex.core.utils.paginator import FieldPageSource, Pages
+from ballsdex.core.utils.player_stats import get_player_stats
 from ballsdex.settings import settings
 
 if TYPE_CHECKING:
@@ -230,6 +232,7 @@ class Player(commands.GroupCog):
             return
         player, _ = await PlayerModel.get_or_create(discord_id=interaction.user.id)
         await player.delete()
+        get_owned_balls_cache().invalidate(player.discord_id)
 
     @friend.command(name="add")
     async def friend_add(
@@ -545,23 +548,17 @@ class Player(commands.GroupCog):
         """
         await interaction.response.defer(thinking=True, ephemeral=True)
         try:
-            player = await PlayerModel.get(discord_id=interaction.user.id).prefetch_related(
-                "balls"
-            )
+            player = await PlayerModel.get(discord_id=interaction.user.id)
         except DoesNotExist:
             await interaction.followup.send("You haven't got any info to show!", ephemeral=True)
             return
-        ball = await BallInstance.filter(player=player).prefetch_related("special", "trade_player")
+        stats = await get_player_stats(player)
 
         user = interaction.user
         bot_countryballs = {x: y.emoji_id for x, y in balls.items() if y.enabled}
         total_countryballs = len(bot_countryballs)
-        owned_countryballs = set(
-            x[0]
-            for x in await player.balls.filter(ball__enabled=True)
-            .distinct()
-            .values_list("ball_id")
-        )
+        owned_countryballs = (await get_owned_balls_cache().get(player.discord_id)).ids()
+        owned_countryballs.intersection_update(bot_countryballs)
 
         if total_countryballs > 0:
             completion_percentage = (
@@ -570,20 +567,6 @@ class Player(commands.GroupCog):
         else:
             completion_percentage = "0.0%"
 
-        caught_owned = [x for x in ball if x.trade_player is None]
-        balls_owned = [x for x in ball]
-        special = [x for x in ball if x.special is not None]
-        trades = await Trade.filter(
-            Q(player1__discord_id=interaction.user.id) | Q(player2__discord_id=interaction.user.id)
-        ).values_list("player1__discord_id", "player2__discord_id")
-
-        trade_partners = set()
-        for p1, p2 in trades:
-            if p1 != interaction.user.id:
-                trade_partners.add(p1)
-            if p2 != interaction.user.id:
-                trade_partners.add(p2)
-
         friends = await Friendship.filter(
             Q(player1__discord_id=interaction.user.id) | Q(player2__discord_id=interaction.user.id)
         ).count()
@@ -605,11 +588,11 @@ class Player(commands.GroupCog):
             f"**Amount of Blocked Users:** {blocks}\n"
             "## Player Stats\n"
             f"**Completion:** {completion_percentage}\n"
-            f"**{settings.collectible_name.title()}s Owned:** {len(balls_owned):,}\n"
-            f"**Caught {settings.collectible_name.title()}s Owned**: {len(caught_owned):,}\n"
-            f"**Special {settings.collectible_name.title()}s:** {len(special):,}\n"
-            f"**Trades Completed:** {len(trades):,}\n"
-            f"**Amount of Users Traded With:** {len(trade_partners):,}"
+            f"**{settings.collectible_name.title()}s Owned:** {stats.balls:,}\n"
+            f"**Caught {settings.collectible_name.title()}s Owned**: {stats.caught_balls:,}\n"
+            f"**Special {settings.collectible_name.title()}s:** {stats.special_balls:,}\n"
+            f"**Trades Completed:** {stats.trades:,}\n"
+            f"**Amount of Users Traded With:** {stats.trade_partners:,}"
         )
         embed.set_footer(text="Keep collecting and trading to improve your stats!")
         embed.set_thumbnail(url=user.display_avatar)  # type: ignore
@@ -8,11 +8,14 @@ from typing import TYPE_CHECKING, List, Set, cast
 import discord
 from discord.ui import Button, View, button
 from discord.utils import format_dt, utcnow
+from tortoise.transactions import in_transaction
 
 from ballsdex.core.models import BallInstance, Player, Trade, TradeCooldownPolicy, TradeObject
 from ballsdex.core.utils import menus
 from ballsdex.core.utils.buttons import ConfirmChoiceView
+from ballsdex.core.utils.owned import get_owned_balls_cache
 from ballsdex.core.utils.paginator import Pages
+from ballsdex.core.utils.player_stats import TradeStats
 from ballsdex.packages.balls.countryballs_paginator import CountryballsViewer
 from ballsdex.packages.trade.display import fill_trade_embed_fields
 from ballsdex.packages.trade.trade_user import TradingUser
@@ -347,37 +350,51 @@ class TradeMenu:
 
     async def perform_trade(self):
         valid_transferable_countryballs: list[BallInstance] = []
+        stats = TradeStats(self.trader1.player, self.trader2.player)
+
+        async with in_transaction():
+            trade = await Trade.create(player1=self.trader1.player, player2=self.trader2.player)
+
+            for countryball in self.trader1.proposal:
+                await countryball.refresh_from_db()
+                if countryball.player.discord_id != self.trader1.player.discord_id:
+                    # This is a invalid mutation, the player is not the owner of the countryball
+                    raise InvalidTradeOperation()
+                stats.add(countryball)
+                countryball.player = self.trader2.player
+                countryball.trade_player = self.trader1.player
+                countryball.favorite = False
+                valid_transferable_countryballs.append(countryball)
+                await TradeObject.create(
+                    trade=trade, ballinstance=countryball, player=self.trader1.player
+                )
 
-        trade = await Trade.create(player1=self.trader1.player, player2=self.trader2.player)
-
-        for countryball in self.trader1.proposal:
-            await countryball.refresh_from_db()
-            if countryball.player.discord_id != self.trader1.player.discord_id:
-                # This is a invalid mutation, the player is not the owner of the countryball
-                raise InvalidTradeOperation()
-            countryball.player = self.trader2.player
-            countryball.trade_player = self.trader1.player
-            countryball.favorite = False
-            valid_transferable_countryballs.append(countryball)
-            await TradeObject.create(
-                trade=trade, ballinstance=countryball, player=self.trader1.player
-            )
-
-        for countryball in self.trader2.proposal:
-            if countryball.player.discord_id != self.trader2.player.discord_id:
-                # This is a invalid mutation, the player is not the owner of the countryball
-                raise InvalidTradeOperation()
-            countryball.player = self.trader1.player
-            countryball.trade_player = self.trader2.player
-            countryball.favorite = False
-            valid_transferable_countryballs.append(countryball)
-            await TradeObject.create(
-                trade=trade, ballinstance=countryball, player=self.trader2.player
-            )
+            for countryball in self.trader2.proposal:
+                if countryball.player.discord_id != self.trader2.player.discord_id:
+                    # This is a invalid mutation, the player is not the owner of the countryball
+                    raise InvalidTradeOperation()
+                stats.add(countryball)
+                countryball.player = self.trader1.player
+                countryball.trade_player = self.trader2.player
+                countryball.favorite = False
+                valid_transferable_countryballs.append(countryball)
+                await TradeObject.create(
+                    trade=trade, ballinstance=countryball, player=self.trader2.player
+                )
 
-        for countryball in valid_transferable_countryballs:
-            await countryball.unlock()
-            await countryball.save()
+            for countryball in valid_transferable_countryballs:
+                await countryball.unlock()
+                await countryball.save()
+            await stats.save(trade)
+
+        owned_balls = get_owned_balls_cache()
+        for trader, partner in ((self.trader1, self.trader2), (self.trader2, self.trader1)):
+            if trader.proposal:
+                owned_balls.invalidate(trader.player.discord_id)
+            for countryball in partner.proposal:
+                owned_balls.add(
+                    trader.player.discord_id, countryball.ball_id, countryball.special_id
+                )
 
     async def confirm(self, trader: TradingUser) -> bool:
         """
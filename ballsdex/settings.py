@@ -62,12 +62,60 @@ class Settings:
         List of packages the bot will load upon startup
     spawn_manager: str
         Python path to a class implementing `BaseSpawnManager`, handling cooldowns and anti-cheat
+    spawn_state_file: str | None
+        File where the state of the spawn manager is periodically saved and restored on startup
+    spawn_workers: int
+        Number of spawn messages sent at the same time
+    spawn_queue_size: int
+        Number of spawns that can wait to be sent before new ones are dropped
+    spawn_channel_interval: float
+        Minimum number of seconds between two spawns in the same channel
+    owned_balls_cache_size: int
+        Number of players whose owned balls are kept in memory. 0 disables the cache.
+    owned_balls_cache_ttl: float
+        Number of seconds after which the owned balls of a player are queried again
     webhook_url: str | None
         URL of a Discord webhook for admin notifications
     client_id: str
         ID of the Discord application
     client_secret: str
         Secret key of the Discord application (not the bot token)
+    card_cache_memory: int
+        Memory budget of the rendered cards cache, in megabytes. 0 disables the cache.
+    card_cache_directory: str | None
+        If set, rendered cards and the credits color of each background are also stored on disk
+        in this directory
+    card_cache_disk_size: int
+        Maximum size of the rendered cards stored on disk, in megabytes. The oldest ones are
+        removed past this size. 0 doesn't limit it.
+    asset_cache_memory: int
+        Memory budget of the decoded card assets cache, in megabytes. 0 disables the cache.
+    base_layer_cache_memory: int
+        Memory budget of the static layers of the cards, in megabytes, per renderer process.
+        0 disables the cache.
+    preload_assets: bool
+        Decode all card assets on startup instead of on first use
+    wild_card_cache_memory: int
+        Memory budget of the optimized wild cards sent with spawns, in megabytes. 0 disables the
+        cache.
+    wild_card_max_size: int
+        Maximum width and height of the wild cards sent with spawns, 0 keeps the original size
+    wild_card_format: str | None
+        Format the wild cards are re-encoded to before being sent, defaults to their own format
+    warmup_cards: int
+        Number of popular cards rendered in the background when the cache is loaded
+    render_workers: int
+        Number of processes rendering cards. 0 renders in a thread of the bot process instead.
+    render_queue_size: int
+        Number of cards that can wait for a free renderer process before new requests are held
+    render_service_url: str | None
+        URL of a standalone render service, either HTTP or "unix:" followed by a socket path
+    card_profiles: dict[str, dict]
+        Output profiles for the cards, overriding or extending the built-in ones
+    message_card_profile: str
+        Name of the output profile used for cards sent in messages
+    browse_card_profile: str
+        Name of the output profile used for cards opened while browsing a list of balls
     """
 
     bot_token: str = ""
@@ -110,6 +158,12 @@ class Settings:
     prometheus_port: int = 15260
 
     spawn_manager: str = "ballsdex.packages.countryballs.spawn.SpawnManager"
+    spawn_state_file: str | None = None
+    spawn_workers: int = 4
+    spawn_queue_size: int = 1000
+    spawn_channel_interval: float = 1
+    owned_balls_cache_size: int = 10000
+    owned_balls_cache_ttl: float = 600
 
     # django admin panel
     webhook_url: str | None = None
@@ -117,6 +171,24 @@ class Settings:
     client_id: str = ""
     client_secret: str = ""
 
+    # card rendering
+    card_cache_memory: int = 64
+    card_cache_directory: str | None = None
+    card_cache_disk_size: int = 1024
+    asset_cache_memory: int = 256
+    base_layer_cache_memory: int = 128
+    preload_assets: bool = False
+    wild_card_cache_memory: int = 64
+    wild_card_max_size: int = 0
+    wild_card_format: str | None = None
+    warmup_cards: int = 0
+    render_workers: int = 2
+    render_queue_size: int = 32
+    render_service_url: str | None = None
+    card_profiles: dict[str, dict] = field(default_factory=dict)
+    message_card_profile: str = "full"
+    browse_card_profile: str = "compact"
+
     # sentry details
     sentry_dsn: str = ""
     sentry_environment: str = "production"
@@ -181,6 +253,14 @@ def read_settings(path: "Path"):
     settings.spawn_manager = content.get(
         "spawn-manager", "ballsdex.packages.countryballs.spawn.SpawnManager"
     )
+    settings.spawn_state_file = content.get("spawn-state-file")
+    if spawn_queue := content.get("spawn-queue"):
+        settings.spawn_workers = spawn_queue.get("workers", 4)
+        settings.spawn_queue_size = spawn_queue.get("size", 1000)
+        settings.spawn_channel_interval = spawn_queue.get("channel-interval", 1)
+    if owned_balls_cache := content.get("owned-balls-cache"):
+        settings.owned_balls_cache_size = owned_balls_cache.get("size", 10000)
+        settings.owned_balls_cache_ttl = owned_balls_cache.get("ttl", 600)
 
     if admin := content.get("admin-panel"):
         settings.webhook_url = admin.get("webhook-url")
@@ -188,6 +268,24 @@ def read_settings(path: "Path"):
         settings.client_secret = admin.get("client-secret")
         settings.admin_url = admin.get("url")
 
+    if rendering := content.get("rendering"):
+        settings.card_cache_memory = rendering.get("card-cache-memory", 64)
+        settings.card_cache_directory = rendering.get("card-cache-directory")
+        settings.card_cache_disk_size = rendering.get("card-cache-disk-size", 1024)
+        settings.asset_cache_memory = rendering.get("asset-cache-memory", 256)
+        settings.base_layer_cache_memory = rendering.get("base-layer-cache-memory", 128)
+        settings.preload_assets = rendering.get("preload-assets", False)
+        settings.wild_card_cache_memory = rendering.get("wild-card-cache-memory", 64)
+        settings.wild_card_max_size = rendering.get("wild-card-max-size", 0)
+        settings.wild_card_format = rendering.get("wild-card-format")
+        settings.warmup_cards = rendering.get("warmup-cards", 0)
+        settings.render_workers = rendering.get("workers", 2)
+        settings.render_queue_size = rendering.get("queue-size", 32)
+        settings.render_service_url = rendering.get("service-url")
+        settings.card_profiles = rendering.get("profiles") or {}
+        settings.message_card_profile = rendering.get("message-profile", "full")
+        settings.browse_card_profile = rendering.get("browse-profile", "compact")
+
     if sentry := content.get("sentry"):
         settings.sentry_dsn = sentry.get("dsn")
         settings.sentry_environment = sentry.get("environment")
@@ -323,6 +421,98 @@ prometheus:
 
 spawn-manager: ballsdex.packages.countryballs.spawn.SpawnManager
 
+# save the spawn progress of each server in this file, allowing restarts without resetting it
+# leave empty to disable, use a different file for each process if you run multiple clusters
+spawn-state-file:
+
+# spawn messages are sent in the background by a pool of workers
+spawn-queue:
+
+  # number of spawn messages sent at the same time
+  workers: 4
+
+  # number of spawns waiting to be sent, new spawns are dropped above this
+  size: 1000
+
+  # minimum number of seconds between two spawns in the same channel
+  channel-interval: 1
+
+# the balls owned by each player are kept in memory for /balls completion and compare
+owned-balls-cache:
+
+  # number of players kept in memory, set to 0 to disable
+  size: 10000
+
+  # number of seconds after which the balls of a player are queried again, this bounds how
+  # long changes made by other clusters or the admin panel go unnoticed
+  ttl: 600
+
+# card rendering and caching, the defaults should be fine for most bots
+rendering:
+
+  # memory budget of the rendered cards cache, in megabytes, set to 0 to disable
+  card-cache-memory: 64
+
+  # also store rendered cards on disk in this directory, leave empty to disable
+  card-cache-directory:
+
+  # maximum size of the cards stored on disk, in megabytes, the oldest ones are removed first
+  # set to 0 to never remove them
+  card-cache-disk-size: 1024
+
+  # memory budget of the decoded backgrounds, artworks and icons, in megabytes
+  # a decoded background takes about 11MB, set to 0 to disable
+  asset-cache-memory: 256
+
+  # memory budget of the cards without their stats, in megabytes, in each renderer process
+  # a layer takes about 11MB, set to 0 to disable
+  base-layer-cache-memory: 128
+
+  # decode all assets on startup instead of on first use
+  preload-assets: false
+
+  # wild cards sent with spawns are optimized and kept in memory, budget in megabytes
+  wild-card-cache-memory: 64
+
+  # wild cards larger than this are downscaled before being sent, 0 to keep their size
+  wild-card-max-size: 0
+
+  # re-encode the wild cards to this format (PNG, WEBP or JPEG), leave empty to keep theirs
+  # the original file is sent if it's smaller or animated
+  wild-card-format:
+
+  # number of popular cards rendered in the background on startup, 0 to disable
+  # this requires the card cache, you can also use the "warmup" text command
+  warmup-cards: 0
+
+  # number of processes rendering cards, set to 0 to render inside the bot process
+  workers: 2
+
+  # number of cards that can wait for a free process, further requests are held until then
+  queue-size: 32
+
+  # URL of a render service shared between processes, leave empty to render in this process
+  # start it with "python3 -m ballsdex.core.image_generator.service"
+  # use "unix:/path/to/socket" for a unix socket or "http://localhost:15261"
+  service-url:
+
+  # output profile of the cards sent in messages
+  # built-in profiles are "full", "compact" (half size) and "archival" (lossless)
+  message-profile: full
+
+  # output profile of the cards opened while browsing a list, like /balls list
+  browse-profile: compact
+
+  # define your own profiles or override the built-in ones, for example:
+  # profiles:
+  #   small:
+  #     format: WEBP  # WEBP, PNG or JPEG
+  #     quality: 70  # 0-100, lossy formats only
+  #     method: 6  # 0-6, WEBP compression effort
+  #     lossless: false  # WEBP only
+  #     scale: 0.4  # factor applied to the card dimensions
+  profiles:
+
 # sentry details, leave empty if you don't know what this is
 # https://sentry.io/ for error tracking
 sentry:
@@ -369,8 +559,12 @@ def update_settings(path: "Path"):
     add_plural_collectible = "plural-collectible-name" not in content
     add_packages = "packages:" not in content
     add_spawn_manager = "spawn-manager" not in content
+    add_spawn_state = "spawn-state-file" not in content
+    add_spawn_queue = "spawn-queue:" not in content
+    add_owned_balls_cache = "owned-balls-cache:" not in content
     add_django = "Admin panel related settings" not in content
     add_sentry = "sentry:" not in content
+    add_rendering = "rendering:" not in content
     add_catch_messages = "catch:" not in content
 
     for line in content.splitlines():
@@ -437,6 +631,45 @@ packages:
         content += """
 # define a custom spawn manager implementation
 spawn-manager: ballsdex.packages.countryballs.spawn.SpawnManager
+
+# save the spawn progress of each server in this file, allowing restarts without resetting it
+# leave empty to disable, use a different file for each process if you run multiple clusters
+spawn-state-file:
+"""
+
+    if add_spawn_state and not add_spawn_manager:
+        content += """
+# save the spawn progress of each server in this file, allowing restarts without resetting it
+# leave empty to disable, use a different file for each process if you run multiple clusters
+spawn-state-file:
+"""
+
+    if add_spawn_queue:
+        content += """
+# spawn messages are sent in the background by a pool of workers
+spawn-queue:
+
+  # number of spawn messages sent at the same time
+  workers: 4
+
+  # number of spawns waiting to be sent, new spawns are dropped above this
+  size: 1000
+
+  # minimum number of seconds between two spawns in the same channel
+  channel-interval: 1
+"""
+
+    if add_owned_balls_cache:
+        content += """
+# the balls owned by each player are kept in memory for /balls completion and compare
+owned-balls-cache:
+
+  # number of players kept in memory, set to 0 to disable
+  size: 10000
+
+  # number of seconds after which the balls of a player are queried again, this bounds how
+  # long changes made by other clusters or the admin panel go unnoticed
+  ttl: 600
 """
 
     if add_django:
@@ -468,6 +701,75 @@ sentry:
     environment: "production"
 """
 
+    if add_rendering:
+        content += """
+# card rendering and caching, the defaults should be fine for most bots
+rendering:
+
+  # memory budget of the rendered cards cache, in megabytes, set to 0 to disable
+  card-cache-memory: 64
+
+  # also store rendered cards on disk in this directory, leave empty to disable
+  card-cache-directory:
+
+  # maximum size of the cards stored on disk, in megabytes, the oldest ones are removed first
+  # set to 0 to never remove them
+  card-cache-disk-size: 1024
+
+  # memory budget of the decoded backgrounds, artworks and icons, in megabytes
+  # a decoded background takes about 11MB, set to 0 to disable
+  asset-cache-memory: 256
+
+  # memory budget of the cards without their stats, in megabytes, in each renderer process
+  # a layer takes about 11MB, set to 0 to disable
+  base-layer-cache-memory: 128
+
+  # decode all assets on startup instead of on first use
+  preload-assets: false
+
+  # wild cards sent with spawns are optimized and kept in memory, budget in megabytes
+  wild-card-cache-memory: 64
+
+  # wild cards larger than this are downscaled before being sent, 0 to keep their size
+  wild-card-max-size: 0
+
+  # re-encode the wild cards to this format (PNG, WEBP or JPEG), leave empty to keep theirs
+  # the original file is sent if it's smaller or animated
+  wild-card-format:
+
+  # number of popular cards rendered in the background on startup, 0 to disable
+  # this requires the card cache, you can also use the "warmup" text command
+  warmup-cards: 0
+
+  # number of processes rendering cards, set to 0 to render inside the bot process
+  workers: 2
+
+  # number of cards that can wait for a free process, further requests are held until then
+  queue-size: 32
+
+  # URL of a render service shared between processes, leave empty to render in this process
+  # start it with "python3 -m ballsdex.core.image_generator.service"
+  # use "unix:/path/to/socket" for a unix socket or "http://localhost:15261"
+  service-url:
+
+  # output profile of the cards sent in messages
+  # built-in profiles are "full", "compact" (half size) and "archival" (lossless)
+  message-profile: full
+
+  # output profile of the cards opened while browsing a list, like /balls list
+  browse-profile: compact
+
+  # define your own profiles or override the built-in ones, for example:
+  # profiles:
+  #   small:
+  #     format: WEBP  # WEBP, PNG or JPEG
+  #     quality: 70  # 0-100, lossy formats only
+  #     method: 6  # 0-6, WEBP compression effort
+  #     lossless: false  # WEBP only
+  #     scale: 0.4  # factor applied to the card dimensions
+  profiles:
+"""
+
     if add_catch_messages:
         content += """
 catch:
@@ -507,8 +809,12 @@ catch:
             add_plural_collectible,
             add_packages,
             add_spawn_manager,
+            add_spawn_state,
+            add_spawn_queue,
+            add_owned_balls_cache,
             add_django,
             add_sentry,
+            add_rendering,
             add_catch_messages,
         )
     ):
@@ -0,0 +1,42 @@
+"""
+Microbenchmark of the credits color computation of the cards.
+
+Compares the previous pure-Python brightness computation with the current one on a synthetic
+background, no media or database needed.
+
+Usage: python3 -m benchmarks.credits_color [--runs 20]
+"""
+
+import argparse
+import timeit
+
+from PIL import Image
+
+from ballsdex.core.image_generator.image_gen import get_credit_color
+
+
+def legacy_credit_color(image: Image.Image, region: tuple) -> tuple:
+    image = image.crop(region)
+    brightness = sum(image.convert("L").getdata()) / image.width / image.height  # type: ignore
+    return (0, 0, 0, 255) if brightness > 100 else (255, 255, 255, 255)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the credits color computation")
+    parser.add_argument("--runs", type=int, default=20, help="Number of runs per implementation")
+    args = parser.parse_args()
+
+    # a gradient gives a realistic brightness spread over the 1428x2000 background
+    gradient = Image.linear_gradient("L").resize((1428, 2000))
+    background = Image.merge("RGBA", (gradient, gradient, gradient, gradient))
+    region = (0, int(background.height * 0.8), background.width, background.height)
+
+    assert legacy_credit_color(background, region) == get_credit_color(background, region)
+
+    for name, function in (("legacy", legacy_credit_color), ("current", get_credit_color)):
+        total = timeit.timeit(lambda: function(background, region), number=args.runs)
+        print(f"{name:>8}: {total / args.runs * 1000:8.3f}ms per call")
+
+
+if __name__ == "__main__":
+    main()
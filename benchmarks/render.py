@@ -0,0 +1,270 @@
+"""
+Benchmark of the card rendering pipeline.
+
+Cards are rendered from synthetic regimes, economies, specials and balls generated in a
+temporary directory, no media or database needed. Two scenarios are measured:
+
+- cold: all caches are cleared before each card, every asset is decoded and fitted again
+- warm: caches are kept, only the stats are drawn and the card encoded
+
+For each scenario, the time spent per stage (open, convert, text, fit, paste, encode) and in
+total is reported as p50/p95/p99. The peak memory growth of the process is reported for the
+cold scenario only: once the caches are filled, a render doesn't raise the peak anymore, and
+tracemalloc can't see the memory allocated by Pillow.
+
+Results can be saved as a baseline, and later runs compared against it. The command exits with
+status 1 if any p50 or p95 exceeds the baseline by more than the threshold.
+
+Usage: python3 -m benchmarks.render [--renders 50] [--profile full]
+    [--save-baseline benchmarks/render_baseline.json]
+    [--baseline benchmarks/render_baseline.json --threshold 0.2]
+"""
+
+import argparse
+import gc
+import json
+import multiprocessing
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from pathlib import Path
+
+from PIL import Image, ImageDraw
+
+from ballsdex.core.image_generator import image_gen
+from ballsdex.core.image_generator.assets import get_asset_cache
+from ballsdex.core.image_generator.image_gen import CardSpec
+from ballsdex.core.image_generator.profiles import CardProfile, get_profile
+from ballsdex.core.image_generator.renderer import render_to_bytes
+from ballsdex.core.image_generator.stages import STAGES, record_stages
+
+# stages under this duration (in seconds) are not checked against the baseline, too noisy
+MIN_CHECKED_DURATION = 0.001
+
+WORDS = (
+    "republic union federation kingdom empire island north south grand free united "
+    "people democratic socialist royal principality duchy confederation commonwealth"
+).split()
+
+
+def _random_color(rng: random.Random, alpha: int = 255) -> tuple[int, int, int, int]:
+    return (rng.randrange(256), rng.randrange(256), rng.randrange(256), alpha)
+
+
+def _make_image(rng: random.Random, size: tuple[int, int], path: Path):
+    """
+    Save a noisy gradient with a few shapes, which compresses like real artwork rather than
+    like a flat color.
+    """
+    gradient = Image.linear_gradient("L").resize(size)
+    noise = Image.effect_noise(size, 40)
+    channels = [Image.blend(gradient, noise, rng.random()) for _ in range(3)]
+    image = Image.merge("RGB", channels).convert("RGBA")
+    draw = ImageDraw.Draw(image)
+    for _ in range(12):
+        x, y = rng.randrange(size[0]), rng.randrange(size[1])
+        radius = rng.randrange(20, max(size) // 4)
+        draw.ellipse((x - radius, y - radius, x + radius, y + radius), fill=_random_color(rng))
+    image.save(path)
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def make_fixtures(directory: Path, balls: int, seed: int) -> list[CardSpec]:
+    """
+    Generate synthetic assets in the given directory and return the cards of each ball, with
+    and without special. Paths of the specs are relative to the directory.
+    """
+    rng = random.Random(seed)
+    regimes = []
+    for i in range(3):
+        _make_image(rng, (1428, 2000), directory / f"regime{i}.png")
+        regimes.append(f"regime{i}.png")
+    economies = []
+    for i in range(3):
+        _make_image(rng, (512, 512), directory / f"economy{i}.png")
+        economies.append(f"economy{i}.png")
+    specials = []
+    for i in range(2):
+        _make_image(rng, (1428, 2000), directory / f"special{i}.png")
+        specials.append(f"special{i}.png")
+
+    specs = []
+    for i in range(balls):
+        # artworks are uploaded with various sizes and ratios, they all need fitting
+        size = (rng.randrange(600, 2000), rng.randrange(400, 1400))
+        _make_image(rng, size, directory / f"artwork{i}.png")
+        base = dict(
+            title=_sentence(rng, rng.randint(1, 2))[:20],
+            capacity_name=_sentence(rng, rng.randint(1, 5)),
+            capacity_description=_sentence(rng, rng.randint(5, 20)),
+            credits=_sentence(rng, 2),
+            special_credits=None,
+            background=rng.choice(regimes),
+            artwork=f"artwork{i}.png",
+            economy_icon=rng.choice(economies + [None]),
+            health=rng.randrange(1, 5000),
+            attack=rng.randrange(1, 5000),
+        )
+        specs.append(CardSpec(**base))
+        specs.append(
+            CardSpec(**(base | dict(background=rng.choice(specials), special_credits="someone")))
+        )
+    return specs
+
+
+def clear_caches():
+    image_gen.clear_cache()
+    get_asset_cache().clear()
+
+
+def _max_rss() -> int:
+    # kilobytes on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def percentiles(values: list[float]) -> dict[str, float]:
+    quantiles = statistics.quantiles(values, n=100, method="inclusive")
+    return {"p50": quantiles[49], "p95": quantiles[94], "p99": quantiles[98]}
+
+
+def run_scenario(
+    name: str, specs: list[CardSpec], renders: int, media_path: str, profile: CardProfile
+) -> dict:
+    """
+    Render cards and return the percentiles of each stage, and the peak memory growth for the
+    cold scenario. This is run in a fresh process for each scenario, since the peak memory of a
+    process never goes down.
+    """
+    cold = name == "cold"
+    rng = random.Random(name)
+    samples: dict[str, list[float]] = {x: [] for x in (*STAGES, "total")}
+
+    if not cold:
+        # fill the caches before measuring
+        for spec in specs:
+            render_to_bytes(spec, profile, media_path)
+    gc.collect()
+    rss_before = _max_rss()
+
+    for i in range(renders):
+        spec = specs[i % len(specs)]
+        if cold:
+            clear_caches()
+        else:
+            # only the stats differ between two instances of the same card
+            spec = replace(spec, health=rng.randrange(1, 5000), attack=rng.randrange(1, 5000))
+        with record_stages() as timings:
+            start = time.perf_counter()
+            render_to_bytes(spec, profile, media_path)
+            total = time.perf_counter() - start
+        for stage in STAGES:
+            samples[stage].append(timings.get(stage, 0))
+        samples["total"].append(total)
+
+    return {
+        "timings": {key: percentiles(values) for key, values in samples.items()},
+        "memory_peak": _max_rss() - rss_before if cold else None,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    Return the list of regressions of the results against the baseline.
+    """
+    regressions = []
+    for scenario, result in results.items():
+        if scenario not in baseline:
+            continue
+        for key, values in result["timings"].items():
+            reference = baseline[scenario]["timings"].get(key)
+            if reference is None:
+                continue
+            for percentile in ("p50", "p95"):
+                if reference[percentile] < MIN_CHECKED_DURATION:
+                    continue
+                limit = reference[percentile] * (1 + threshold)
+                if values[percentile] > limit:
+                    regressions.append(
+                        f"{scenario} {key} {percentile}: {values[percentile] * 1000:.2f}ms "
+                        f"(baseline {reference[percentile] * 1000:.2f}ms)"
+                    )
+        reference = baseline[scenario].get("memory_peak")
+        if (
+            reference
+            and result["memory_peak"]
+            and result["memory_peak"] > reference * (1 + threshold)
+        ):
+            regressions.append(
+                f"{scenario} memory peak: {result['memory_peak'] / 1024 / 1024:.1f}MB "
+                f"(baseline {reference / 1024 / 1024:.1f}MB)"
+            )
+    return regressions
+
+
+def print_results(results: dict):
+    for scenario, result in results.items():
+        if result["memory_peak"] is None:
+            print(f"\n{scenario}")
+        else:
+            print(f"\n{scenario} ({result['memory_peak'] / 1024 / 1024:.1f}MB memory peak)")
+        print(f"{'stage':>8} {'p50':>10} {'p95':>10} {'p99':>10}")
+        for key, values in result["timings"].items():
+            print(
+                f"{key:>8} "
+                + " ".join(f"{values[x] * 1000:8.2f}ms" for x in ("p50", "p95", "p99"))
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the card rendering pipeline")
+    parser.add_argument("--renders", type=int, default=50, help="Number of cards per scenario")
+    parser.add_argument("--balls", type=int, default=10, help="Number of synthetic balls")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic fixtures")
+    parser.add_argument("--profile", default="full", help="Output profile of the cards")
+    parser.add_argument("--save-baseline", type=Path, help="Write the results to this file")
+    parser.add_argument("--baseline", type=Path, help="Compare the results with this file")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Maximum allowed slowdown against the baseline, 0.2 is 20%%",
+    )
+    args = parser.parse_args()
+    if args.renders < 2:
+        parser.error("At least 2 renders are needed")
+    profile = get_profile(args.profile)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        specs = make_fixtures(Path(directory), args.balls, args.seed)
+        media_path = directory + "/"
+        for scenario in ("cold", "warm"):
+            with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                results[scenario] = pool.submit(
+                    run_scenario, scenario, specs, args.renders, media_path, profile
+                ).result()
+    print_results(results)
+
+    if args.save_baseline:
+        args.save_baseline.write_text(json.dumps(results, indent=2))
+        print(f"\nBaseline saved to {args.save_baseline}")
+    if args.baseline:
+        regressions = compare(results, json.loads(args.baseline.read_text()), args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regressions above {args.threshold:.0%}:")
+            print("\n".join(regressions))
+            sys.exit(1)
+        print(f"\nNo regression above {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
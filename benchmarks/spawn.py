@@ -0,0 +1,348 @@
+"""
+Offline simulator of the spawn algorithms.
+
+A trace of messages is replayed through one or more spawn managers, with fake Discord messages
+and a fake clock, no bot or database needed. Traces are either synthetic, generated from a
+seed, or recorded in a CSV file with the columns:
+
+    timestamp,guild_id,member_count,author_id,length
+
+where timestamp is in seconds and length is the length of the message content.
+
+For each manager, the following is reported:
+
+- spawns per guild-hour, overall and per guild size
+- the distribution of the multiplier applied to each counted message (only for managers
+  using `CooldownCache`, like the default one), 1.0 meaning no penalty
+- the throughput of `handle_message`, in messages per second
+
+Time in the spawn modules is replaced by the fake clock, managers must call the functions of
+the `time` module (`time.monotonic()`, not `from time import monotonic`) for this to work.
+
+Usage: python3 -m benchmarks.spawn [--guilds 500] [--hours 6] [--seed 0]
+    [--trace trace.csv] [--save-trace trace.csv]
+    [--manager ballsdex.packages.countryballs.spawn.SpawnManager ...]
+"""
+
+import argparse
+import asyncio
+import bisect
+import csv
+import heapq
+import importlib
+import itertools
+import random
+import statistics
+import sys
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import ModuleType, SimpleNamespace
+from typing import Iterator, NamedTuple
+
+from ballsdex.packages.countryballs.spawn import BaseSpawnManager, CooldownCache
+
+DEFAULT_MANAGER = "ballsdex.packages.countryballs.spawn.SpawnManager"
+# start of the fake clock, the date doesn't matter
+EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+# same thresholds as the default spawn manager
+SIZE_BUCKETS = ((5, "<5"), (100, "<100"), (1000, "<1000"), (sys.maxsize, ">=1000"))
+
+
+class TraceMessage(NamedTuple):
+    timestamp: float
+    guild_id: int
+    member_count: int
+    author_id: int
+    length: int
+
+
+@dataclass(slots=True)
+class FakeGuild:
+    id: int
+    member_count: int
+    name: str
+
+
+@dataclass(slots=True)
+class FakeAuthor:
+    id: int
+    bot: bool = False
+
+
+@dataclass(slots=True)
+class FakeMessage:
+    """
+    The attributes of `discord.Message` read by the spawn managers.
+    """
+
+    guild: FakeGuild
+    author: FakeAuthor
+    content: str
+    created_at: datetime
+    _state: SimpleNamespace
+    webhook_id: int | None = None
+
+
+class FakeClock:
+    """
+    Replacement of the `time` module in the spawn modules, returning the time of the message
+    being replayed.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return EPOCH.timestamp() + self.now
+
+    def __getattr__(self, name: str):
+        return getattr(time, name)
+
+
+@contextmanager
+def patch_clock(clock: FakeClock, modules: list[ModuleType]) -> Iterator[None]:
+    """
+    Replace the `time` module imported by the given modules with the fake clock.
+    """
+    patched = [x for x in modules if getattr(x, "time", None) is time]
+    for module in patched:
+        module.time = clock  # type: ignore
+    try:
+        yield
+    finally:
+        for module in patched:
+            module.time = time  # type: ignore
+
+
+def _snowflake(rng: random.Random) -> int:
+    # ABSpawner splits guilds with the timestamp bits of the IDs
+    return (rng.randrange(1 << 41) << 22) | rng.randrange(1 << 22)
+
+
+def generate_trace(guilds: int, hours: float, seed: int, farm_ratio: float) -> list[TraceMessage]:
+    """
+    Generate the messages of random guilds. Guild sizes follow a log-normal distribution, the
+    activity grows with the size, and a few authors write most messages. Farm guilds are tiny
+    guilds with a single author sending a message every few seconds.
+    """
+    rng = random.Random(seed)
+    duration = hours * 3600
+    streams = []
+    for _ in range(guilds):
+        guild_id = _snowflake(rng)
+        if rng.random() < farm_ratio:
+            member_count = rng.randint(2, 4)
+            authors = [_snowflake(rng)]
+            rate = 3600 / rng.uniform(3, 15)
+            short_ratio = 0.8
+        else:
+            member_count = min(max(int(rng.lognormvariate(4, 1.5)), 2), 500_000)
+            active_authors = max(1, min(member_count, 2 * int(member_count**0.5)))
+            authors = [_snowflake(rng) for _ in range(active_authors)]
+            rate = min(0.5 * member_count**0.6 * rng.lognormvariate(0, 1), 3000)
+            short_ratio = 0.2
+        # zipf-like, the first authors are the most active
+        weights = list(itertools.accumulate(1 / (i + 1) ** 1.1 for i in range(len(authors))))
+
+        messages = []
+        timestamp = rng.expovariate(rate / 3600)
+        while timestamp < duration:
+            author = authors[bisect.bisect(weights, rng.random() * weights[-1])]
+            length = rng.randint(1, 4) if rng.random() < short_ratio else rng.randint(5, 80)
+            messages.append(TraceMessage(timestamp, guild_id, member_count, author, length))
+            timestamp += rng.expovariate(rate / 3600)
+        streams.append(messages)
+    return list(heapq.merge(*streams))
+
+
+def read_trace(path: Path) -> list[TraceMessage]:
+    with path.open(newline="") as file:
+        rows = csv.DictReader(file)
+        trace = [
+            TraceMessage(
+                float(x["timestamp"]),
+                int(x["guild_id"]),
+                int(x["member_count"]),
+                int(x["author_id"]),
+                int(x["length"]),
+            )
+            for x in rows
+        ]
+    trace.sort()
+    return trace
+
+
+def write_trace(path: Path, trace: list[TraceMessage]):
+    with path.open("w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(TraceMessage._fields)
+        writer.writerows(trace)
+
+
+def build_messages(trace: list[TraceMessage], message_content: bool) -> list[FakeMessage]:
+    state = SimpleNamespace(intents=SimpleNamespace(message_content=message_content))
+    guilds: dict[int, FakeGuild] = {}
+    authors: dict[int, FakeAuthor] = {}
+    messages = []
+    for row in trace:
+        guild = guilds.get(row.guild_id)
+        if guild is None:
+            guild = guilds[row.guild_id] = FakeGuild(row.guild_id, row.member_count, "")
+        author = authors.get(row.author_id)
+        if author is None:
+            author = authors[row.author_id] = FakeAuthor(row.author_id)
+        created_at = EPOCH + timedelta(seconds=row.timestamp)
+        messages.append(FakeMessage(guild, author, "x" * row.length, created_at, state))
+    return messages
+
+
+def load_manager(path: str) -> tuple[BaseSpawnManager, list[ModuleType]]:
+    """
+    Instantiate a spawn manager from its Python path, and return the modules whose clock must
+    be replaced.
+    """
+    module_path, class_name = path.rsplit(".", 1)
+    cls = getattr(importlib.import_module(module_path), class_name)
+    manager = cls(SimpleNamespace())
+    classes = set(type(manager).__mro__)
+    # A/B spawners wrap other managers
+    for attribute in vars(manager).values():
+        if isinstance(attribute, BaseSpawnManager):
+            classes.update(type(attribute).__mro__)
+    modules = {sys.modules[x.__module__] for x in classes if x.__module__ in sys.modules}
+    return manager, list(modules)
+
+
+def _size_bucket(member_count: int) -> str:
+    return next(name for limit, name in SIZE_BUCKETS if member_count < limit)
+
+
+async def simulate(
+    manager: BaseSpawnManager, messages: list[FakeMessage], clock: FakeClock
+) -> tuple[Counter[int], Counter[float], float]:
+    """
+    Replay the messages through the manager.
+
+    Returns
+    -------
+    tuple[Counter[int], Counter[float], float]
+        The number of spawns per guild, the number of counted messages per multiplier, and the
+        time spent in `handle_message` in seconds.
+    """
+    spawns: Counter[int] = Counter()
+    multipliers: Counter[float] = Counter()
+    cooldowns: CooldownCache | None = getattr(manager, "cooldowns", None)
+    if not isinstance(cooldowns, CooldownCache):
+        cooldowns = None
+    elapsed = 0.0
+
+    for message in messages:
+        clock.now = (message.created_at - EPOCH).total_seconds()
+        # None for the first message of a guild, its count starts at an arbitrary value
+        before = None
+        if cooldowns is not None:
+            if cooldown := cooldowns.get(message.guild.id):
+                before = cooldown.scaled_message_count
+            elif compact := cooldowns.evicted.get(message.guild.id):
+                before = compact[1]
+
+        start = time.perf_counter()
+        result = await manager.handle_message(message)  # type: ignore
+        elapsed += time.perf_counter() - start
+
+        if result is not False:
+            spawns[message.guild.id] += 1
+        elif cooldowns is not None and before is not None:
+            cooldown = cooldowns.get(message.guild.id)
+            delta = cooldown.scaled_message_count - before if cooldown else 0
+            if delta > 0:
+                multipliers[delta] += 1
+    return spawns, multipliers, elapsed
+
+
+def print_report(
+    name: str,
+    trace: list[TraceMessage],
+    spawns: Counter[int],
+    multipliers: Counter[float],
+    elapsed: float,
+):
+    hours = (trace[-1].timestamp - trace[0].timestamp) / 3600 if len(trace) > 1 else 0
+    sizes = {x.guild_id: x.member_count for x in trace}
+    print(f"\n{name}")
+    print(f"  {sum(spawns.values())} spawns in {len(sizes)} guilds over {hours:.1f} hours")
+    if hours:
+        per_bucket: dict[str, list[float]] = defaultdict(list)
+        for guild_id, member_count in sizes.items():
+            per_bucket[_size_bucket(member_count)].append(spawns[guild_id] / hours)
+        print(f"  {'guild size':>12} {'guilds':>8} {'mean':>8} {'p50':>8} {'p95':>8}  spawns/h")
+        rows = [(x, per_bucket[x]) for _, x in SIZE_BUCKETS if x in per_bucket]
+        rows.append(("all", [x for _, values in rows for x in values]))
+        for bucket, values in rows:
+            p95 = statistics.quantiles(values, n=20)[18] if len(values) > 1 else values[0]
+            print(
+                f"  {bucket:>12} {len(values):>8} {statistics.fmean(values):8.3f} "
+                f"{statistics.median(values):8.3f} {p95:8.3f}"
+            )
+    if multipliers:
+        counted = sum(multipliers.values())
+        print("  multiplier of counted messages:")
+        for multiplier, count in sorted(multipliers.items(), reverse=True):
+            print(f"  {multiplier:>12.3f} {count:>8} ({count / counted:.1%})")
+    print(
+        f"  handle_message: {len(trace) / elapsed:,.0f} messages/s "
+        f"({elapsed / len(trace) * 1_000_000:.2f}µs per message)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay message traces through spawn managers")
+    parser.add_argument(
+        "--manager",
+        action="append",
+        help="Python path of a spawn manager, can be repeated to compare several",
+    )
+    parser.add_argument("--trace", type=Path, help="Replay this CSV trace instead of generating")
+    parser.add_argument("--save-trace", type=Path, help="Write the replayed trace to this file")
+    parser.add_argument("--guilds", type=int, default=500, help="Number of synthetic guilds")
+    parser.add_argument("--hours", type=float, default=6, help="Duration of the synthetic trace")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic trace")
+    parser.add_argument(
+        "--farm-ratio", type=float, default=0.05, help="Share of synthetic farm guilds"
+    )
+    parser.add_argument(
+        "--no-message-content",
+        action="store_true",
+        help="Simulate a bot without the message content intent",
+    )
+    args = parser.parse_args()
+
+    if args.trace:
+        trace = read_trace(args.trace)
+    else:
+        trace = generate_trace(args.guilds, args.hours, args.seed, args.farm_ratio)
+    if not trace:
+        parser.error("The trace is empty")
+    print(f"Replaying {len(trace):,} messages")
+    if args.save_trace:
+        write_trace(args.save_trace, trace)
+
+    for path in args.manager or [DEFAULT_MANAGER]:
+        # a fresh manager and messages for each run, managers may keep references to them
+        manager, modules = load_manager(path)
+        messages = build_messages(trace, not args.no_message_content)
+        clock = FakeClock()
+        with patch_clock(clock, modules):
+            spawns, multipliers, elapsed = asyncio.run(simulate(manager, messages, clock))
+        print_report(path, trace, spawns, multipliers, elapsed)
+
+
+if __name__ == "__main__":
+    main()
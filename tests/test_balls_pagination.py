@@ -0,0 +1,126 @@
+"""
+Tests of the pages of /balls list, walked for each ordering against the same instances sorted
+in Python. They run on an in-memory SQLite database.
+"""
+
+import asyncio
+import random
+from collections import Counter
+
+import pytest
+from tortoise import Tortoise
+
+from ballsdex.core.models import Ball, BallInstance, Player, Regime, Special, Trade, TradeObject
+from ballsdex.core.utils.sorting import SortingChoices
+from ballsdex.packages.balls.countryballs_paginator import CountryballsQuerySource
+
+S = SortingChoices
+
+
+def sort_key(sort: SortingChoices | None, instance: BallInstance, duplicates: Counter[int]):
+    ball = instance.ball
+    keys = {
+        None: (-instance.favorite,),
+        S.alphabetic: (ball.country,),
+        S.catch_date: (-instance.catch_date.timestamp(),),
+        S.rarity: (ball.rarity, ball.country),
+        S.special: (instance.special_id or 2**31,),
+        S.health: (-(instance.health_bonus + ball.health),),
+        S.attack: (-(instance.attack_bonus + ball.attack),),
+        S.health_bonus: (-instance.health_bonus,),
+        S.attack_bonus: (-instance.attack_bonus,),
+        S.stats_bonus: (-(instance.health_bonus + instance.attack_bonus),),
+        S.duplicates: (-duplicates[instance.ball_id],),
+        S.total_stats: (-(ball.health + ball.attack),),
+    }
+    return keys[sort] + (instance.pk,)
+
+
+@pytest.fixture
+def sqlite_models(monkeypatch):
+    # the PostgreSQL indexes can't be created on SQLite
+    for model in (BallInstance, Trade, TradeObject):
+        monkeypatch.setattr(model._meta, "indexes", ())
+
+
+async def create_collection(rng: random.Random) -> Player:
+    regime = await Regime.create(name="Democracy", background="/democracy.png")
+    balls = [
+        await Ball.create(
+            country=f"Ball {i}",
+            regime=regime,
+            health=rng.randint(1, 5),
+            attack=rng.randint(1, 5),
+            rarity=rng.choice([1.0, 2.5]),
+            emoji_id=100000000000000000,
+            wild_card="/wild.png",
+            collection_card="/card.png",
+            credits="test",
+            capacity_name="test",
+            capacity_description="test",
+        )
+        for i in range(6)
+    ]
+    specials = [
+        await Special.create(name=f"Special {i}", catch_phrase="", rarity=0.1) for i in range(2)
+    ]
+    player = await Player.create(discord_id=100000000000000001)
+    for _ in range(137):
+        await BallInstance.create(
+            ball=rng.choice(balls),
+            player=player,
+            special=rng.choice([None, None, *specials]),
+            health_bonus=rng.randint(-2, 2),
+            attack_bonus=rng.randint(-2, 2),
+            favorite=rng.random() < 0.1,
+        )
+    return player
+
+
+async def walk_pages(sort: SortingChoices | None, reverse: bool):
+    player = await create_collection(random.Random(1))
+    queryset = BallInstance.filter(player=player)
+    count = await queryset.count()
+    source = CountryballsQuerySource(queryset, count, sort, reverse, per_page=10)
+
+    # every page in order, then a few jumps back and forth which must give the same pages
+    pages: dict[int, list[int]] = {}
+    for page in [*range(source.get_max_pages()), 5, 2, 13, 3]:
+        ids = [x.pk for x in await source.get_page(page)]
+        assert pages.setdefault(page, ids) == ids, page
+    ids = [x for page in sorted(pages) for x in pages[page]]
+    assert sorted(ids) == sorted(set(ids)) and len(ids) == count
+
+    instances = {x.pk: x for x in await queryset.prefetch_related("ball")}
+    duplicates = Counter(x.ball_id for x in instances.values())
+    expected = sorted(
+        instances.values(), key=lambda x: sort_key(sort, x, duplicates), reverse=reverse
+    )
+    assert ids == [x.pk for x in expected]
+
+
+@pytest.mark.usefixtures("sqlite_models")
+@pytest.mark.parametrize("reverse", [False, True])
+@pytest.mark.parametrize("sort", [None, *SortingChoices])
+def test_pages(sort: SortingChoices | None, reverse: bool):
+    async def main():
+        # Tortoise caches the queries of each model by connection name, don't use "default"
+        # which the PostgreSQL tests use too
+        await Tortoise.init(
+            config={
+                "connections": {"pagination_tests": "sqlite://:memory:"},
+                "apps": {
+                    "models": {
+                        "models": ["ballsdex.core.models"],
+                        "default_connection": "pagination_tests",
+                    }
+                },
+            }
+        )
+        try:
+            await Tortoise.generate_schemas()
+            await walk_pages(sort, reverse)
+        finally:
+            await Tortoise.close_connections()
+
+    asyncio.run(main())
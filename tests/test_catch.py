@@ -0,0 +1,161 @@
+"""
+Tests of the catch statement, which is specific to PostgreSQL. They need an empty database
+given with the BALLSDEXBOT_TEST_DB_URL env var, and are skipped otherwise.
+"""
+
+import asyncio
+import os
+
+import pytest
+from tortoise import Tortoise
+from tortoise.transactions import in_transaction
+
+from ballsdex.core.models import (
+    Ball,
+    BallInstance,
+    DonationPolicy,
+    Player,
+    PlayerStats,
+    Regime,
+    Special,
+    Trade,
+    TradeObject,
+)
+from ballsdex.core.utils.player_stats import STAT_FIELDS, refresh_player_stats
+from ballsdex.packages.countryballs.catch import insert_caught_ball
+
+DB_URL = os.environ.get("BALLSDEXBOT_TEST_DB_URL")
+
+pytestmark = pytest.mark.skipif(not DB_URL, reason="BALLSDEXBOT_TEST_DB_URL is not set")
+
+
+class Rollback(Exception):
+    pass
+
+
+@pytest.fixture(autouse=True)
+def without_indexes(monkeypatch):
+    # the schema is normally created by the admin panel migrations, Tortoise can't generate
+    # these indexes and the tests don't need them
+    for model in (BallInstance, Trade, TradeObject):
+        monkeypatch.setattr(model._meta, "indexes", ())
+
+
+def run(test):
+    """
+    Run a test coroutine in a transaction that is rolled back, leaving the database empty.
+    """
+
+    async def main():
+        await Tortoise.init(db_url=DB_URL, modules={"models": ["ballsdex.core.models"]})
+        try:
+            await Tortoise.generate_schemas(safe=True)
+            async with in_transaction("default"):
+                await test()
+                raise Rollback
+        except Rollback:
+            pass
+        finally:
+            await Tortoise.close_connections()
+
+    asyncio.run(main())
+
+
+async def create_ball(country: str) -> Ball:
+    regime = await Regime.create(name="Democracy", background="/democracy.png")
+    return await Ball.create(
+        country=country,
+        regime=regime,
+        health=100,
+        attack=100,
+        rarity=1,
+        emoji_id=100000000000000000,
+        wild_card="/wild.png",
+        collection_card="/card.png",
+        credits="test",
+        capacity_name="test",
+        capacity_description="test",
+    )
+
+
+async def catch(discord_id: int, ball: Ball, special: Special | None = None):
+    instance = BallInstance(ball=ball, special=special, health_bonus=1, attack_bonus=-1)
+    player, is_new = await insert_caught_ball(discord_id, instance)
+    saved = await BallInstance.get(pk=instance.pk)
+    assert saved.player_id == player.pk
+    assert saved.ball_id == ball.pk
+    assert saved.special_id == (special.pk if special else None)
+    assert (saved.health_bonus, saved.attack_bonus) == (1, -1)
+    return player, is_new
+
+
+async def assert_stats_match(player: Player):
+    stats = await PlayerStats.get(player_id=player.pk)
+    await refresh_player_stats(player.pk)
+    expected = await PlayerStats.get(player_id=player.pk)
+    for field in STAT_FIELDS:
+        assert getattr(stats, field) == getattr(expected, field), field
+
+
+def test_new_player():
+    async def test():
+        ball = await create_ball("Testland")
+        player, is_new = await catch(100000000000000001, ball)
+        assert is_new
+        assert player.discord_id == 100000000000000001
+        assert await Player.filter(discord_id=100000000000000001).count() == 1
+        # stats are computed on first read, the catch doesn't create them
+        assert not await PlayerStats.exists(player_id=player.pk)
+
+    run(test)
+
+
+def test_existing_player():
+    async def test():
+        ball = await create_ball("Testland")
+        existing = await Player.create(
+            discord_id=100000000000000002, donation_policy=DonationPolicy.REQUEST_APPROVAL
+        )
+        player, is_new = await catch(100000000000000002, ball)
+        assert is_new
+        assert player.pk == existing.pk
+        # the existing row is returned as is
+        assert player.donation_policy == existing.donation_policy
+        assert await Player.filter(discord_id=100000000000000002).count() == 1
+
+    run(test)
+
+
+def test_repeat_catch():
+    async def test():
+        ball = await create_ball("Testland")
+        other_ball = await create_ball("Otherland")
+        player, _ = await catch(100000000000000003, ball)
+        await refresh_player_stats(player.pk)
+
+        same_player, is_new = await catch(100000000000000003, ball)
+        assert not is_new
+        assert same_player.pk == player.pk
+        await assert_stats_match(player)
+
+        _, is_new = await catch(100000000000000003, other_ball)
+        assert is_new
+        await assert_stats_match(player)
+
+    run(test)
+
+
+def test_special():
+    async def test():
+        ball = await create_ball("Testland")
+        special = await Special.create(name="Shiny", catch_phrase="Shiny!", rarity=0.1)
+        player, _ = await catch(100000000000000004, ball)
+        await refresh_player_stats(player.pk)
+
+        _, is_new = await catch(100000000000000004, ball, special)
+        assert not is_new
+        await assert_stats_match(player)
+        stats = await PlayerStats.get(player_id=player.pk)
+        assert (stats.balls, stats.special_balls, stats.distinct_balls) == (2, 1, 1)
+
+    run(test)
@@ -0,0 +1,55 @@
+import pytest
+
+from ballsdex.core.models import Ball
+from ballsdex.core.utils.names import build_catch_names, normalize_name
+
+NAMES = [
+    "France",
+    "  Côte   d’Ivoire ",
+    "Guinea–Bissau",
+    "Ｊａｐａｎ",  # fullwidth
+    "Straße",
+    "Cabo\u200bVerde",
+    "“Quoted” ‘name’",
+    "",
+]
+
+
+@pytest.mark.parametrize("name", NAMES)
+def test_idempotent(name: str):
+    normalized = normalize_name(name)
+    assert normalize_name(normalized) == normalized
+
+
+@pytest.mark.parametrize(
+    "typed, expected",
+    [
+        ("  Côte   d’Ivoire ", "côte d'ivoire"),
+        ("Guinea–Bissau", "guinea-bissau"),
+        ("Ｊａｐａｎ", "japan"),
+        ("Straße", "strasse"),
+        ("Cabo\u200bVerde", "caboverde"),
+        ("“Quoted” ‘name’", "\"quoted\" 'name'"),
+        # decomposed accents are composed like the precomposed ones
+        ("Co\u0302te", "c\u00f4te"),
+        ("\tNew\nZealand ", "new zealand"),
+    ],
+)
+def test_normalize(typed: str, expected: str):
+    assert normalize_name(typed) == expected
+
+
+@pytest.mark.parametrize("name", NAMES)
+def test_variants_match(name: str):
+    # what a player types matches the name however it was written
+    assert normalize_name(name.upper()) == normalize_name(name.lower()) == normalize_name(name)
+
+
+def test_build_catch_names():
+    ball = Ball(
+        id=1,
+        country="Côte d’Ivoire",
+        catch_names="Ivory Coast; ivory  coast;",
+        translations="Elfenbeinküste",
+    )
+    assert build_catch_names(ball) == {"côte d'ivoire", "ivory coast", "elfenbeinküste"}
@@ -0,0 +1,53 @@
+import random
+from collections import Counter
+
+import pytest
+
+from ballsdex.core.utils.sampling import AliasTable
+
+
+@pytest.mark.parametrize(
+    "weights",
+    [
+        [1, 1, 1, 1],
+        [1, 2, 3, 4],
+        [0.05, 10, 0.5, 3, 100],
+        [1],
+    ],
+)
+def test_distribution(weights: list[float]):
+    items = [f"item{i}" for i in range(len(weights))]
+    table = AliasTable(items, weights)
+    rng = random.Random(0)
+    samples = 200_000
+    counts = Counter(table.sample(rng) for _ in range(samples))
+    total = sum(weights)
+    for item, weight in zip(items, weights):
+        assert counts[item] / samples == pytest.approx(weight / total, abs=0.005), item
+
+
+def test_zero_weight_never_sampled():
+    table = AliasTable(["never", "always"], [0, 1])
+    rng = random.Random(0)
+    assert {table.sample(rng) for _ in range(10_000)} == {"always"}
+
+
+def test_same_as_seeded_sequence():
+    table = AliasTable(["a", "b", "c"], [3, 2, 1])
+    first = [table.sample(random.Random(42)) for _ in range(5)]
+    second = [table.sample(random.Random(42)) for _ in range(5)]
+    assert first == second
+    assert len(table) == 3
+
+
+@pytest.mark.parametrize(
+    "items, weights",
+    [
+        ([], []),
+        (["a", "b"], [0, 0]),
+        (["a", "b"], [1]),
+    ],
+)
+def test_invalid_weights(items: list[str], weights: list[float]):
+    with pytest.raises(ValueError):
+        AliasTable(items, weights)
@@ -0,0 +1,267 @@
+import asyncio
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from ballsdex.packages.countryballs import spawn
+from ballsdex.packages.countryballs.ab_spawn import ABSpawner
+from ballsdex.packages.countryballs.spawn import (
+    INCREASE_COOLDOWN,
+    PLACEHOLDER_AUTHOR,
+    SNAPSHOT_HEADER,
+    SNAPSHOT_MAGIC,
+    SNAPSHOT_VERSION,
+    CooldownCache,
+    MessageCache,
+    SpawnCooldown,
+    SpawnManager,
+)
+
+START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(spawn, "time", SimpleNamespace(monotonic=clock.monotonic, time=time.time))
+    return clock
+
+
+def make_message(author_id: int, content: str = "hello world", member_count: int = 50):
+    return SimpleNamespace(
+        author=SimpleNamespace(id=author_id),
+        content=content,
+        guild=SimpleNamespace(member_count=member_count),
+        _state=SimpleNamespace(intents=SimpleNamespace(message_content=True)),
+    )
+
+
+def test_author_counts_after_wrap_around():
+    cache = MessageCache(maxlen=5)
+    authors = [1, 2, 1, 3, 4, 4, 5, 1, 2, 2, 2, 6]
+    for i, author in enumerate(authors):
+        cache.append(author, False)
+        window = authors[max(0, i - 4) : i + 1]
+        assert len(cache) == len(window)
+        # the counters match the last messages, authors leaving the window are removed
+        assert cache.author_counts == Counter(window)
+        assert cache.chatters == len(set(window))
+    assert cache.author_share(2) == pytest.approx(3 / 5)
+    assert cache.author_share(3) == 0
+
+
+def test_short_messages_after_wrap_around():
+    cache = MessageCache(maxlen=4)
+    shorts = [True, False, True, True, False, False, True, False, False]
+    for i, short in enumerate(shorts):
+        cache.append(i, short)
+        assert cache.short_messages == sum(shorts[max(0, i - 3) : i + 1])
+    # fixed-size buffers, no attribute dict per cache
+    assert not hasattr(cache, "__dict__")
+    assert len(cache.authors) == len(cache.short) == 4
+
+
+def test_one_increase_per_cooldown(clock: FakeClock):
+    cooldown = SpawnCooldown(START, scaled_message_count=0)
+    increases = 0
+    # a message every second for a minute
+    for i in range(60):
+        if cooldown.increase(make_message(i % 5)):
+            increases += 1
+        assert cooldown.on_cooldown
+        clock.now += 1
+    assert increases == 60 // INCREASE_COOLDOWN
+    # the messages ignored by the gate are still cached
+    assert len(cooldown.message_cache) == 60
+
+
+def test_increase_just_after_cooldown(clock: FakeClock):
+    cooldown = SpawnCooldown(START, scaled_message_count=0)
+    assert cooldown.increase(make_message(1))
+    clock.now += INCREASE_COOLDOWN - 0.001
+    assert not cooldown.increase(make_message(2))
+    clock.now += 0.001
+    assert cooldown.increase(make_message(3))
+
+
+def test_reset_clears_the_gate(clock: FakeClock):
+    cooldown = SpawnCooldown(START, scaled_message_count=0)
+    assert cooldown.increase(make_message(1))
+    assert cooldown.on_cooldown
+    cooldown.reset(START)
+    assert not cooldown.on_cooldown
+    assert cooldown.scaled_message_count == 1
+    assert cooldown.increase(make_message(2))
+
+
+def test_idle_eviction(clock: FakeClock):
+    cache = CooldownCache(max_entries=10, idle_ttl=60)
+    cache.get_or_create(1, START).scaled_message_count = 12.5
+    clock.now += 30
+    cache.get_or_create(2, START)
+    clock.now += 31
+    # guild 1 is idle for more than the TTL, guild 2 is kept
+    cache.get_or_create(3, START)
+    assert list(cache.cooldowns) == [2, 3]
+    assert cache.evicted[1] == (START, 12.5, cache.evicted[1][2])
+
+
+def test_size_eviction(clock: FakeClock):
+    cache = CooldownCache(max_entries=3, idle_ttl=60)
+    for guild_id in (1, 2, 3):
+        cache.get_or_create(guild_id, START)
+    # guild 1 becomes the most recently active, the least recent one is evicted instead
+    cache.get_or_create(1, START)
+    cache.get_or_create(4, START)
+    assert list(cache.cooldowns) == [3, 1, 4]
+    assert list(cache.evicted) == [2]
+
+
+def test_evicted_limit(clock: FakeClock):
+    cache = CooldownCache(max_entries=1, idle_ttl=60, max_evicted=2)
+    for guild_id in (1, 2, 3, 4):
+        cache.get_or_create(guild_id, START)
+    assert list(cache.cooldowns) == [4]
+    assert sorted(cache.evicted) == [2, 3]
+
+
+def test_restore_evicted(clock: FakeClock):
+    cache = CooldownCache(max_entries=1, idle_ttl=60)
+    cooldown = cache.get_or_create(1, START)
+    cooldown.scaled_message_count = 20
+    threshold = cooldown.threshold
+    cache.get_or_create(2, START + timedelta(hours=1))
+    assert cache.get(1) is None
+
+    # the progress is kept, the time given to get_or_create only applies to new guilds
+    restored = cache.get_or_create(1, START + timedelta(hours=2))
+    assert restored is not cooldown
+    assert (restored.time, restored.scaled_message_count, restored.threshold) == (
+        START,
+        20,
+        threshold,
+    )
+    assert 1 not in cache.evicted
+    assert list(cache.evicted) == [2]
+
+    assert cache.restore(3) is None
+    assert cache.restore(2).time == START + timedelta(hours=1)
+    assert list(cache.cooldowns) == [1, 2]
+
+
+def test_memory_usage_counts_evicted(clock: FakeClock):
+    cache = CooldownCache(max_entries=1, idle_ttl=60)
+    cache.get_or_create(0, START)
+    before = cache.memory_usage()
+    for guild_id in range(1, 101):
+        cache.get_or_create(guild_id, START)
+    # each evicted guild costs its key, its tuple and the values of the tuple
+    compact = cache.evicted[1]
+    entry = sys.getsizeof(1) + sys.getsizeof(compact) + sum(sys.getsizeof(x) for x in compact)
+    assert cache.memory_usage() - before >= 100 * entry
+
+
+def make_manager() -> SpawnManager:
+    manager = SpawnManager(None)  # type: ignore
+    manager.cooldowns = CooldownCache(max_entries=2, idle_ttl=60)
+    return manager
+
+
+def fill_manager(manager: SpawnManager):
+    for guild_id in (1, 2, 3):
+        cooldown = manager.cooldowns.get_or_create(guild_id, START + timedelta(hours=guild_id))
+        cooldown.scaled_message_count = guild_id * 1.5
+        for author in (10, 10, 11, 12, 13, 14):
+            cooldown.message_cache.append(author * guild_id, author % 2 == 0)
+
+
+def test_snapshot_round_trip(clock: FakeClock):
+    manager = make_manager()
+    fill_manager(manager)
+    data = asyncio.run(manager.dump_state())
+
+    restored = make_manager()
+    restored.load_state(data)
+    assert list(restored.cooldowns.cooldowns) == [2, 3]
+    assert list(restored.cooldowns.evicted) == [1]
+    assert restored.cooldowns.evicted[1] == manager.cooldowns.evicted[1]
+    for guild_id in (2, 3):
+        before = manager.cooldowns.cooldowns[guild_id]
+        after = restored.cooldowns.cooldowns[guild_id]
+        assert after.compact() == before.compact()
+        assert len(after.message_cache) == len(before.message_cache)
+        assert after.message_cache.short_messages == before.message_cache.short_messages
+        # only the 4 most active authors are kept, the 5th is replaced by the placeholder
+        assert after.message_cache.chatters == 4
+        assert after.message_cache.author_counts[10 * guild_id] == 2
+
+
+@pytest.mark.parametrize(
+    "corrupt",
+    [
+        # another version of the format
+        lambda data: SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION + 1, 0)
+        + data[SNAPSHOT_HEADER.size :],
+        # not a snapshot
+        lambda data: b"garbage" + data[7:],
+        # truncated header or record
+        lambda data: data[: SNAPSHOT_HEADER.size - 1],
+        lambda data: data[:-1],
+    ],
+)
+def test_invalid_snapshot_ignored(clock: FakeClock, corrupt):
+    manager = make_manager()
+    fill_manager(manager)
+    data = asyncio.run(manager.dump_state())
+
+    restored = make_manager()
+    restored.load_state(corrupt(data))
+    assert len(restored.cooldowns) == 0
+    assert len(restored.cooldowns.evicted) == 0
+
+
+def test_placeholder_is_not_a_chatter():
+    cache = MessageCache.from_summary(10, 2, [(1, 3), (2, 2)])
+    assert len(cache) == 10
+    assert cache.short_messages == 2
+    assert cache.author_counts[PLACEHOLDER_AUTHOR] == 5
+    assert cache.chatters == 2
+    assert cache.author_share(1) == pytest.approx(3 / 100)
+
+
+class SpawnerAB(ABSpawner):
+    manager_class_a = SpawnManager
+    manager_class_b = SpawnManager
+    manager_a: SpawnManager
+    manager_b: SpawnManager
+
+
+def test_ab_spawner_snapshot(clock: FakeClock):
+    spawner = SpawnerAB(None)  # type: ignore
+    fill_manager(spawner.manager_a)
+    spawner.manager_b.cooldowns.get_or_create(4, START).message_cache.append(40, False)
+    data = asyncio.run(spawner.dump_state())
+    assert data
+
+    restored = SpawnerAB(None)  # type: ignore
+    restored.load_state(data)
+    assert set(restored.manager_a.cooldowns.cooldowns) == {1, 2, 3}
+    assert set(restored.manager_b.cooldowns.cooldowns) == {4}
+
+    # a truncated state is ignored as a whole
+    restored = SpawnerAB(None)  # type: ignore
+    restored.load_state(data[:-1])
+    assert not restored.manager_a.cooldowns.cooldowns
+    assert not restored.manager_b.cooldowns.cooldowns
@@ -0,0 +1,125 @@
+import asyncio
+from types import SimpleNamespace
+
+from ballsdex.packages.countryballs.queue import SpawnQueue
+
+
+class FakeView:
+    """
+    Stands for a `BallSpawnView`, recording the spawns in the order they are sent.
+    """
+
+    def __init__(self, name: str, sent: list[tuple[str, int, float]], delay: float = 0):
+        self.name = name
+        self.sent = sent
+        self.delay = delay
+
+    async def spawn(self, channel) -> bool:
+        self.sent.append((self.name, channel.id, asyncio.get_running_loop().time()))
+        await asyncio.sleep(self.delay)
+        return True
+
+
+def channel(id: int):
+    return SimpleNamespace(id=id)
+
+
+def run(test):
+    async def main():
+        queue = SpawnQueue(workers=2, max_size=10, channel_interval=0)
+        try:
+            await test(queue)
+        finally:
+            await queue.stop()
+
+    asyncio.run(main())
+
+
+def test_channel_order():
+    async def test(queue: SpawnQueue):
+        sent: list[tuple[str, int, float]] = []
+        futures = [
+            queue.put_nowait(FakeView(f"{id}-{i}", sent, delay=0.01), channel(id))
+            for i in range(3)
+            for id in (1, 2)
+        ]
+        queue.start()
+        assert await asyncio.gather(*futures) == [True] * 6
+        for id in (1, 2):
+            assert [x[0] for x in sent if x[1] == id] == [f"{id}-{i}" for i in range(3)]
+        # both channels are served at the same time
+        assert {x[1] for x in sent[:2]} == {1, 2}
+        assert len(queue) == 0
+
+    run(test)
+
+
+def test_channel_interval():
+    async def test(queue: SpawnQueue):
+        queue.channel_interval = 0.05
+        sent: list[tuple[str, int, float]] = []
+        futures = [queue.put_nowait(FakeView(str(i), sent), channel(1)) for i in range(3)]
+        queue.start()
+        await asyncio.gather(*futures)
+        times = [x[2] for x in sent]
+        assert all(b - a >= 0.045 for a, b in zip(times, times[1:]))
+
+    run(test)
+
+
+def test_overflow():
+    async def test(queue: SpawnQueue):
+        queue.max_size = 2
+        sent: list[tuple[str, int, float]] = []
+        first = queue.put_nowait(FakeView("first", sent), channel(1))
+        second = queue.put_nowait(FakeView("second", sent), channel(2))
+        assert first and second
+        assert queue.put_nowait(FakeView("dropped", sent), channel(3)) is None
+        assert len(queue) == 2
+
+        # put waits for room instead of dropping
+        waiting = asyncio.create_task(queue.put(FakeView("waited", sent), channel(3)))
+        await asyncio.sleep(0.01)
+        assert not waiting.done()
+        queue.start()
+        third = await asyncio.wait_for(waiting, 1)
+        await asyncio.gather(first, second, third)
+        assert [x[0] for x in sent] == ["first", "second", "waited"]
+
+    run(test)
+
+
+def test_cancelled_spawn_is_skipped():
+    async def test(queue: SpawnQueue):
+        sent: list[tuple[str, int, float]] = []
+        skipped = queue.put_nowait(FakeView("skipped", sent), channel(1))
+        kept = queue.put_nowait(FakeView("kept", sent), channel(1))
+        assert skipped and kept
+        skipped.cancel()
+        queue.start()
+        await kept
+        assert [x[0] for x in sent] == ["kept"]
+
+    run(test)
+
+
+def test_put_channel_limit():
+    async def test(queue: SpawnQueue):
+        queue.max_per_channel = 2
+        sent: list[tuple[str, int, float]] = []
+        bomb = [await queue.put(FakeView(f"bomb-{i}", sent), channel(1)) for i in range(2)]
+        # a third spawn of the bomb waits, even though the queue has room
+        waiting = asyncio.create_task(queue.put(FakeView("bomb-2", sent), channel(1)))
+        await asyncio.sleep(0.01)
+        assert not waiting.done()
+        assert len(queue) == 2
+
+        # other channels are not affected
+        natural = queue.put_nowait(FakeView("natural", sent), channel(2))
+        assert natural
+        queue.start()
+        bomb.append(await asyncio.wait_for(waiting, 1))
+        await asyncio.gather(*bomb, natural)
+        assert [x[0] for x in sent if x[1] == 1] == ["bomb-0", "bomb-1", "bomb-2"]
+
+    run(test)
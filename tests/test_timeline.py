@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta, timezone
+
+from ballsdex.core.models import Ball, Special
+from ballsdex.core.utils.timeline import SpecialTimeline
+
+START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+END = datetime(2025, 2, 1, tzinfo=timezone.utc)
+TICK = timedelta(microseconds=1)
+
+
+def make_special(pk: int, start: datetime | None, end: datetime | None) -> Special:
+    return Special(
+        id=pk, name=f"Special {pk}", catch_phrase="", rarity=1, start_date=start, end_date=end
+    )
+
+
+def make_ball(pk: int, created_at: datetime | None, enabled: bool = True) -> Ball:
+    return Ball(id=pk, country=f"Ball {pk}", enabled=enabled, created_at=created_at)
+
+
+def test_transitions():
+    special = make_special(1, START, END)
+    timeline = SpecialTimeline([special], clock=lambda: START - TICK)
+    assert not timeline.is_active(special)
+    assert timeline.active == ()
+    assert timeline.next_boundary == START
+
+    assert not timeline.advance(START - TICK)
+    assert timeline.advance(START)
+    assert timeline.is_active(special)
+    assert timeline.active == (special,)
+
+    # still ongoing at the end date itself
+    assert not timeline.advance(END)
+    assert timeline.is_active(special)
+    assert timeline.next_boundary == END + TICK
+
+    assert timeline.advance(END + TICK)
+    assert not timeline.is_active(special)
+    assert timeline.active == ()
+    assert timeline.next_boundary is None
+
+
+def test_going_back_does_nothing():
+    special = make_special(1, START, END)
+    timeline = SpecialTimeline([special], clock=lambda: START)
+    assert timeline.is_active(special)
+    assert not timeline.advance(START - timedelta(days=1))
+    assert timeline.is_active(special)
+
+
+def test_open_ended_specials():
+    no_start = make_special(1, None, END)
+    no_end = make_special(2, START, None)
+    always = make_special(3, None, None)
+    timeline = SpecialTimeline([no_start, no_end, always], clock=lambda: START - TICK)
+    assert timeline.is_active(no_start) and timeline.is_active(always)
+    assert not timeline.is_active(no_end)
+
+    timeline.advance(START)
+    assert {x.pk for x in timeline.active} == {1, 2, 3}
+    timeline.advance(END + TICK)
+    assert {x.pk for x in timeline.active} == {2, 3}
+
+
+def test_end_before_start_is_never_active():
+    special = make_special(1, END, START)
+    timeline = SpecialTimeline([special], clock=lambda: START - TICK)
+    for time in (START, END, END + TICK):
+        timeline.advance(time)
+        assert not timeline.is_active(special)
+
+
+def test_obtainable_balls():
+    balls = [
+        make_ball(1, START - timedelta(days=1)),
+        make_ball(2, END + timedelta(days=1)),
+        make_ball(3, None),
+        make_ball(4, START, enabled=False),
+    ]
+    timeline = SpecialTimeline([], balls, clock=lambda: START)
+    # balls without creation date are always obtainable, disabled ones never
+    assert {x.pk for x in timeline.obtainable_balls(make_special(1, START, END))} == {1, 3}
+    assert {x.pk for x in timeline.obtainable_balls(make_special(2, START, None))} == {1, 2, 3}